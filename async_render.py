@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Async Report Renderer
+异步报表渲染接口
+
+Rendering API for asyncio services such as the MES gateway.  Rendering is
+CPU-bound and runs in an executor: by default a pool of worker processes
+that keep the template, layout and caches warm, or any concurrent.futures
+executor the service already has.  Reports are written to disk in the
+loop's default thread pool, so neither rendering nor file I/O blocks the
+event loop.  Files are written under a temporary name and renamed into
+place (see output_sinks.py).
+
+Every call takes a timeout in seconds for rendering and writing the report,
+counted from when the order is handed to the executor.  An order is handed
+over only when a worker is free, so the time it waits for one is not
+counted.  A timed-out or cancelled order leaves no report behind: a write
+still in progress is discarded rather than renamed into place.  An order
+that a worker has already started cannot be interrupted: the worker finishes
+it and discards the result, and only then takes the next order.  If a
+worker process dies, the renderer's own pool is replaced and the orders it
+took down are rendered once more.
+
+render_stream() renders a whole batch and yields every result as soon as it
+is done, in completion order rather than input order.
+渲染在执行器中进行，文件异步写入，支持取消与超时。
+
+Usage / 使用方法:
+    async with AsyncRenderer(workers=4, timeout=10) as renderer:
+        document = await renderer.render(order)
+        path, written = await renderer.render_order(order, 'scan', 'reports/')
+        async for label, path, written, error in render_stream(renderer, orders, 'reports/'):
+            ...
+
+    python3 async_render.py orders/ -o reports/ --workers 4 --timeout 10
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from batch_render import (configure_worker, duplicate_report, iter_orders, print_batch_stats, render_options,
+                          render_report, report_filename, report_layout, report_template)
+from order_schema import describe_errors, validate_order
+from output_sinks import SINK_VARIANTS, ReportSink
+from pdf_writer import FontError, load_font
+
+class WriteAbandoned(Exception):
+    """Raised inside a write thread whose caller timed out or was cancelled"""
+
+def render_document(data, options):
+    """Validate (if asked) and render one order in an executor; raise ValueError for an invalid order"""
+    if options['validate']:
+        problems = validate_order(data)
+        if problems:
+            raise ValueError(f"invalid order: {describe_errors(problems)}")
+    return render_report(data, options)
+
+class AsyncRenderer:
+    """Renders orders in an executor and writes reports without blocking the event loop
+
+    executor may be any concurrent.futures executor; it is then left running
+    by close().  Without one the renderer starts `workers` processes (0 = one
+    per CPU) with warm caches, or threads with threads=True.  Threads share
+    the interpreter lock, so they keep the loop responsive but render no
+    faster than one process.  pool_restarts counts the renderer's own
+    pools replaced after a worker died.
+    """
+
+    def __init__(self, executor=None, workers=0, threads=False, timeout=None, template_path=None,
+                 output_format='html', font_path=None, validate=False, output_mode='plain',
+                 layout_path=None, layout_variant=None, qr_cache_dir=None, fragments=0, fragment_dir=None):
+        self.options = render_options(template_path, output_format, font_path, validate,
+                                      output_mode=output_mode, layout_path=layout_path,
+                                      layout_variant=layout_variant)
+        # Fail on a bad layout, template or font here rather than on every order
+        report_layout(self.options)
+        if output_format == 'pdf':
+            load_font(font_path)
+        else:
+            report_template(self.options)
+        self.sink = ReportSink(output_mode)
+        self.timeout = timeout
+        self.workers = workers or os.cpu_count() or 1
+        self.pool_restarts = 0
+        self._owned = executor is None
+        self._caches = (qr_cache_dir, fragments, fragment_dir)
+        if executor is None:
+            if threads:
+                if fragments or fragment_dir:
+                    raise ValueError("the fragment cache needs worker processes, not threads")
+                configure_worker(*self._caches)
+                executor = ThreadPoolExecutor(self.workers)
+            else:
+                executor = self.start_pool()
+        self.executor = executor
+        # Created in the loop that renders: before Python 3.10 a semaphore binds to
+        # the loop current at construction, which asyncio.run() then replaces
+        self._slots = None
+        self._slots_loop = None
+
+    async def render(self, data, timeout=None):
+        """Render one order and return the encoded document
+
+        Raises asyncio.TimeoutError after timeout (or the renderer's default)
+        seconds, and whatever the rendering raised.
+        """
+        job = await self._submit(data)
+        return await asyncio.wait_for(self._finish(job, data), self._timeout(timeout))
+
+    async def render_order(self, data, label, output_dir, timeout=None):
+        """Render one order into output_dir and return (output_path, bytes_written)
+
+        The file name is chosen as in batch_render.py.  The timeout covers
+        writing the report too, so a hung output share fails the order
+        instead of blocking the caller.
+        """
+        output_path = Path(output_dir) / report_filename(data, label, '.' + self.options['output_format'])
+        job = await self._submit(data)
+        written = await asyncio.wait_for(self._finish(job, data, output_path), self._timeout(timeout))
+        return output_path, written
+
+    def _timeout(self, timeout):
+        return self.timeout if timeout is None else timeout
+
+    async def _submit(self, data):
+        """Hand an order to the executor once a worker is free; return (executor, future)"""
+        loop = asyncio.get_running_loop()
+        slots = self._worker_slots(loop)
+        await slots.acquire()
+        executor = self.executor
+        try:
+            try:
+                job = executor.submit(render_document, data, self.options)
+            except BrokenProcessPool:
+                # The pool broke after the previous order was handed over
+                if not self._owned:
+                    raise
+                self.replace_pool(executor)
+                executor = self.executor
+                job = executor.submit(render_document, data, self.options)
+        except BaseException:
+            slots.release()
+            raise
+        # The slot is freed when the worker is, not when the caller gives up,
+        # so abandoned renders do not eat into the timeouts of later orders
+        job.add_done_callback(lambda _: self._release(loop, slots))
+        # Cancelling the wrapped future also cancels a job still queued in the executor
+        return executor, asyncio.wrap_future(job, loop=loop)
+
+    async def _finish(self, job, data, output_path=None):
+        """Wait for a submitted order, retrying once on a new pool, and write it if output_path is given"""
+        executor, future = job
+        try:
+            document = await future
+        except BrokenProcessPool:
+            # A worker died (OOM kill, crash) and took the pool down with it; an
+            # order that kills its worker again fails with BrokenProcessPool
+            if not self._owned:
+                raise
+            self.replace_pool(executor)
+            _, future = await self._submit(data)
+            document = await future
+        if output_path is None:
+            return document
+        return await self.write(document, output_path)
+
+    def start_pool(self):
+        return ProcessPoolExecutor(self.workers, initializer=configure_worker, initargs=self._caches)
+
+    def replace_pool(self, broken):
+        """Swap a broken worker pool for a new one, once, however many orders saw it break"""
+        if self.executor is broken:
+            self.executor = self.start_pool()
+            self.pool_restarts += 1
+        broken.shutdown(wait=False)
+
+    def _worker_slots(self, loop):
+        """Return the semaphore of free workers for loop, starting a new one for a new loop"""
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.workers)
+            self._slots_loop = loop
+        return self._slots
+
+    def _release(self, loop, slots):
+        try:
+            loop.call_soon_threadsafe(slots.release)
+        except RuntimeError:
+            # The loop is closed; nobody waits for the slot any more
+            pass
+
+    async def write(self, document, output_path):
+        """Write an encoded document in every configured variant and return the bytes stored
+
+        The thread doing the write cannot be interrupted; if the caller gives
+        up first, the files are discarded once the data is written instead
+        of being moved into place.
+        """
+        abandoned = threading.Event()
+        try:
+            return await asyncio.to_thread(self.sink.write, output_path, _chunks(document, abandoned))
+        except asyncio.CancelledError:
+            abandoned.set()
+            raise
+
+    async def close(self, cancel=True):
+        """Shut the renderer's own executor down, cancelling queued jobs unless cancel=False"""
+        if self._owned:
+            await asyncio.to_thread(self.executor.shutdown, True, cancel_futures=cancel)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+def _chunks(document, abandoned):
+    yield document
+    if abandoned.is_set():
+        # Makes the sink abort the temporary files
+        raise WriteAbandoned("the caller gave up before the report was stored")
+
+async def _iter_async(orders):
+    """Iterate orders, pulling from a plain iterator in a thread since reading files blocks"""
+    if hasattr(orders, '__aiter__'):
+        async for order in orders:
+            yield order
+        return
+    iterator = iter(orders)
+    done = object()
+    while True:
+        order = await asyncio.to_thread(next, iterator, done)
+        if order is done:
+            return
+        yield order
+
+async def _render_entry(renderer, label, data, output_dir, timeout):
+    try:
+        output_path, written = await renderer.render_order(data, label, output_dir, timeout)
+    except asyncio.TimeoutError:
+        return label, None, 0, f"timed out after {timeout if timeout is not None else renderer.timeout} s"
+    except Exception as e:
+        return label, None, 0, f"{type(e).__name__}: {e}"
+    return label, output_path, written, None
+
+async def render_stream(renderer, orders, output_dir, timeout=None, pending=None):
+    """Render a batch of orders and yield (label, output_path, written, error) as each finishes
+
+    orders yields (label, data) or (label, data, error) like
+    batch_render.iter_orders(), from a plain or an async iterable.  Failed
+    and timed-out orders are yielded with an error message and no path, and
+    so is an order whose report file name an earlier order took.  At
+    most `pending` orders (default: twice the workers) are read ahead, so
+    large sources are consumed as rendering progresses.  Closing the
+    generator early cancels the orders still in flight.
+    """
+    pending = pending or renderer.workers * 2
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    source = _iter_async(orders)
+    suffix = '.' + renderer.options['output_format']
+    claimed = {}
+    tasks = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(tasks) < pending:
+                try:
+                    order = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                label, data, error = order if len(order) == 3 else (*order, None)
+                if error is None and not isinstance(data, dict):
+                    error = f"expected a JSON object, got {type(data).__name__}"
+                if error is None:
+                    error = duplicate_report(claimed, report_filename(data, label, suffix), label)
+                if error is not None:
+                    yield label, None, 0, error
+                else:
+                    tasks.add(asyncio.create_task(_render_entry(renderer, label, data, output_dir, timeout)))
+            if not tasks:
+                return
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await source.aclose()
+
+async def render_sources(renderer, sources, output_dir, timeout=None):
+    """Render every order in sources with render_stream() and return batch statistics"""
+    stats = {'orders': 0, 'failed': 0, 'skipped': 0, 'removed': 0, 'bytes': 0, 'errors': []}
+    start = time.perf_counter()
+    async for label, _, written, error in render_stream(renderer, iter_orders(sources), output_dir, timeout):
+        if error is None:
+            stats['orders'] += 1
+            stats['bytes'] += written
+        else:
+            stats['failed'] += 1
+            stats['errors'].append((label, error))
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+async def run_batch(args):
+    async with AsyncRenderer(workers=args.workers, threads=args.threads, timeout=args.timeout,
+                             template_path=args.template, output_format=args.format, font_path=args.font,
+                             validate=args.validate, output_mode=args.compress, layout_path=args.layout,
+                             layout_variant=args.variant, qr_cache_dir=args.qr_cache,
+                             fragments=args.fragment_cache, fragment_dir=args.fragment_dir) as renderer:
+        return await render_sources(renderer, args.sources, args.output_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="Render production orders with the asyncio renderer")
+    parser.add_argument('sources', nargs='+',
+                        help="JSON files, directories, glob patterns, .jsonl files or '-' for JSON lines on stdin")
+    parser.add_argument('-o', '--output-dir', default='reports', help="directory for the generated reports")
+    parser.add_argument('--format', choices=('html', 'pdf'), default='html', help="output format")
+    parser.add_argument('--font', help="TrueType CJK font to embed in PDF output")
+    parser.add_argument('-j', '--workers', type=int, default=0,
+                        help="render worker processes (0 = one per CPU)")
+    parser.add_argument('--threads', action='store_true', help="render in threads instead of processes")
+    parser.add_argument('--timeout', type=float, help="seconds allowed per order before it is failed")
+    parser.add_argument('--template', help="report template with {{ slot }} markers (default: embedded layout)")
+    parser.add_argument('--layout', help="JSON layout file with field sources and table columns")
+    parser.add_argument('--variant', help="named variant inside the layout file, e.g. one per plant")
+    parser.add_argument('--qr-cache', help="directory for cached QR code SVGs, shared across runs")
+    parser.add_argument('--compress', choices=sorted(SINK_VARIANTS), default='plain',
+                        help="store plain files, gzip-compressed .gz files, or both")
+    parser.add_argument('--validate', action='store_true',
+                        help="check every order against the order schema before rendering")
+    parser.add_argument('--fragment-cache', type=int, default=0, metavar='N',
+                        help="reuse the rendered rows of identical sections, keeping N per worker in memory")
+    parser.add_argument('--fragment-dir', help="directory that keeps rendered section rows across runs")
+    args = parser.parse_args()
+
+    try:
+        stats = asyncio.run(run_batch(args))
+    except (OSError, ValueError, FontError) as e:
+        print(f"Error: {e}")
+        return 1
+    print_batch_stats(stats)
+    return 1 if stats['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Batch HTML Report Generator
+批量HTML报表生成器
+
+Renders many production orders in a single process, so interpreter startup
+and module setup are paid once per run instead of once per work order.
+
+Every work order has one report file, and the first order of the run that
+names it wins: a later order with the same work order number, e.g. a newer
+ERP revision, fails and the run exits with status 1.  Orders are read in
+the order given (directories and globs sorted by name), so to render a
+newer revision, leave the older one out or give the newer file first.
+order_index.py render picks the newest revision of each work order from an
+archive on its own.
+在同一进程中批量生成报表，避免每个工单都重新启动解释器。
+
+Usage / 使用方法:
+    python3 batch_render.py orders/ -o reports/
+    python3 batch_render.py "orders/*.json" -o reports/
+    python3 batch_render.py orders.jsonl -o reports/
+    cat orders.jsonl | python3 batch_render.py - -o reports/
+    python3 batch_render.py orders/ -o reports/ --workers 0
+    python3 batch_render.py orders/ -o reports/ --link-assets
+    python3 batch_render.py orders/ -o archive/ --compress gzip
+    python3 batch_render.py orders.jsonl --bundle reports.zip
+    python3 batch_render.py orders/ -o reports/ --layout plants.json --variant plant-b
+    python3 batch_render.py orders/ -o reports/ --timings --profile-slowest 5
+    python3 batch_render.py orders/ -o reports/ --fragment-cache 4096 --fragment-dir cache/fragments
+"""
+
+import argparse
+import glob
+import hashlib
+import multiprocessing
+import os
+import re
+import sys
+import time
+from operator import itemgetter
+from pathlib import Path
+
+from fragment_cache import configure_fragments
+from generate_html_report import iter_html_report, render_html_report
+from order_schema import describe_errors, validate_order
+from order_stream import iter_file_records
+from output_sinks import SINK_VARIANTS, ReportSink
+from pdf_writer import FontError, load_font, render_pdf_report
+from qr_code import configure_cache
+from render_manifest import RenderManifest, order_digest
+from render_profile import PipelineStats, current_sample, print_fragment_stats, print_stage_table, record_order
+from report_bundle import BundleWriter
+from report_layout import load_layout
+from template_engine import ASSET_DIR, REPORT_SLOTS, load_template, report_assets, write_assets
+
+ORDER_FILE_SUFFIXES = ('.json', '.jsonl', '.ndjson')
+DEFAULT_CHUNKSIZE = 16
+
+def expand_source(source):
+    """Expand a directory, glob pattern or file path into a sorted list of files"""
+    path = Path(source)
+    if path.is_dir():
+        return sorted(p for p in path.iterdir()
+                      if p.is_file() and p.suffix in ORDER_FILE_SUFFIXES)
+    if glob.has_magic(source):
+        return sorted(Path(p) for p in glob.glob(source))
+    return [path]
+
+def iter_orders(sources):
+    """Yield (label, data, error) for every order found in the given sources
+
+    Files are read with the streaming reader, so JSON-lines and
+    concatenated-JSON dumps of any size are consumed one order at a time.
+    """
+    for source in sources:
+        paths = ['-'] if source == '-' else expand_source(source)
+        for path in paths:
+            name = '<stdin>' if path == '-' else str(path)
+            try:
+                for record in iter_file_records(path):
+                    error = record.error
+                    if error is not None:
+                        error = f"{error} (byte offset {record.offset})"
+                    yield f"{name}:{record.line}", record.data, error
+            except OSError as e:
+                yield name, None, str(e)
+
+def report_filename(data, label, suffix='.html'):
+    """Build the output file name for an order, preferring its work order number"""
+    work_order = str(data.get('mainOrder', {}).get('workOrderNumber', '') or '')
+    if not work_order:
+        work_order = Path(label.split(':')[0]).stem
+        if ':' in label:
+            work_order += '_' + label.rsplit(':', 1)[1]
+    work_order = re.sub(r'[^\w.-]', '_', work_order)
+    return f"production_order_{work_order}{suffix}"
+
+def duplicate_report(claimed, name, label):
+    """Claim a report file name for label; return an error if an earlier order of the run has it"""
+    first = claimed.setdefault(name, label)
+    if first != label:
+        return f"duplicate report {name}, already rendered for {first}"
+    return None
+
+def render_options(template_path=None, output_format='html', font_path=None, validate=False,
+                   linked_assets=False, output_mode='plain', bundle=False, layout_path=None,
+                   layout_variant=None):
+    """Bundle the per-run rendering settings that every job carries"""
+    return {'template_path': template_path, 'output_format': output_format, 'font_path': font_path,
+            'validate': validate, 'linked_assets': linked_assets, 'output_mode': output_mode,
+            'bundle': bundle, 'layout_path': layout_path, 'layout_variant': layout_variant}
+
+def report_layout(options):
+    """Return the compiled (cached) layout selected by the options"""
+    return load_layout(options['layout_path'], options['layout_variant'])
+
+def report_template(options):
+    """Return the compiled (cached) template; --template wins over the layout's own template"""
+    layout = report_layout(options)
+    return load_template(options['template_path'] or layout.template_path, options['linked_assets'],
+                         layout.field_names - REPORT_SLOTS)
+
+def renderer_fingerprint(options):
+    """Hash of everything besides the order input that shapes the output"""
+    layout = report_layout(options).fingerprint
+    if options['output_format'] == 'pdf':
+        return hashlib.sha256(f"pdf:{options['font_path']}:{layout}".encode('utf-8')).hexdigest()
+    return hashlib.sha256(f"{report_template(options).fingerprint}:{layout}".encode('utf-8')).hexdigest()
+
+def render_report(data, options):
+    """Render one order in the configured format and return the encoded document"""
+    if options['output_format'] == 'pdf':
+        return render_pdf_report(data, options['font_path'], report_layout(options))
+    return render_html_report(data, report_template(options), report_layout(options)).encode('utf-8')
+
+def iter_report_chunks(data, options):
+    """Yield the encoded document in pieces; HTML is rendered one section at a time"""
+    if options['output_format'] == 'pdf':
+        yield render_pdf_report(data, options['font_path'], report_layout(options))
+        return
+    for chunk in iter_html_report(data, report_template(options), report_layout(options)):
+        yield chunk.encode('utf-8')
+
+def render_order(data, label, output_dir, options=None):
+    """Render one order into output_dir and return (output_path, bytes_written)
+
+    output_path is the plain file name; the output mode decides whether the
+    plain file, a .gz file, or both are stored.
+    """
+    options = options or render_options()
+    output_path = Path(output_dir) / report_filename(data, label, '.' + options['output_format'])
+    sink = ReportSink(options['output_mode'])
+    sample = current_sample()
+    if sample is None:
+        written = sink.write(output_path, iter_report_chunks(data, options))
+    else:
+        # Time outside the chunk generator is spent writing and compressing
+        start = time.perf_counter()
+        written = sink.write(output_path, sample.timed(iter_report_chunks(data, options)))
+        sample.add('write', time.perf_counter() - start - sample.rendering)
+    return output_path, written
+
+def bundle_key(data, name):
+    """Key a bundled report by its work order number, or by its file name without one"""
+    return str(data.get('mainOrder', {}).get('workOrderNumber', '') or '') or Path(name).stem
+
+def render_job(job):
+    """Render one (label, data, error, output_dir, options) job
+
+    Returns (label, written, error, payload).  payload is None when the
+    report was written to output_dir, and (key, name, content) when it is
+    destined for a bundle written by the parent process.
+    """
+    label, data, error, output_dir, options = job
+    if error is not None:
+        return label, 0, error, None
+    sample = current_sample()
+    if options['validate']:
+        start = time.perf_counter()
+        problems = validate_order(data)
+        if sample is not None:
+            sample.add('validate', time.perf_counter() - start)
+        if problems:
+            return label, 0, f"invalid order: {describe_errors(problems)}", None
+    try:
+        if options['bundle']:
+            name = report_filename(data, label, '.' + options['output_format'])
+            start = time.perf_counter()
+            content = render_report(data, options)
+            if sample is not None:
+                sample.rendering += time.perf_counter() - start
+            return label, len(content), None, (bundle_key(data, name), name, content)
+        _, written = render_order(data, label, output_dir, options)
+        return label, written, None, None
+    except Exception as e:
+        return label, 0, f"{type(e).__name__}: {e}", None
+
+def profiled_render_job(job):
+    """render_job() with stage timings; returns (result, OrderSample)"""
+    return record_order(job[0], job[4]['output_format'], render_job, job)
+
+def collect_samples(results, profile):
+    """Fold the samples of profiled_render_job() results into profile and yield the results"""
+    for result, sample in results:
+        _, written, error, _ = result
+        profile.add(sample, error, written)
+        yield result
+
+def iter_jobs(sources, output_dir, options):
+    """Yield render jobs for every order found in sources"""
+    for label, data, error in iter_orders(sources):
+        yield label, data, error, output_dir, options
+
+def reject_duplicates(jobs):
+    """Fail the jobs whose report file name an earlier order of the run already took
+
+    Orders sharing a work order number would otherwise overwrite each other's
+    report while both count as rendered.  The first order wins, also when a
+    later one is a newer revision: the jobs are streamed to the workers, so
+    the run cannot wait for the last revision of a work order.
+    """
+    claimed = {}
+    for job in jobs:
+        label, data, error, output_dir, options = job
+        if error is None and isinstance(data, dict):
+            error = duplicate_report(claimed, report_filename(data, label, '.' + options['output_format']), label)
+            if error is not None:
+                error += "; to render this order instead, leave that one out or give this one first"
+                job = label, None, error, output_dir, options
+        yield job
+
+def skip_unchanged(jobs, manifest, stats):
+    """Yield only the jobs whose input changed since the last incremental run"""
+    for job in jobs:
+        label, data, error, _, options = job
+        if error is not None:
+            manifest.mark_incomplete()
+        else:
+            name = report_filename(data, label, '.' + options['output_format'])
+            digest = order_digest(data)
+            if manifest.is_current(name, digest):
+                manifest.keep(name, digest)
+                stats['skipped'] += 1
+                continue
+            manifest.expect(label, name, digest)
+        yield job
+
+def collect_results(results, stats, manifest=None, bundle=None):
+    """Fold (label, written, error, payload) results into the batch statistics"""
+    for label, written, error, payload in results:
+        if error is None and payload is not None:
+            try:
+                bundle.add(*payload)
+            except ValueError as e:
+                error = str(e)
+        if error is None:
+            stats['orders'] += 1
+            stats['bytes'] += written
+            if manifest is not None:
+                manifest.confirm(label)
+        else:
+            stats['failed'] += 1
+            stats['errors'].append((label, error))
+
+def configure_worker(qr_cache_dir=None, fragments=0, fragment_dir=None):
+    """Set up the QR and fragment caches of a rendering process"""
+    configure_cache(qr_cache_dir)
+    configure_fragments(fragments, fragment_dir)
+
+def render_batch(sources, output_dir, workers=1, chunksize=DEFAULT_CHUNKSIZE, template_path=None,
+                 qr_cache_dir=None, incremental=False, output_format='html', font_path=None,
+                 validate=False, linked_assets=False, output_mode='plain', bundle_path=None,
+                 layout_path=None, layout_variant=None, profile=None, fragments=0, fragment_dir=None):
+    """Render every order in sources into output_dir and return run statistics
+
+    With workers > 1 the orders are dispatched in chunks to a process pool.
+    Results are collected in input order, and a failing order is recorded in
+    the statistics instead of aborting the run.  An order whose report file
+    name an earlier order already took (the same work order number) fails
+    instead of overwriting that report, even if it is a newer revision.
+
+    In incremental mode the sources are treated as the complete set of
+    orders: unchanged orders are skipped and reports of removed orders are
+    deleted, based on the manifest kept in output_dir.
+
+    With validate=True every order is checked against the order schema first
+    and rejected orders are counted as failed.
+
+    With linked_assets=True the HTML reports link one content-hashed
+    stylesheet written to output_dir/assets instead of inlining the CSS.
+
+    output_mode selects plain files, gzip-compressed files or both (see
+    output_sinks.SINK_VARIANTS).
+
+    With bundle_path every report is appended to one zip or tar archive
+    (see report_bundle.py) instead of being written to output_dir.
+
+    layout_path and layout_variant select the field and column layout (see
+    report_layout.py).
+
+    profile, a render_profile.PipelineStats, collects per-stage timings
+    and counters and profiles its slowest orders after the run.
+
+    fragments and fragment_dir enable the section fragment cache of every
+    rendering process (see fragment_cache.py); its lookups are counted in
+    profile.
+    """
+    if bundle_path is not None and (incremental or output_mode != 'plain'):
+        raise ValueError("--bundle cannot be combined with --incremental or --compress")
+    options = render_options(template_path, output_format, font_path, validate, linked_assets, output_mode,
+                             bundle_path is not None, layout_path, layout_variant)
+    report_layout(options)
+    if output_format == 'pdf':
+        load_font(font_path)
+    else:
+        report_template(options)
+    worker_caches = (qr_cache_dir, fragments, fragment_dir)
+    configure_worker(*worker_caches)
+
+    bundle = None
+    if bundle_path is not None:
+        bundle = BundleWriter(bundle_path)
+        if linked_assets and output_format == 'html':
+            for filename, content in report_assets().values():
+                bundle.add(None, f"{ASSET_DIR}/{filename}", content)
+    else:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        if linked_assets and output_format == 'html':
+            write_assets(output_dir)
+
+    stats = {'orders': 0, 'failed': 0, 'skipped': 0, 'removed': 0, 'bytes': 0, 'errors': []}
+    start = time.perf_counter()
+
+    manifest = None
+    jobs = reject_duplicates(iter_jobs(sources, output_dir, options))
+    if incremental:
+        manifest = RenderManifest(output_dir, renderer_fingerprint(options), SINK_VARIANTS[output_mode])
+        jobs = skip_unchanged(jobs, manifest, stats)
+    job_func = render_job
+    if profile is not None:
+        jobs = profile.track(jobs, itemgetter(0), itemgetter(1))
+        job_func = profiled_render_job
+
+    try:
+        if workers > 1:
+            with multiprocessing.Pool(workers, initializer=configure_worker, initargs=worker_caches) as pool:
+                results = pool.imap(job_func, jobs, chunksize)
+                if profile is not None:
+                    results = collect_samples(results, profile)
+                collect_results(results, stats, manifest, bundle)
+        else:
+            results = map(job_func, jobs)
+            if profile is not None:
+                results = collect_samples(results, profile)
+            collect_results(results, stats, manifest, bundle)
+    finally:
+        if bundle is not None:
+            bundle.close()
+
+    if manifest is not None:
+        stats['removed'] = len(manifest.prune())
+        manifest.save()
+
+    stats['seconds'] = time.perf_counter() - start
+    if profile is not None and profile.keep:
+        profile.capture_slowest(lambda data: render_report(data, options))
+    return stats
+
+def print_batch_stats(stats):
+    """Print throughput statistics for a batch run"""
+    seconds = stats['seconds']
+    rate = stats['orders'] / seconds if seconds > 0 else 0.0
+
+    for label, error in stats['errors']:
+        print(f"❌ {label}: {error}")
+
+    print(f"Rendered orders: {stats['orders']}")
+    print(f"Failed orders: {stats['failed']}")
+    if stats['skipped'] or stats['removed']:
+        print(f"Unchanged orders skipped: {stats['skipped']}")
+        print(f"Removed reports deleted: {stats['removed']}")
+    print(f"Bytes written: {stats['bytes']:,}")
+    print(f"Elapsed: {seconds:.3f} s")
+    print(f"Throughput: {rate:.1f} orders/sec")
+
+def main():
+    parser = argparse.ArgumentParser(description="Render many production orders in one process")
+    parser.add_argument('sources', nargs='+',
+                        help="JSON files, directories, glob patterns, .jsonl files or '-' for JSON lines on stdin")
+    parser.add_argument('-o', '--output-dir', default='reports', help="directory for the generated reports")
+    parser.add_argument('--format', choices=('html', 'pdf'), default='html', help="output format")
+    parser.add_argument('--font', help="TrueType CJK font to embed in PDF output")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="number of worker processes (0 = one per CPU)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help="orders handed to a worker per dispatch")
+    parser.add_argument('--template', help="report template with {{ slot }} markers (default: embedded layout)")
+    parser.add_argument('--layout', help="JSON layout file with field sources and table columns")
+    parser.add_argument('--variant', help="named variant inside the layout file, e.g. one per plant")
+    parser.add_argument('--qr-cache', help="directory for cached QR code SVGs, shared across runs")
+    parser.add_argument('--bundle', help="append all reports to this .zip or .tar archive instead of OUTPUT_DIR")
+    parser.add_argument('--compress', choices=sorted(SINK_VARIANTS), default='plain',
+                        help="store plain files, gzip-compressed .gz files, or both")
+    parser.add_argument('--link-assets', action='store_true',
+                        help="write one shared stylesheet to OUTPUT_DIR/assets and link it from every report")
+    parser.add_argument('--validate', action='store_true',
+                        help="check every order against the order schema before rendering")
+    parser.add_argument('--incremental', action='store_true',
+                        help="re-render only changed orders and delete reports of removed orders")
+    parser.add_argument('--timings', action='store_true',
+                        help="print the time spent per pipeline stage (load, validate, tables, template, write)")
+    parser.add_argument('--profile-slowest', type=int, default=0, metavar='N',
+                        help="re-render the N slowest orders under cProfile and tracemalloc after the run")
+    parser.add_argument('--metrics-json', help="write stage timings and counters to this JSON file")
+    parser.add_argument('--metrics-prom', help="write stage timings and counters in Prometheus text format")
+    parser.add_argument('--fragment-cache', type=int, default=0, metavar='N',
+                        help="reuse the rendered rows of identical sections, keeping N per worker in memory")
+    parser.add_argument('--fragment-dir', help="directory that keeps rendered section rows across runs")
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    fragments = args.fragment_cache or args.fragment_dir
+    profile = None
+    if args.timings or args.profile_slowest or args.metrics_json or args.metrics_prom or fragments:
+        # Counts fragment cache hits across worker processes, too
+        profile = PipelineStats(args.profile_slowest)
+    try:
+        stats = render_batch(args.sources, args.output_dir, workers=workers, chunksize=args.chunksize,
+                             template_path=args.template, qr_cache_dir=args.qr_cache,
+                             incremental=args.incremental, output_format=args.format, font_path=args.font,
+                             validate=args.validate, linked_assets=args.link_assets,
+                             output_mode=args.compress, bundle_path=args.bundle,
+                             layout_path=args.layout, layout_variant=args.variant, profile=profile,
+                             fragments=args.fragment_cache, fragment_dir=args.fragment_dir)
+    except (OSError, ValueError, FontError) as e:
+        print(f"Error: {e}")
+        return 1
+    print_batch_stats(stats)
+    if fragments:
+        print_fragment_stats(profile.fragments)
+    if profile is not None:
+        if args.timings or args.profile_slowest:
+            print_stage_table(profile)
+        try:
+            if args.metrics_json:
+                profile.write_json(args.metrics_json)
+            if args.metrics_prom:
+                profile.write_prometheus(args.metrics_prom)
+        except OSError as e:
+            print(f"Error writing metrics: {e}")
+            return 1
+    if args.bundle:
+        print(f"Bundle: {args.bundle} ({os.path.getsize(args.bundle):,} bytes)")
+    return 1 if stats['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
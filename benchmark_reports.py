@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+"""
+Report Rendering Benchmark
+报表渲染性能基准
+
+Synthesizes production orders following JSON_SCHEMA_DOCUMENTATION.md with
+1 to 10,000 rows per section, then measures the time and peak memory of each
+generate_*_rows function, of the complete render_html_report() call and of
+schema validation with validate_order().
+
+Every value is HTML-escaped.  The plain benchmarks use ERP-like text without
+special characters, the common case.  Each row benchmark is timed together
+with two references on the same rows: "-original", the hand-written row
+loops of generate_html_report.py from before escaping, and "-unescaped",
+the compiled rows without the escaping check.  Escaping must not slow the
+row loops measurably, so a row benchmark more than --escape-threshold times
+slower than the original loops fails the run.  The "-escaped" benchmarks run
+the same renderers on an order where the first row of every section contains
+'<' and '&'.
+
+Results are written as JSON and can be compared against a stored baseline to
+catch regressions.
+
+Usage / 使用方法:
+    python3 benchmark_reports.py -o bench.json
+    python3 benchmark_reports.py --baseline bench.json --threshold 1.25
+    python3 benchmark_reports.py --sizes 1 100 1000 --escape-threshold 1.05
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+
+from generate_html_report import (
+    generate_auxiliary_materials_rows,
+    generate_post_processing_rows,
+    generate_printing_rows,
+    generate_product_rows,
+    generate_publishing_rows,
+    generate_raw_materials_rows,
+    render_html_report,
+)
+from order_schema import validate_order
+from report_layout import load_layout
+
+DEFAULT_SIZES = (1, 10, 100, 1000, 10000)
+DEFAULT_THRESHOLD = 1.25
+# Slowdown against the original row loops still within timing noise
+DEFAULT_ESCAPE_THRESHOLD = 1.05
+ESCAPED_SUFFIX = '-escaped'
+UNESCAPED_SUFFIX = '-unescaped'
+ORIGINAL_SUFFIX = '-original'
+MIN_MEASURE_SECONDS = 0.2
+REPEATS = 3
+# Alternating rounds of a benchmark and its references
+PAIRED_ROUNDS = 12
+
+# (benchmark name, function, argument taken from the order)
+SECTION_BENCHMARKS = (
+    ('orderDetails', generate_product_rows, lambda order: order['orderDetails']),
+    ('rawMaterials', generate_raw_materials_rows, lambda order: order['rawMaterials']),
+    ('publishing', generate_publishing_rows, lambda order: order['publishing']),
+    ('printing', generate_printing_rows, lambda order: order['printing']),
+    ('postProcessing', generate_post_processing_rows, lambda order: order['postProcessing']),
+    ('auxiliaryMaterials', generate_auxiliary_materials_rows, lambda order: order['auxiliaryMaterials']),
+    ('total', render_html_report, lambda order: order),
+    ('validate', validate_order, lambda order: order),
+)
+
+# Table slot rendered by each row benchmark
+BENCHMARK_TABLES = {
+    'orderDetails': 'product_rows',
+    'rawMaterials': 'raw_materials_rows',
+    'publishing': 'publishing_rows',
+    'printing': 'printing_rows',
+    'postProcessing': 'post_processing_rows',
+    'auxiliaryMaterials': 'auxiliary_materials_rows',
+}
+
+def unescaped_rows(slot):
+    """Return a renderer of one table's rows without the escaping check, as a reference
+
+    It looks the table up like the generate_*_rows() functions do, so only
+    the check differs.
+    """
+    def render(arg):
+        table = load_layout().tables[slot]
+        items = arg if isinstance(arg, list) else arg.get(table.items_key, [])
+        return table._rows(items)
+    return render
+
+# The row loops of generate_html_report.py before escaping, kept as they were
+
+def original_product_rows(order_details):
+    rows = []
+    for idx, item in enumerate(order_details, 1):
+        product_name = item.get('productName', '')
+        description = item.get('productDescription', '')
+        specification = item.get('specification', '')
+        quantity = item.get('orderQuantity', 0)
+
+        # Combine product name and description
+        full_description = f"{product_name}"
+        if description:
+            full_description += f"<br>{description}"
+        if specification:
+            full_description += f"<br>{specification}"
+
+        row = f"""
+        <tr>
+            <td>{idx}</td>
+            <td>{item.get('materialCode', '')}</td>
+            <td>{full_description}</td>
+            <td>自定义成品</td>
+            <td>{quantity}</td>
+            <td></td>
+            <td></td>
+            <td></td>
+        </tr>"""
+        rows.append(row)
+
+    return '\n'.join(rows)
+
+def original_raw_materials_rows(raw_materials):
+    rows = []
+    specifications = raw_materials.get('specifications', [])
+
+    for spec in specifications:
+        row = f"""
+        <tr>
+            <td>{spec.get('partName', '')}</td>
+            <td>{spec.get('materialDescription', '')}</td>
+            <td>{spec.get('orderSpec', '')}</td>
+            <td>{spec.get('quantity', '')}</td>
+            <td>{spec.get('workingSize', '')}</td>
+            <td></td>
+            <td>{spec.get('totalQuantity', '')}</td>
+            <td></td>
+            <td>{spec.get('totalSheets', '')}</td>
+            <td></td>
+        </tr>"""
+        rows.append(row)
+
+    return '\n'.join(rows)
+
+def original_publishing_rows(publishing):
+    rows = []
+    details = publishing.get('details', [])
+
+    for detail in details:
+        row = f"""
+        <tr>
+            <td>{detail.get('partName', '')}</td>
+            <td>{detail.get('total', '')}</td>
+            <td>{detail.get('requirement', '')}</td>
+            <td>{detail.get('version', '')}</td>
+            <td>{detail.get('total', '')}</td>
+            <td>{detail.get('size', '')}</td>
+        </tr>"""
+        rows.append(row)
+
+    return '\n'.join(rows)
+
+def original_printing_rows(printing):
+    rows = []
+    details = printing.get('details', [])
+
+    for detail in details:
+        row = f"""
+        <tr>
+            <td>{detail.get('partName', '')}</td>
+            <td>{detail.get('total', '')}</td>
+            <td>{detail.get('frontColor', '')}</td>
+            <td>{detail.get('backColor', '')}</td>
+            <td></td>
+            <td></td>
+            <td>HP-INDIGO120K</td>
+        </tr>"""
+        rows.append(row)
+
+    return '\n'.join(rows)
+
+def original_post_processing_rows(post_processing):
+    rows = []
+    processes = post_processing.get('processes', [])
+
+    for process in processes:
+        row = f"""
+        <tr>
+            <td>{process.get('partName', '')}</td>
+            <td>{process.get('process', '')}</td>
+            <td></td>
+            <td>{process.get('requirements', '')}</td>
+            <td></td>
+            <td></td>
+            <td></td>
+            <td>{process.get('supervisor', '')}</td>
+            <td></td>
+        </tr>"""
+        rows.append(row)
+
+    return '\n'.join(rows)
+
+def original_auxiliary_materials_rows(auxiliary_materials):
+    rows = []
+    materials = auxiliary_materials.get('materials', [])
+
+    for material in materials:
+        row = f"""
+        <tr>
+            <td>{material.get('partName', '')}</td>
+            <td>{material.get('materialCode', '')}</td>
+            <td>{material.get('materialName', '')}</td>
+            <td>{material.get('specification', '')}</td>
+            <td>{material.get('unit', '')}</td>
+            <td>{material.get('quantity', '')}</td>
+            <td>{material.get('remarks', '')}</td>
+            <td>{material.get('unitArea', '')}</td>
+            <td></td>
+        </tr>"""
+        rows.append(row)
+
+    return '\n'.join(rows)
+
+ORIGINAL_RENDERERS = {
+    'orderDetails': original_product_rows,
+    'rawMaterials': original_raw_materials_rows,
+    'publishing': original_publishing_rows,
+    'printing': original_printing_rows,
+    'postProcessing': original_post_processing_rows,
+    'auxiliaryMaterials': original_auxiliary_materials_rows,
+}
+
+# Row benchmark -> its references by suffix, timed alongside it on the same rows
+REFERENCE_RENDERERS = {name: ((ORIGINAL_SUFFIX, ORIGINAL_RENDERERS[name]), (UNESCAPED_SUFFIX, unescaped_rows(slot)))
+                       for name, slot in BENCHMARK_TABLES.items()}
+
+# The same renderers on an order with special characters, see synthesize_order()
+ESCAPED_BENCHMARKS = tuple((name + ESCAPED_SUFFIX, func, select)
+                           for name, func, select in SECTION_BENCHMARKS if name != 'validate')
+
+# Text with characters that must be escaped, as it sometimes arrives from the ERP
+SPECIAL_TEXT = '<加急> R&D'
+
+def synthesize_order(rows, special=False):
+    """Build a production order with the given number of rows in every section
+
+    With special=True the important notes and the part or product name in
+    the first row of every section contain characters that need escaping.
+    """
+    parts = ['主部件', '封面', '内页', '彩盒', '说明书']
+    order = {
+        'mainOrder': {
+            'companyName': '佛山智冠彩印包装有限公司',
+            'orderNumber': '2025/8/22 13:44',
+            'workOrderNumber': '250220000017505',
+            'customerOrderNumber': 'PO-2025-0001',
+            'importantNotes': '交付时需检查高光覆膜效果，色差控制在标准范围内',
+            'specialRemarks': '注意版面清洁',
+            'createdDate': '2025-08-22',
+            'createdTime': '13:44',
+        },
+        'orderDetails': [
+            {
+                'sequence': i + 1,
+                'materialCode': f"MAT-{i:05d}",
+                'productName': f"覆亮膜【高光尺寸】{300 + i % 100}x392-300g",
+                'productDescription': '单张艺效品',
+                'specification': f"{300 + i % 100}x392mm",
+                'orderQuantity': 1000 + i,
+                'productCode': f"P{i:06d}",
+                'unitPrice': 0.35,
+                'totalAmount': round(0.35 * (1000 + i), 2),
+                'unit': '张',
+            }
+            for i in range(rows)
+        ],
+        'rawMaterials': {
+            'specifications': [
+                {
+                    'partName': parts[i % len(parts)],
+                    'materialDescription': f"{157 + i % 3 * 100}g效率卡",
+                    'orderSpec': '530x750',
+                    'quantity': 500 + i,
+                    'workingSize': '530x750',
+                    'thickness': '0.157mm',
+                    'materialType': '艺术纸',
+                    'grammage': f"{157 + i % 3 * 100}g",
+                    'totalSheets': 520 + i,
+                    'totalQuantity': 500 + i,
+                }
+                for i in range(rows)
+            ],
+        },
+        'publishing': {
+            'details': [
+                {
+                    'partName': parts[i % len(parts)],
+                    'quantity': 4,
+                    'requirement': '标准拼版，注意色彩校准',
+                    'version': 1 + i % 4,
+                    'total': 4,
+                    'size': '530x750',
+                }
+                for i in range(rows)
+            ],
+        },
+        'printing': {
+            'details': [
+                {
+                    'partName': parts[i % len(parts)],
+                    'quantity': 500 + i,
+                    'frontColor': '4C+专色金',
+                    'backColor': '1C黑',
+                    'unitPrice': 520 + i,
+                    'total': 520 + i,
+                }
+                for i in range(rows)
+            ],
+            'specialRequirements': '注意版面清洁',
+        },
+        'postProcessing': {
+            'processes': [
+                {
+                    'partName': parts[i % len(parts)],
+                    'process': ['覆膜', '模切', '粘盒', '烫金'][i % 4],
+                    'quantity': 500 + i,
+                    'requirements': '高光覆膜，无气泡',
+                    'isOutsourced': i % 5 == 0,
+                    'unitPrice': 500 + i,
+                    'actualProduction': 0,
+                    'supervisor': '张师傅',
+                    'total': 500 + i,
+                }
+                for i in range(rows)
+            ],
+        },
+        'auxiliaryMaterials': {
+            'materials': [
+                {
+                    'partName': parts[i % len(parts)],
+                    'materialCode': f"FILM-{i:04d}",
+                    'materialName': '高光覆膜胶膜',
+                    'specification': '0.012mm厚度',
+                    'unit': '㎡',
+                    'quantity': 2.5 + i,
+                    'remarks': '高透明度',
+                    'unitArea': 0.83,
+                    'total': 2.5 + i,
+                }
+                for i in range(rows)
+            ],
+        },
+        'footer': {
+            'approver': '老杜',
+            'reviewer': '小莫',
+            'businessUnit': '小陈',
+        },
+    }
+    if special:
+        order['mainOrder']['importantNotes'] += SPECIAL_TEXT
+        rows_of_sections = [
+            order['orderDetails'], order['rawMaterials']['specifications'], order['publishing']['details'],
+            order['printing']['details'], order['postProcessing']['processes'],
+            order['auxiliaryMaterials']['materials'],
+        ]
+        for section_rows in rows_of_sections:
+            if section_rows:
+                first = section_rows[0]
+                key = 'productName' if 'productName' in first else 'partName'
+                first[key] += SPECIAL_TEXT
+    return order
+
+def measure_time(func, arg):
+    """Return the best time per call in seconds"""
+    timer = timeit.Timer(lambda: func(arg))
+    number, elapsed = timer.autorange()
+    if elapsed < MIN_MEASURE_SECONDS:
+        number = max(number, int(number * MIN_MEASURE_SECONDS / max(elapsed, 1e-9)))
+    return min(timer.repeat(REPEATS, number)) / number
+
+def measure_together(funcs, arg):
+    """Return the best time per call of each function, timed in alternating rounds
+
+    All of them see the same load of the machine, so their ratios stay
+    meaningful on a busy host where separate runs differ by more than the
+    ratios themselves.
+    """
+    timers = [timeit.Timer(lambda func=func: func(arg)) for func in funcs]
+    number, elapsed = timers[0].autorange()
+    target = MIN_MEASURE_SECONDS / 4
+    if elapsed < target:
+        number = max(number, int(number * target / max(elapsed, 1e-9)))
+    best = [float('inf')] * len(timers)
+    for _ in range(PAIRED_ROUNDS):
+        for position, timer in enumerate(timers):
+            best[position] = min(best[position], timer.timeit(number))
+    return [seconds / number for seconds in best]
+
+def measure_peak_memory(func, arg):
+    """Return the peak memory allocated during one call, in bytes"""
+    tracemalloc.start()
+    try:
+        func(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def run_benchmarks(sizes=DEFAULT_SIZES):
+    """Run every section benchmark at every size and return the result records"""
+    results = []
+    for rows in sizes:
+        runs = ((synthesize_order(rows), SECTION_BENCHMARKS),
+                (synthesize_order(rows, special=True), ESCAPED_BENCHMARKS))
+        for order, benchmarks in runs:
+            for name, func, select in benchmarks:
+                arg = select(order)
+                func(arg)  # warm up caches such as the QR code
+                references = REFERENCE_RENDERERS.get(name)
+                if references is None:
+                    measured = [(name, func, measure_time(func, arg))]
+                else:
+                    timed = [(name, func)] + [(name + suffix, reference) for suffix, reference in references]
+                    seconds = measure_together([reference for _, reference in timed], arg)
+                    measured = [(label, reference, time) for (label, reference), time in zip(timed, seconds)]
+                for label, timed, seconds in measured:
+                    peak = measure_peak_memory(timed, arg)
+                    results.append({
+                        'benchmark': label,
+                        'rows': rows,
+                        'seconds': seconds,
+                        'peak_bytes': peak,
+                    })
+                    print(f"{label:<27} rows={rows:<6} {seconds * 1e3:10.3f} ms  peak {peak / 1024:10.1f} KiB")
+    return results
+
+def escape_overhead(results, suffix=UNESCAPED_SUFFIX):
+    """Return {benchmark, rows, ratio} records of the row rendering time over a reference's"""
+    references = {(r['benchmark'][:-len(suffix)], r['rows']): r['seconds']
+                  for r in results if r['benchmark'].endswith(suffix)}
+    overhead = []
+    for result in results:
+        reference = references.get((result['benchmark'], result['rows']))
+        if reference:
+            overhead.append({'benchmark': result['benchmark'], 'rows': result['rows'],
+                             'ratio': round(result['seconds'] / reference, 4)})
+    return overhead
+
+def compare_to_baseline(results, baseline, threshold):
+    """Return a list of (benchmark, rows, metric, ratio) entries that regressed"""
+    previous = {(r['benchmark'], r['rows']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get((result['benchmark'], result['rows']))
+        if old is None:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            if old[metric] > 0:
+                ratio = result[metric] / old[metric]
+                if ratio > threshold:
+                    regressions.append((result['benchmark'], result['rows'], metric, ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark report row rendering")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="rows per section to benchmark")
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="compare against a previous results file")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown ratio that counts as a regression")
+    parser.add_argument('--escape-threshold', type=float, default=DEFAULT_ESCAPE_THRESHOLD,
+                        help="slowdown of the escaped row loops over the original loops that fails the run "
+                             f"(default: {DEFAULT_ESCAPE_THRESHOLD})")
+    args = parser.parse_args()
+
+    document = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': run_benchmarks(args.sizes),
+    }
+    document['escape_overhead'] = escape_overhead(document['results'])
+    document['original_overhead'] = escape_overhead(document['results'], ORIGINAL_SUFFIX)
+    print("Escaping cost (escaped rows / original loops, escaped rows / unescaped rows):")
+    for original, unescaped in zip(document['original_overhead'], document['escape_overhead']):
+        print(f"    {original['benchmark']:<23} rows={original['rows']:<6} "
+              f"{original['ratio']:.2f}x  {unescaped['ratio']:.2f}x")
+    slower = [entry for entry in document['original_overhead'] if entry['ratio'] > args.escape_threshold]
+    for entry in slower:
+        print(f"❌ {entry['benchmark']} rows={entry['rows']}: escaping makes the rows "
+              f"{entry['ratio']:.2f}x slower than the original loops")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(document['results'], baseline, args.threshold)
+        for name, rows, metric, ratio in regressions:
+            print(f"❌ {name} rows={rows}: {metric} {ratio:.2f}x baseline")
+        if regressions:
+            return 1
+        print(f"✅ No regressions above {args.threshold:.2f}x baseline")
+    if slower:
+        return 1
+    print(f"✅ Escaped rows within {args.escape_threshold:.2f}x of the original loops")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Combined Shift Report
+合并打印报表
+
+Renders many production orders into one paginated HTML document, so a whole
+shift's sheets go to the printer as a single job instead of one spool job
+per work order.  The stylesheet is included once for the whole document.
+
+Every order starts on a new A4 page (595x842pt, the .report-container
+geometry).  Each sheet is laid out inside a table whose footer group holds
+the sheet's signature footer, so browsers repeat it at the bottom of every
+printed page of that order.  Tables that overflow a page split between rows
+and repeat their header row.
+将多张工单合并为一个分页文档，整班一次打印。
+
+Usage / 使用方法:
+    python3 combined_report.py orders.jsonl -o shift.html
+    python3 combined_report.py orders/ -o shift.html --validate
+    python3 combined_report.py orders.jsonl -o shift.html --layout plants.json --variant plant-b
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from batch_render import iter_orders
+from generate_html_report import report_values
+from order_schema import describe_errors, validate_order
+from qr_code import configure_cache
+from report_layout import load_layout
+from template_engine import (
+    DEFAULT_STYLESHEET,
+    DEFAULT_TEMPLATE,
+    REPORT_SLOTS,
+    compile_template,
+    inline_stylesheet,
+)
+
+DOCUMENT_TITLE = '合并打印'
+
+# Rules layered over the single-report stylesheet
+COMBINED_STYLESHEET = """
+        /* 合并打印 - 每张工单独占一页起 */
+        @page {
+            size: 595pt 842pt;
+            margin: 20pt;
+        }
+
+        .sheet-page {
+            break-after: page;
+            page-break-after: always;
+        }
+
+        .sheet-page:last-of-type {
+            break-after: auto;
+            page-break-after: auto;
+        }
+
+        .sheet {
+            width: 595px;
+            margin: 0 auto 20px;
+            border-collapse: collapse;
+        }
+
+        .sheet > tbody > tr > td,
+        .sheet > tfoot > tr > td {
+            padding: 0;
+        }
+
+        .sheet .report-container {
+            min-height: 0;
+        }
+
+        .sheet .footer {
+            position: static;
+            margin-top: 10px;
+        }
+
+        .sheet thead {
+            display: table-header-group;
+        }
+
+        .sheet tfoot {
+            display: table-footer-group;
+        }
+
+        .sheet table tr {
+            break-inside: avoid;
+            page-break-inside: avoid;
+        }
+
+        @media print {
+            .sheet {
+                width: 100%;
+                margin: 0;
+            }
+        }
+"""
+
+BODY_PATTERN = re.compile(r'(<body[^>]*>)(.*)(</body>)', re.DOTALL | re.IGNORECASE)
+CONTAINER_PATTERN = re.compile(r'(<div class="report-container">)(.*)(</div>\s*)$', re.DOTALL)
+FOOTER_PATTERN = re.compile(r'\s*(?:<!--[^>]*-->\s*)?<div class="footer">.*?</div>', re.DOTALL)
+
+class CombinedTemplate:
+    """A report template split into the document shell and a repeatable sheet"""
+
+    def __init__(self, head, sheet, tail):
+        self.head = head
+        self.sheet = sheet
+        self.tail = tail
+        self.assets = sheet.assets
+
+def sheet_markup(body):
+    """Wrap one report body in a layout table that repeats its footer on every page"""
+    footer = ''
+    match = CONTAINER_PATTERN.search(body.strip())
+    if match:
+        inner = match.group(2)
+        found = FOOTER_PATTERN.search(inner)
+        if found:
+            footer = found.group(0).strip()
+            inner = inner[:found.start()] + inner[found.end():]
+        body = f"{match.group(1)}{inner}\n    </div>"
+    return (
+        '<div class="sheet-page">\n<table class="sheet">\n'
+        f"<tfoot><tr><td>{footer}</td></tr></tfoot>\n"
+        f"<tbody><tr><td>\n    {body.strip()}\n</td></tr></tbody>\n"
+        '</table>\n</div>\n'
+    )
+
+@lru_cache(maxsize=None)
+def load_combined_template(path=None, extra_slots=frozenset()):
+    """Load a report template and split it for combined output
+
+    The document head and closing tags are rendered once; the body is
+    compiled into the per-order sheet.  Raises ValueError for templates
+    without a <body> element or with unknown slots; extra_slots names
+    additional fields a report layout provides.
+    """
+    text = DEFAULT_TEMPLATE
+    if path is not None:
+        text = Path(path).read_text(encoding='utf-8')
+
+    match = BODY_PATTERN.search(text)
+    if match is None:
+        raise ValueError(f"Template {path} has no <body> element")
+
+    styles = inline_stylesheet(DEFAULT_STYLESHEET + COMBINED_STYLESHEET)
+    head = compile_template(text[:match.end(1)], {'head_styles': styles})
+    sheet = compile_template(sheet_markup(match.group(2)))
+    unknown = (head.slots | sheet.slots) - REPORT_SLOTS - extra_slots
+    if unknown:
+        raise ValueError(f"Unknown template slots in {path}: {', '.join(sorted(unknown))}")
+    if head.slots - {'work_order_number'}:
+        raise ValueError(f"Only work_order_number may be used outside <body> in {path}")
+
+    head_text = head.render({'work_order_number': DOCUMENT_TITLE})
+    return CombinedTemplate(head_text + '\n', sheet, '\n' + text[match.start(3):])
+
+def write_combined_report(sources, output_path, template_path=None, validate=False,
+                          layout_path=None, layout_variant=None):
+    """Render every order in sources into one document and return run statistics
+
+    Sheets are streamed to the file as they are rendered, so memory use does
+    not grow with the number of orders.  layout_path and layout_variant
+    select the field and column layout (see report_layout.py).
+    """
+    layout = load_layout(layout_path, layout_variant)
+    combined = load_combined_template(template_path or layout.template_path, layout.field_names - REPORT_SLOTS)
+    stats = {'orders': 0, 'failed': 0, 'bytes': 0, 'errors': []}
+    start = time.perf_counter()
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(combined.head)
+        for label, data, error in iter_orders(sources):
+            if error is None and validate:
+                problems = validate_order(data)
+                if problems:
+                    error = f"invalid order: {describe_errors(problems)}"
+            if error is None:
+                try:
+                    sheet = combined.sheet.render(report_values(data, combined.sheet, layout))
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+            if error is not None:
+                stats['failed'] += 1
+                stats['errors'].append((label, error))
+                continue
+            f.write(sheet)
+            stats['orders'] += 1
+        f.write(combined.tail)
+
+    stats['bytes'] = os.path.getsize(output_path)
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Render many production orders into one printable document")
+    parser.add_argument('sources', nargs='+',
+                        help="order files, directories, glob patterns, JSON-lines dumps, or '-' for stdin")
+    parser.add_argument('-o', '--output', default='combined_report.html', help="HTML file to write")
+    parser.add_argument('--template', help="report template with {{ slot }} markers (default: embedded layout)")
+    parser.add_argument('--layout', help="JSON layout file with field sources and table columns")
+    parser.add_argument('--variant', help="named variant inside the layout file, e.g. one per plant")
+    parser.add_argument('--qr-cache', help="directory for cached QR code SVGs")
+    parser.add_argument('--validate', action='store_true',
+                        help="skip orders that do not match the order schema")
+    args = parser.parse_args()
+
+    configure_cache(args.qr_cache)
+    try:
+        stats = write_combined_report(args.sources, args.output, args.template, args.validate,
+                                      args.layout, args.variant)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    for label, error in stats['errors']:
+        print(f"❌ {label}: {error}")
+    print(f"Combined document written: {args.output}")
+    print(f"Sheets: {stats['orders']}")
+    print(f"Failed orders: {stats['failed']}")
+    print(f"File size: {stats['bytes']:,} bytes")
+    print(f"Elapsed: {stats['seconds']:.3f} s")
+    return 1 if stats['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Section Fragment Cache
+报表板块片段缓存
+
+Memoises the rendered rows of each report table, keyed by the table's
+layout and a hash of the section's input.  Standard products are reordered
+daily with identical rawMaterials, publishing and auxiliaryMaterials
+sections, so their rows are rendered once and reused by later orders.
+
+Fragments live in an in-process LRU of a fixed number of entries and,
+optionally, in a cache directory shared by batch runs and services.  Every
+lookup is counted as a hit, a disk hit or a miss, together with the LRU
+evictions, to size the cache: a low hit rate with many evictions asks for
+a larger LRU, a low hit rate without evictions means the sections simply
+differ.  Delete the cache directory after changing the row markup code;
+layout changes are part of the key.
+相同板块只渲染一次，命中率统计用于调整缓存大小。
+
+Usage / 使用方法:
+    python3 batch_render.py orders/ -o reports/ --fragment-cache 4096
+    python3 batch_render.py orders/ -o reports/ --fragment-cache 4096 --fragment-dir cache/fragments
+    python3 report_server.py --fragment-cache 4096
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_FRAGMENTS = 1024
+# Part of the disk key; bump when the generated row markup changes
+FRAGMENT_FORMAT = 1
+COUNTERS = ('hits', 'disk_hits', 'misses', 'evictions')
+DIGEST_PROTOCOL = 5
+
+_cache = None
+
+def section_digest(items):
+    """Return a hash of a section's rows
+
+    Canonical JSON would cost more than rendering the rows.  pickle output
+    can be read back, so equal bytes always mean equal rows; equal rows built
+    differently (another key order, objects shared differently) may give
+    other bytes and merely miss the cache.  marshal is a little faster but
+    flags objects by their reference count, so merely holding another
+    reference to a row (a copy of the list) changed the hash.
+    """
+    return hashlib.sha256(pickle.dumps(items, DIGEST_PROTOCOL)).hexdigest()
+
+class FragmentCache:
+    """Rendered table rows keyed by table layout and input hash, least recently used evicted first"""
+
+    def __init__(self, maxsize=DEFAULT_FRAGMENTS, cache_dir=None):
+        self.maxsize = maxsize
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self._fragments = OrderedDict()
+
+    def rows(self, table, items):
+        """Return table.html(items), rendering the rows only on a miss"""
+        if not isinstance(items, (list, tuple)):
+            items = list(items)
+        key = (table.fingerprint, section_digest(items))
+        fragments = self._fragments
+        html = fragments.get(key)
+        if html is not None:
+            fragments.move_to_end(key)
+            self.counts['hits'] += 1
+            return html
+
+        html = self._load(key)
+        if html is None:
+            html = table.html(items)
+            self.counts['misses'] += 1
+            self._store(key, html)
+        else:
+            self.counts['disk_hits'] += 1
+        fragments[key] = html
+        if len(fragments) > self.maxsize:
+            fragments.popitem(last=False)
+            self.counts['evictions'] += 1
+        return html
+
+    def _path(self, key):
+        fingerprint, digest = key
+        name = hashlib.sha256(f"{FRAGMENT_FORMAT}:{fingerprint}:{digest}".encode('ascii')).hexdigest()
+        return self.cache_dir / (name[:32] + '.html')
+
+    def _load(self, key):
+        if self.cache_dir is None:
+            return None
+        try:
+            return self._path(key).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+    def _store(self, key, html):
+        if self.cache_dir is None:
+            return
+        # Write atomically so concurrent batch workers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(tmp_path, self._path(key))
+
+    def __len__(self):
+        return len(self._fragments)
+
+def configure_fragments(maxsize=0, cache_dir=None):
+    """Enable the fragment cache of this process, or disable it with maxsize 0 and no cache_dir
+
+    A cache directory alone enables an LRU of DEFAULT_FRAGMENTS entries in
+    front of it.
+    """
+    global _cache
+    _cache = None
+    if maxsize or cache_dir:
+        _cache = FragmentCache(maxsize or DEFAULT_FRAGMENTS, cache_dir)
+
+def current_cache():
+    """Return the fragment cache of this process, or None when it is off"""
+    return _cache
+
+@contextmanager
+def fragments_disabled():
+    """Turn this process's fragment cache off inside a with block, keeping its contents"""
+    global _cache
+    cache, _cache = _cache, None
+    try:
+        yield
+    finally:
+        _cache = cache
+
+def counting(func, *args):
+    """Call func(*args) and return (result, {counter: increase}) of this process's fragment cache"""
+    cache = _cache
+    if cache is None:
+        return func(*args), {}
+    before = dict(cache.counts)
+    result = func(*args)
+    return result, {name: cache.counts[name] - before[name] for name in COUNTERS}
+
+def fragment_stats(counts):
+    """Return the counters with the number of lookups and the hit rate added"""
+    lookups = sum(counts.get(name, 0) for name in ('hits', 'disk_hits', 'misses'))
+    hits = counts.get('hits', 0) + counts.get('disk_hits', 0)
+    stats = {name: counts.get(name, 0) for name in COUNTERS}
+    stats['lookups'] = lookups
+    stats['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+    return stats
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Machine Schedule Load Report
+机台排产负荷报表
+
+Reads the printing and post-processing sections of a batch of orders and
+totals the queued work per machine: printing details run on the press
+(PRINTING_PRESS), every postProcessing process runs on the workstation named
+by its process.  For each machine the report shows jobs, sheets and the
+estimated run time from per-machine speeds, overall and per order date, so a
+week of orders can be planned at a glance.  Outsourced processes are listed
+separately and do not load the in-house machines.
+
+Orders are streamed and folded into the totals in a single pass.  Machine
+speeds come from DEFAULT_SPEEDS or a JSON file passed with --speeds:
+    {"HP-INDIGO120K": {"sheets_per_hour": 4600, "setup_minutes": 15}}
+机台负荷与排产估算。
+
+Usage / 使用方法:
+    python3 machine_schedule.py orders/
+    python3 machine_schedule.py week.jsonl --from 2025-08-18 --to 2025-08-24 -o schedule.html
+    python3 machine_schedule.py week.jsonl --speeds speeds.json -o schedule.csv
+"""
+
+import argparse
+import csv
+import html
+import json
+import sys
+import time
+from pathlib import Path
+
+from batch_render import iter_orders
+from material_summary import format_quantity, order_date, round_total, section_rows, to_number
+from report_layout import PRINTING_PRESS
+
+# Sheets per hour and setup (make-ready) minutes per job
+DEFAULT_SPEEDS = {
+    PRINTING_PRESS: {'sheets_per_hour': 4600, 'setup_minutes': 15},
+    '覆膜': {'sheets_per_hour': 3000, 'setup_minutes': 20},
+    '模切': {'sheets_per_hour': 2500, 'setup_minutes': 30},
+    '烫金': {'sheets_per_hour': 2000, 'setup_minutes': 30},
+    'UV': {'sheets_per_hour': 3500, 'setup_minutes': 15},
+    '糊盒': {'sheets_per_hour': 6000, 'setup_minutes': 30},
+}
+
+UNDATED = '未排期'
+CSV_COLUMNS = ('stage', 'machine', 'date', 'jobs', 'sheets', 'hours')
+
+def load_speeds(path=None):
+    """Return the machine speed table, with entries from a JSON file overriding the defaults"""
+    speeds = {name: dict(speed) for name, speed in DEFAULT_SPEEDS.items()}
+    if path is None:
+        return speeds
+    with open(path, 'r', encoding='utf-8') as f:
+        overrides = json.load(f)
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{path} must map machine names to speeds")
+    for name, speed in overrides.items():
+        if not isinstance(speed, dict) or not isinstance(speed.get('sheets_per_hour'), (int, float)) \
+                or speed['sheets_per_hour'] <= 0:
+            raise ValueError(f"{path}: {name} needs a positive sheets_per_hour")
+        speeds[name] = {'sheets_per_hour': speed['sheets_per_hour'],
+                        'setup_minutes': speed.get('setup_minutes', 0)}
+    return speeds
+
+def _sheets(item):
+    """Sheets a printing or process row puts on its machine"""
+    sheets = to_number(item.get('total'))
+    if sheets is None:
+        sheets = to_number(item.get('quantity'))
+    return sheets
+
+class MachineLoad:
+    """Running per-machine queue totals over a stream of orders"""
+
+    def __init__(self, speeds):
+        self.speeds = speeds
+        # (stage, machine) -> {date: [jobs, sheets]}
+        self.load = {}
+        # process -> [jobs, sheets]
+        self.outsourced = {}
+        # (stage, machine) -> set of supervisors
+        self.supervisors = {}
+        self.orders = 0
+        self.skipped_values = 0
+
+    def _add(self, stage, machine, date, sheets):
+        days = self.load.get((stage, machine))
+        if days is None:
+            days = self.load[(stage, machine)] = {}
+        entry = days.get(date)
+        if entry is None:
+            entry = days[date] = [0, 0]
+        entry[0] += 1
+        entry[1] += sheets
+
+    def add(self, data):
+        """Fold one order's printing and post-processing work into the totals"""
+        self.orders += 1
+        date = order_date(data) or UNDATED
+
+        for item in section_rows(data.get('printing'), 'details'):
+            if not isinstance(item, dict):
+                continue
+            sheets = _sheets(item)
+            if sheets is None:
+                self.skipped_values += 1
+                continue
+            self._add('printing', PRINTING_PRESS, date, sheets)
+
+        for item in section_rows(data.get('postProcessing'), 'processes'):
+            if not isinstance(item, dict):
+                continue
+            sheets = _sheets(item)
+            if sheets is None:
+                self.skipped_values += 1
+                continue
+            process = str(item.get('process') or '') or '未指定'
+            if item.get('isOutsourced') is True:
+                entry = self.outsourced.setdefault(process, [0, 0])
+                entry[0] += 1
+                entry[1] += sheets
+                continue
+            self._add('postProcessing', process, date, sheets)
+            supervisor = item.get('supervisor')
+            if supervisor:
+                self.supervisors.setdefault(('postProcessing', process), set()).add(str(supervisor))
+
+    def hours(self, machine, jobs, sheets):
+        """Estimated run time in hours, or None for machines without a configured speed"""
+        speed = self.speeds.get(machine)
+        if speed is None:
+            return None
+        return jobs * speed.get('setup_minutes', 0) / 60 + sheets / speed['sheets_per_hour']
+
+    def dates(self):
+        """Return every order date in the queue, sorted"""
+        return sorted({date for days in self.load.values() for date in days})
+
+    def machines(self):
+        """Yield (stage, machine, jobs, sheets, hours, per-date totals) with printing first"""
+        order = sorted(self.load, key=lambda key: (key[0] != 'printing', key))
+        for stage, machine in order:
+            days = self.load[(stage, machine)]
+            jobs = sum(entry[0] for entry in days.values())
+            sheets = sum(entry[1] for entry in days.values())
+            per_date = {date: (entry[0], entry[1], self.hours(machine, entry[0], entry[1]))
+                        for date, entry in days.items()}
+            yield stage, machine, jobs, sheets, self.hours(machine, jobs, sheets), per_date
+
+def plan_schedule(sources, speeds, date_from=None, date_to=None):
+    """Stream every order in sources into a MachineLoad and return (load, stats)"""
+    load = MachineLoad(speeds)
+    stats = {'filtered': 0, 'errors': []}
+    start = time.perf_counter()
+    for label, data, error in iter_orders(sources):
+        if error is None and not isinstance(data, dict):
+            error = f"expected an order object, got {type(data).__name__}"
+        if error is not None:
+            stats['errors'].append((label, error))
+            continue
+        if date_from or date_to:
+            created = order_date(data)
+            if (date_from and created < date_from) or (date_to and created > date_to):
+                stats['filtered'] += 1
+                continue
+        load.add(data)
+    stats['seconds'] = time.perf_counter() - start
+    return load, stats
+
+def format_hours(hours):
+    return '-' if hours is None else f"{hours:,.1f}"
+
+def write_csv(load, output_path):
+    """Write one row per machine and order date, plus a total row per machine"""
+    with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for stage, machine, jobs, sheets, hours, per_date in load.machines():
+            for date in sorted(per_date):
+                day_jobs, day_sheets, day_hours = per_date[date]
+                writer.writerow((stage, machine, date, day_jobs, round_total(day_sheets),
+                                 '' if day_hours is None else round(day_hours, 2)))
+            writer.writerow((stage, machine, 'total', jobs, round_total(sheets),
+                             '' if hours is None else round(hours, 2)))
+        for process, (jobs, sheets) in sorted(load.outsourced.items()):
+            writer.writerow(('outsourced', process, 'total', jobs, round_total(sheets), ''))
+
+SCHEDULE_STYLESHEET = """
+        body { font-family: "Microsoft YaHei", "SimSun", sans-serif; font-size: 12px; margin: 20px; }
+        h1 { font-size: 18px; margin: 0 0 4px; }
+        h2 { font-size: 14px; margin: 18px 0 6px; }
+        .meta { color: #555; margin-bottom: 10px; }
+        table { border-collapse: collapse; }
+        th, td { border: 1px solid #000; padding: 3px 8px; }
+        th { background: #f0f0f0; }
+        td.num { text-align: right; }
+        td.none { color: #999; text-align: center; }
+"""
+
+STAGE_NAMES = {'printing': '印刷', 'postProcessing': '后工序'}
+
+def _row(cells):
+    return '<tr>' + ''.join(cells) + '</tr>'
+
+def _num(text):
+    return f'<td class="num">{text}</td>'
+
+def write_html(load, output_path, period=''):
+    """Write the schedule as a standalone HTML page"""
+    dates = load.dates()
+    machines = list(load.machines())
+
+    summary = [_row(f"<th>{h}</th>" for h in ('工序', '机台', '工单数', '张数', '预计工时 (h)', '机长'))]
+    for stage, machine, jobs, sheets, hours, _ in machines:
+        supervisors = '、'.join(sorted(load.supervisors.get((stage, machine), ())))
+        summary.append(_row([f"<td>{STAGE_NAMES[stage]}</td>", f"<td>{html.escape(machine)}</td>",
+                             _num(f"{jobs:,}"), _num(format_quantity(sheets)), _num(format_hours(hours)),
+                             f"<td>{html.escape(supervisors)}</td>"]))
+    if not machines:
+        summary.append('<tr><td colspan="6" class="none">无</td></tr>')
+
+    daily = [_row(['<th>机台</th>'] + [f"<th>{html.escape(date)}</th>" for date in dates])]
+    for stage, machine, _, _, _, per_date in machines:
+        cells = [f"<td>{html.escape(machine)}</td>"]
+        for date in dates:
+            if date in per_date:
+                cells.append(_num(format_hours(per_date[date][2])))
+            else:
+                cells.append('<td class="none">·</td>')
+        daily.append(_row(cells))
+
+    outsourced = [_row(f"<th>{h}</th>" for h in ('工序', '工单数', '张数'))]
+    for process, (jobs, sheets) in sorted(load.outsourced.items()):
+        outsourced.append(_row([f"<td>{html.escape(process)}</td>", _num(f"{jobs:,}"),
+                                _num(format_quantity(sheets))]))
+    if not load.outsourced:
+        outsourced.append('<tr><td colspan="3" class="none">无</td></tr>')
+
+    unknown = sorted({machine for _, machine, _, _, hours, _ in machines if hours is None})
+    meta = f"工单数 Orders: {load.orders:,}"
+    if period:
+        meta += f" · 日期 Period: {html.escape(period)}"
+    if unknown:
+        meta += f" · 未配置速度 No speed configured: {html.escape('、'.join(unknown))}"
+    newline = '\n'
+    document = f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <title>机台排产负荷</title>
+    <style>{SCHEDULE_STYLESHEET}    </style>
+</head>
+<body>
+<h1>机台排产负荷 Machine Schedule</h1>
+<div class="meta">{meta}</div>
+<h2>机台负荷 Machine Load</h2>
+<table>
+{newline.join(summary)}
+</table>
+<h2>每日工时 Hours per Order Date</h2>
+<table>
+{newline.join(daily)}
+</table>
+<h2>外发 Outsourced</h2>
+<table>
+{newline.join(outsourced)}
+</table>
+</body>
+</html>
+"""
+    Path(output_path).write_text(document, encoding='utf-8')
+
+def print_schedule(load):
+    """Print the per-machine totals as tab separated text"""
+    print('stage\tmachine\tjobs\tsheets\thours')
+    for stage, machine, jobs, sheets, hours, _ in load.machines():
+        print(f"{stage}\t{machine}\t{jobs}\t{format_quantity(sheets)}\t{format_hours(hours)}")
+    for process, (jobs, sheets) in sorted(load.outsourced.items()):
+        print(f"outsourced\t{process}\t{jobs}\t{format_quantity(sheets)}\t-")
+
+def main():
+    parser = argparse.ArgumentParser(description="Machine load and run-time estimate across production orders")
+    parser.add_argument('sources', nargs='+',
+                        help="order files, directories, glob patterns, JSON-lines dumps, or '-' for stdin")
+    parser.add_argument('-o', '--output', action='append', default=[],
+                        help="write the schedule to a .html or .csv file (repeatable; default: print)")
+    parser.add_argument('--speeds', help="JSON file of per-machine sheets_per_hour and setup_minutes")
+    parser.add_argument('--from', dest='date_from', help="earliest createdDate to include (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='date_to', help="latest createdDate to include (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    for output in args.output:
+        if Path(output).suffix.lower() not in ('.html', '.csv'):
+            print(f"Error: output must end in .html or .csv: {output}")
+            return 1
+    try:
+        speeds = load_speeds(args.speeds)
+    except (OSError, ValueError) as e:
+        print(f"Error loading speeds: {e}")
+        return 1
+
+    load, stats = plan_schedule(args.sources, speeds, args.date_from, args.date_to)
+    for label, error in stats['errors']:
+        print(f"❌ {label}: {error}", file=sys.stderr)
+
+    period = ' – '.join(d for d in (args.date_from, args.date_to) if d)
+    try:
+        for output in args.output:
+            if Path(output).suffix.lower() == '.csv':
+                write_csv(load, output)
+            else:
+                write_html(load, output, period)
+            print(f"Schedule written: {output}", file=sys.stderr)
+    except OSError as e:
+        print(f"Error: {e}")
+        return 1
+    if not args.output:
+        print_schedule(load)
+
+    print(f"Orders: {load.orders} ({stats['filtered']} outside the date range, "
+          f"{len(stats['errors'])} unreadable)", file=sys.stderr)
+    if load.skipped_values:
+        print(f"Rows without a sheet count skipped: {load.skipped_values}", file=sys.stderr)
+    print(f"Elapsed: {stats['seconds']:.3f} s", file=sys.stderr)
+    return 1 if stats['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Material Requirement Summary
+物料需求汇总
+
+Totals paper and auxiliary material consumption across many production
+orders for purchasing.  Raw material sheets (rawMaterials.specifications[]
+.totalSheets) are summed per materialDescription and grammage, auxiliary
+materials (auxiliaryMaterials.materials[].quantity) per materialCode.
+
+Orders are streamed one at a time and folded into the running totals in a
+single pass, so memory grows with the number of distinct materials, not
+with the number of orders.  The summary is written as HTML or CSV.
+汇总多张工单的纸张和辅料用量，供采购使用。
+
+Usage / 使用方法:
+    python3 material_summary.py orders/
+    python3 material_summary.py archive/2025-08.jsonl -o summary.html -o summary.csv
+    python3 material_summary.py archive/ --from 2025-08-22 --to 2025-08-22 -o today.csv
+"""
+
+import argparse
+import csv
+import html
+import math
+import sys
+import time
+from pathlib import Path
+
+from batch_render import iter_orders
+
+SHEET_UNIT = '张'
+CSV_COLUMNS = ('section', 'code', 'name', 'specification', 'unit', 'total', 'orders')
+
+def to_number(value):
+    """Return value as an int or float, or None if it is not a finite number
+
+    float() also accepts 'nan', 'inf' and overflowing values such as '1e400'
+    (and JSON may hold NaN and Infinity); one of them would turn every total
+    it is added to into nan or inf.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, str):
+        try:
+            number = float(value.replace(',', ''))
+        except ValueError:
+            return None
+        if not math.isfinite(number):
+            return None
+        return int(number) if number.is_integer() else number
+    return None
+
+def section_rows(section, list_key):
+    """Return the row list of an order section, or an empty list"""
+    if not isinstance(section, dict):
+        return []
+    rows = section.get(list_key)
+    return rows if isinstance(rows, list) else []
+
+def order_date(data):
+    """Return an order's mainOrder.createdDate, or '' if it has none"""
+    main_order = data.get('mainOrder')
+    return str(main_order.get('createdDate') or '') if isinstance(main_order, dict) else ''
+
+def round_total(value):
+    """Round away float summation noise; integral totals become ints"""
+    if isinstance(value, float):
+        value = round(value, 6)
+        if value.is_integer():
+            return int(value)
+    return value
+
+def format_quantity(value):
+    """Format a total with thousands separators and at most three decimals"""
+    if isinstance(value, int):
+        return f"{value:,}"
+    return f"{value:,.3f}".rstrip('0').rstrip('.')
+
+class MaterialSummary:
+    """Running material totals over a stream of orders"""
+
+    def __init__(self):
+        # (materialDescription, grammage) -> [total sheets, order count]
+        self.raw = {}
+        # materialCode -> [name, specification, unit, total quantity, order count]
+        self.auxiliary = {}
+        self.orders = 0
+        self.skipped_values = 0
+
+    def add(self, data):
+        """Fold one order into the totals"""
+        self.orders += 1
+        seen = set()
+        for item in section_rows(data.get('rawMaterials'), 'specifications'):
+            if not isinstance(item, dict):
+                continue
+            sheets = to_number(item.get('totalSheets'))
+            if sheets is None:
+                self.skipped_values += 1
+                continue
+            key = (str(item.get('materialDescription') or ''), str(item.get('grammage') or ''))
+            entry = self.raw.get(key)
+            if entry is None:
+                entry = self.raw[key] = [0, 0]
+            entry[0] += sheets
+            if ('raw', key) not in seen:
+                seen.add(('raw', key))
+                entry[1] += 1
+
+        for item in section_rows(data.get('auxiliaryMaterials'), 'materials'):
+            if not isinstance(item, dict):
+                continue
+            quantity = to_number(item.get('quantity'))
+            if quantity is None:
+                self.skipped_values += 1
+                continue
+            code = str(item.get('materialCode') or '')
+            entry = self.auxiliary.get(code)
+            if entry is None:
+                entry = self.auxiliary[code] = [str(item.get('materialName') or ''),
+                                                str(item.get('specification') or ''),
+                                                str(item.get('unit') or ''), 0, 0]
+            entry[3] += quantity
+            if ('aux', code) not in seen:
+                seen.add(('aux', code))
+                entry[4] += 1
+
+    def rows(self):
+        """Yield (section, code, name, specification, unit, total, orders) in a stable order"""
+        for (description, grammage), (sheets, orders) in sorted(self.raw.items()):
+            yield ('rawMaterials', '', description, grammage, SHEET_UNIT, round_total(sheets), orders)
+        for code, (name, specification, unit, quantity, orders) in sorted(self.auxiliary.items()):
+            yield ('auxiliaryMaterials', code, name, specification, unit, round_total(quantity), orders)
+
+def summarize(sources, date_from=None, date_to=None):
+    """Stream every order in sources into a MaterialSummary and return (summary, stats)
+
+    date_from and date_to limit the run to orders whose mainOrder.createdDate
+    falls in the inclusive range.
+    """
+    summary = MaterialSummary()
+    stats = {'filtered': 0, 'errors': []}
+    start = time.perf_counter()
+    for label, data, error in iter_orders(sources):
+        if error is None and not isinstance(data, dict):
+            error = f"expected an order object, got {type(data).__name__}"
+        if error is not None:
+            stats['errors'].append((label, error))
+            continue
+        if date_from or date_to:
+            created = order_date(data)
+            if (date_from and created < date_from) or (date_to and created > date_to):
+                stats['filtered'] += 1
+                continue
+        summary.add(data)
+    stats['seconds'] = time.perf_counter() - start
+    return summary, stats
+
+def write_csv(summary, output_path):
+    """Write the summary as one CSV table with a section column"""
+    with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        writer.writerows(summary.rows())
+
+SUMMARY_STYLESHEET = """
+        body { font-family: "Microsoft YaHei", "SimSun", sans-serif; font-size: 12px; margin: 20px; }
+        h1 { font-size: 18px; margin: 0 0 4px; }
+        h2 { font-size: 14px; margin: 18px 0 6px; }
+        .meta { color: #555; margin-bottom: 10px; }
+        table { border-collapse: collapse; min-width: 480px; }
+        th, td { border: 1px solid #000; padding: 3px 8px; }
+        th { background: #f0f0f0; }
+        td.num { text-align: right; }
+"""
+
+def _table(headers, rows):
+    """Build an HTML table; cells of numeric columns are right aligned"""
+    head = ''.join(f"<th>{html.escape(h)}</th>" for h in headers)
+    body = []
+    for row in rows:
+        cells = []
+        for value in row:
+            if isinstance(value, (int, float)):
+                cells.append(f'<td class="num">{format_quantity(value)}</td>')
+            else:
+                cells.append(f"<td>{html.escape(value)}</td>")
+        body.append(f"<tr>{''.join(cells)}</tr>")
+    if not body:
+        body.append(f'<tr><td colspan="{len(headers)}">无</td></tr>')
+    return f"<table>\n<tr>{head}</tr>\n" + '\n'.join(body) + "\n</table>"
+
+def write_html(summary, output_path, period=''):
+    """Write the summary as a standalone HTML page"""
+    raw_rows = [(name, spec, total, orders) for section, _, name, spec, _, total, orders in summary.rows()
+                if section == 'rawMaterials']
+    aux_rows = [(code, name, spec, unit, total, orders) for section, code, name, spec, unit, total, orders
+                in summary.rows() if section == 'auxiliaryMaterials']
+    meta = f"工单数 Orders: {summary.orders:,}"
+    if period:
+        meta += f" · 日期 Period: {html.escape(period)}"
+    document = f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <title>物料需求汇总</title>
+    <style>{SUMMARY_STYLESHEET}    </style>
+</head>
+<body>
+<h1>物料需求汇总 Material Requirements</h1>
+<div class="meta">{meta}</div>
+<h2>原材 Raw Materials</h2>
+{_table(('材料规格及文名', '克数', '合计张数', '工单数'), raw_rows)}
+<h2>辅料 Auxiliary Materials</h2>
+{_table(('物料编码', '物料名称', '规格', '单位', '合计数量', '工单数'), aux_rows)}
+</body>
+</html>
+"""
+    Path(output_path).write_text(document, encoding='utf-8')
+
+def print_summary(summary):
+    """Print the totals as tab separated text"""
+    print('\t'.join(CSV_COLUMNS))
+    for row in summary.rows():
+        print('\t'.join(format_quantity(v) if isinstance(v, (int, float)) else v for v in row))
+
+def main():
+    parser = argparse.ArgumentParser(description="Total material requirements across many production orders")
+    parser.add_argument('sources', nargs='+',
+                        help="order files, directories, glob patterns, JSON-lines dumps, or '-' for stdin")
+    parser.add_argument('-o', '--output', action='append', default=[],
+                        help="write the summary to a .html or .csv file (repeatable; default: print)")
+    parser.add_argument('--from', dest='date_from', help="earliest createdDate to include (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='date_to', help="latest createdDate to include (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    for output in args.output:
+        if Path(output).suffix.lower() not in ('.html', '.csv'):
+            print(f"Error: output must end in .html or .csv: {output}")
+            return 1
+
+    summary, stats = summarize(args.sources, args.date_from, args.date_to)
+    for label, error in stats['errors']:
+        print(f"❌ {label}: {error}", file=sys.stderr)
+
+    period = ' – '.join(d for d in (args.date_from, args.date_to) if d)
+    try:
+        for output in args.output:
+            if Path(output).suffix.lower() == '.csv':
+                write_csv(summary, output)
+            else:
+                write_html(summary, output, period)
+            print(f"Summary written: {output}", file=sys.stderr)
+    except OSError as e:
+        print(f"Error: {e}")
+        return 1
+    if not args.output:
+        print_summary(summary)
+
+    print(f"Orders: {summary.orders} ({stats['filtered']} outside the date range, "
+          f"{len(stats['errors'])} unreadable)", file=sys.stderr)
+    print(f"Materials: {len(summary.raw)} raw, {len(summary.auxiliary)} auxiliary", file=sys.stderr)
+    if summary.skipped_values:
+        print(f"Non-numeric quantities skipped: {summary.skipped_values}", file=sys.stderr)
+    print(f"Elapsed: {stats['seconds']:.3f} s", file=sys.stderr)
+    return 1 if stats['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Order Archive Index
+订单归档索引
+
+Builds a persistent SQLite index over an archive of production order JSON
+(single orders, JSON-lines or concatenated-JSON dumps).  Orders are indexed
+on mainOrder.workOrderNumber, orderDetails[].materialCode,
+orderDetails[].productCode and mainOrder.createdDate, together with the file
+and byte offset of the record, so a lookup reads only the matching records
+instead of grepping the whole archive.
+
+Updates are incremental: only files whose size or modification time changed
+are re-read, and files that disappeared are dropped from the index.
+
+The archive keeps every revision of an order, and lookup lists them all.
+All revisions share one report file name, so render renders only the newest
+revision of each work order: the latest createdDate, and of equal dates the
+one stored last (by file path, then line).
+建立订单索引，按工单号、物料编码、产品代码、日期快速查找并生成报表。
+
+Usage / 使用方法:
+    python3 order_index.py update archive/
+    python3 order_index.py lookup --work-order 250220000017505
+    python3 order_index.py lookup --material "FILM-*" --from 2025-08-01 --to 2025-08-31
+    python3 order_index.py render --product GLF-357392-300 -o reports/
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from batch_render import (ORDER_FILE_SUFFIXES, duplicate_report, expand_source, render_options, render_order,
+                          report_filename)
+from order_stream import iter_file_records, iter_records
+
+DEFAULT_DB = 'orders_index.sqlite'
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    line INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    work_order TEXT,
+    created_date TEXT
+);
+CREATE TABLE IF NOT EXISTS codes (
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    order_id INTEGER NOT NULL REFERENCES orders(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS orders_file ON orders(file_id);
+CREATE INDEX IF NOT EXISTS orders_work_order ON orders(work_order);
+CREATE INDEX IF NOT EXISTS orders_created_date ON orders(created_date);
+CREATE INDEX IF NOT EXISTS codes_value ON codes(kind, value);
+CREATE INDEX IF NOT EXISTS codes_order ON codes(order_id);
+"""
+
+# Indexed code fields of each orderDetails item
+CODE_FIELDS = (('material', 'materialCode'), ('product', 'productCode'))
+
+def open_index(db_path=DEFAULT_DB):
+    """Open (and create if needed) the index database"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version not in (0, SCHEMA_VERSION):
+        conn.close()
+        raise ValueError(f"{db_path} was built by an incompatible version; delete it to rebuild")
+    conn.executescript(SCHEMA)
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    return conn
+
+def order_keys(data):
+    """Return (work_order, created_date, [(kind, code), ...]) for one order"""
+    main_order = data.get('mainOrder')
+    if not isinstance(main_order, dict):
+        main_order = {}
+    work_order = main_order.get('workOrderNumber')
+    created_date = main_order.get('createdDate')
+    codes = set()
+    details = data.get('orderDetails')
+    if isinstance(details, list):
+        for item in details:
+            if not isinstance(item, dict):
+                continue
+            for kind, field in CODE_FIELDS:
+                value = item.get(field)
+                if value not in (None, ''):
+                    codes.add((kind, str(value)))
+    return (str(work_order) if work_order not in (None, '') else None,
+            str(created_date) if created_date not in (None, '') else None,
+            sorted(codes))
+
+def index_file(conn, path, stat):
+    """(Re)index every order in one file and return (orders, errors)"""
+    conn.execute('DELETE FROM files WHERE path = ?', (path,))
+    file_id = conn.execute('INSERT INTO files (path, size, mtime_ns) VALUES (?, ?, ?)',
+                           (path, stat.st_size, stat.st_mtime_ns)).lastrowid
+    orders = errors = 0
+    for record in iter_file_records(path):
+        if record.error is not None:
+            errors += 1
+            continue
+        work_order, created_date, codes = order_keys(record.data)
+        order_id = conn.execute(
+            'INSERT INTO orders (file_id, line, offset, work_order, created_date) VALUES (?, ?, ?, ?, ?)',
+            (file_id, record.line, record.offset, work_order, created_date)).lastrowid
+        if codes:
+            conn.executemany('INSERT INTO codes (kind, value, order_id) VALUES (?, ?, ?)',
+                             [(kind, value, order_id) for kind, value in codes])
+        orders += 1
+    return orders, errors
+
+def update_index(conn, sources):
+    """Index new and changed files under sources and drop vanished files; return statistics"""
+    stats = {'files': 0, 'unchanged': 0, 'orders': 0, 'errors': 0, 'removed': 0}
+    known = {path: (size, mtime_ns) for path, size, mtime_ns in
+             conn.execute('SELECT path, size, mtime_ns FROM files')}
+    seen = set()
+
+    for source in sources:
+        for path in expand_source(source):
+            if path.suffix not in ORDER_FILE_SUFFIXES:
+                continue
+            key = str(path.resolve())
+            seen.add(key)
+            try:
+                stat = path.stat()
+            except OSError as e:
+                print(f"❌ Cannot read {path}: {e}")
+                continue
+            if known.get(key) == (stat.st_size, stat.st_mtime_ns):
+                stats['unchanged'] += 1
+                continue
+            try:
+                with conn:
+                    orders, errors = index_file(conn, key, stat)
+            except OSError as e:
+                print(f"❌ Cannot read {path}: {e}")
+                continue
+            stats['files'] += 1
+            stats['orders'] += orders
+            stats['errors'] += errors
+
+    # Drop files that were deleted from the archive
+    with conn:
+        for path in known.keys() - seen:
+            if not os.path.exists(path):
+                conn.execute('DELETE FROM files WHERE path = ?', (path,))
+                stats['removed'] += 1
+    return stats
+
+def _match(column, value, params):
+    """Return an SQL condition for value, treating '*' and '?' as wildcards"""
+    params.append(value)
+    if '*' in value or '?' in value:
+        return f"{column} GLOB ?"
+    return f"{column} = ?"
+
+def find_orders(conn, work_order=None, material=None, product=None, date_from=None, date_to=None, limit=None):
+    """Return (work_order, created_date, path, line, offset) rows matching every given criterion"""
+    conditions = []
+    params = []
+    if work_order:
+        conditions.append(_match('o.work_order', work_order, params))
+    for kind, value in (('material', material), ('product', product)):
+        if value:
+            condition = _match('value', value, params)
+            conditions.append(f"o.id IN (SELECT order_id FROM codes WHERE kind = '{kind}' AND {condition})")
+    if date_from:
+        conditions.append('o.created_date >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append('o.created_date <= ?')
+        params.append(date_to)
+
+    sql = ('SELECT o.work_order, o.created_date, f.path, o.line, o.offset '
+           'FROM orders o JOIN files f ON f.id = o.file_id')
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += ' ORDER BY o.created_date, o.work_order'
+    if limit:
+        sql += f' LIMIT {int(limit)}'
+    return conn.execute(sql, params).fetchall()
+
+def read_order(path, offset):
+    """Read the single order stored at a byte offset of an archive file"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        record = next(iter_records(f), None)
+    if record is None or record.error is not None:
+        raise ValueError(f"No order at byte offset {offset} of {path}; update the index")
+    return record.data
+
+def newest_revisions(matches):
+    """Keep the newest revision of each work order among find_orders() rows, in their order"""
+    newest = {}
+    for match in matches:
+        work_order, created_date, path, line, _ = match
+        if work_order is None:
+            continue
+        key = (created_date or '', path, line)
+        if work_order not in newest or key > newest[work_order][0]:
+            newest[work_order] = (key, match)
+    kept = {id(match) for _, match in newest.values()}
+    return [match for match in matches if match[0] is None or id(match) in kept]
+
+def add_query_arguments(parser):
+    parser.add_argument('--work-order', help="work order number ('*' and '?' are wildcards)")
+    parser.add_argument('--material', help="material code in orderDetails")
+    parser.add_argument('--product', help="product code in orderDetails")
+    parser.add_argument('--from', dest='date_from', help="earliest createdDate (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='date_to', help="latest createdDate (YYYY-MM-DD)")
+    parser.add_argument('--limit', type=int, help="return at most this many orders")
+
+def query(conn, args):
+    return find_orders(conn, args.work_order, args.material, args.product,
+                       args.date_from, args.date_to, args.limit)
+
+def main():
+    parser = argparse.ArgumentParser(description="Index and search an archive of production order JSON")
+    parser.add_argument('--db', default=DEFAULT_DB, help="index database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    update = commands.add_parser('update', help="index new or changed files")
+    update.add_argument('sources', nargs='+', help="order files, directories or glob patterns")
+
+    lookup = commands.add_parser('lookup', help="list matching orders")
+    add_query_arguments(lookup)
+
+    render = commands.add_parser('render', help="render matching orders")
+    add_query_arguments(render)
+    render.add_argument('-o', '--output-dir', default='reports', help="directory for the generated reports")
+    render.add_argument('--format', choices=('html', 'pdf'), default='html', help="output format")
+    args = parser.parse_args()
+
+    try:
+        conn = open_index(args.db)
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Error opening index: {e}")
+        return 1
+
+    start = time.perf_counter()
+    if args.command == 'update':
+        stats = update_index(conn, args.sources)
+        print(f"Indexed files: {stats['files']} ({stats['orders']} orders, {stats['errors']} malformed records)")
+        print(f"Unchanged files: {stats['unchanged']}")
+        print(f"Removed files: {stats['removed']}")
+        print(f"Elapsed: {time.perf_counter() - start:.3f} s")
+        return 0
+
+    matches = query(conn, args)
+    if args.command == 'lookup':
+        for work_order, created_date, path, line, _ in matches:
+            print(f"{work_order or '-'}\t{created_date or '-'}\t{path}:{line}")
+        print(f"{len(matches)} orders in {(time.perf_counter() - start) * 1e3:.1f} ms", file=sys.stderr)
+        return 0
+
+    revisions = len(matches)
+    matches = newest_revisions(matches)
+    Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    options = render_options(output_format=args.format)
+    claimed = {}
+    failed = 0
+    for work_order, _, path, line, offset in matches:
+        label = f"{path}:{line}"
+        try:
+            data = read_order(path, offset)
+            # Distinct work order numbers can still map to one file name, e.g. A/1 and A_1
+            error = duplicate_report(claimed, report_filename(data, label, '.' + args.format), label)
+            if error is not None:
+                raise ValueError(error)
+            output_path, _ = render_order(data, label, args.output_dir, options)
+            print(f"✅ {output_path}")
+        except (OSError, ValueError) as e:
+            failed += 1
+            print(f"❌ {path}:{line}: {e}")
+        except Exception as e:
+            # A malformed order (e.g. a null section) fails alone, as in batch_render.render_job
+            failed += 1
+            print(f"❌ {path}:{line}: {type(e).__name__}: {e}")
+    if revisions > len(matches):
+        print(f"Skipped {revisions - len(matches)} older revisions")
+    print(f"Rendered {len(matches) - failed} of {len(matches)} orders in "
+          f"{(time.perf_counter() - start) * 1e3:.1f} ms")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Order Revision Sheet
+工单修订对比单
+
+Compares two versions of a production order section by section
+(orderDetails, rawMaterials, publishing, printing, postProcessing,
+auxiliaryMaterials) and by its header fields, and writes a revision sheet
+with only what changed: changed fields with their old and new value, and
+for every changed section its table with added rows, removed rows struck
+through and changed cells highlighted.  Unchanged sections are left out,
+so a revised order is reprinted as one page instead of the whole report.
+
+Sections are compared as parsed data first, which stops at the first
+difference, so an update that touches one section costs one row diff and
+nothing is rendered for the others.  Rows are then matched by their printed
+cells, so a changed field that the report does not show is no change.
+
+The updated full report (--report) takes its section rows from a
+FragmentCache (fragment_cache.py).  Only the changed sections are rendered
+again when the cache already holds the previous version: in a long-running
+process that keeps one RevisionRenderer, or with --fragment-dir pointing at
+the cache directory of the batch runs (batch_render.py --fragment-dir) or
+of earlier revisions.  Without either, every section is rendered.
+按板块比较工单新旧版本，仅输出变更部分的修订单。
+
+Usage / 使用方法:
+    python3 order_revision.py old.json new.json -o revision.html
+    python3 order_revision.py old.json new.json -o revision.html --report updated.html
+    python3 order_revision.py old.json new.json --report updated.html --fragment-dir cache/fragments
+"""
+
+import argparse
+import difflib
+import sys
+from pathlib import Path
+
+from fragment_cache import FragmentCache
+from generate_html_report import load_json_data, report_values
+from report_layout import load_layout
+from template_engine import REPORT_SLOTS, escape_html, load_template
+
+# Unchanged rows shown around a change on the revision sheet
+CONTEXT_ROWS = 1
+PRODUCT_LABEL = '产品'
+
+REVISION_STYLESHEET = """
+        body { font-family: "Microsoft YaHei", "SimSun", sans-serif; font-size: 12px; margin: 20px; }
+        h1 { font-size: 18px; margin: 0 0 4px; }
+        h2 { font-size: 14px; margin: 18px 0 6px; }
+        .meta { color: #555; margin-bottom: 10px; }
+        table { border-collapse: collapse; min-width: 480px; }
+        th, td { border: 1px solid #000; padding: 3px 8px; }
+        th { background: #f0f0f0; }
+        tr.added td { background: #e3f6e3; }
+        tr.removed td { color: #888; text-decoration: line-through; }
+        tr.skipped td { color: #888; text-align: center; }
+        td.changed { background: #fff1a8; font-weight: bold; }
+        td.changed del { color: #888; font-weight: normal; }
+"""
+
+class OrderRevision:
+    """What changed between two versions of one order
+
+    fields lists (slot, old, new) for every changed header field and
+    sections maps the name of every changed table to its rows (see
+    diff_rows()).
+    """
+
+    def __init__(self, work_order, fields, sections):
+        self.work_order = work_order
+        self.fields = fields
+        self.sections = sections
+
+    @property
+    def changed(self):
+        return bool(self.fields or self.sections)
+
+def table_items(table, data):
+    """Return the row items of a table as a list; missing or malformed sections have none"""
+    items = table.items(data) if isinstance(data, dict) else []
+    return list(items) if isinstance(items, (list, tuple)) else []
+
+def diff_rows(table, old_items, new_items):
+    """Return (status, cells, old_cells) for the rows of a changed table
+
+    status is 'same', 'added', 'removed' or 'changed'.  Rows are matched by
+    their cells without the running number, so inserting a row does not mark
+    every following row as changed; a replaced block pairs its rows by
+    position and keeps the old cells to highlight the ones that differ.
+    """
+    old_cells = table.cells(old_items)
+    new_cells = table.cells(new_items)
+    index = table.index_columns
+    if index:
+        keys = lambda rows: [tuple(c for p, c in enumerate(row) if p not in index) for row in rows]
+    else:
+        keys = lambda rows: [tuple(row) for row in rows]
+    matcher = difflib.SequenceMatcher(None, keys(old_cells), keys(new_cells), autojunk=False)
+    rows = []
+    for operation, i1, i2, j1, j2 in matcher.get_opcodes():
+        if operation == 'equal':
+            rows.extend(('same', cells, None) for cells in new_cells[j1:j2])
+            continue
+        paired = min(i2 - i1, j2 - j1) if operation == 'replace' else 0
+        rows.extend(('changed', new_cells[j1 + k], old_cells[i1 + k]) for k in range(paired))
+        rows.extend(('removed', cells, None) for cells in old_cells[i1 + paired:i2])
+        rows.extend(('added', cells, None) for cells in new_cells[j1 + paired:j2])
+    return rows
+
+def diff_orders(old, new, layout=None):
+    """Compare two versions of an order field by field and section by section"""
+    if layout is None:
+        layout = load_layout()
+    old_fields = layout.field_values(old)
+    fields = [(slot, old_fields[slot], value) for slot, value in layout.field_values(new).items()
+              if old_fields[slot] != value]
+    sections = {}
+    for name, table in layout.tables.items():
+        old_items = table_items(table, old)
+        new_items = table_items(table, new)
+        if old_items != new_items:
+            rows = diff_rows(table, old_items, new_items)
+            if any(row[0] != 'same' for row in rows):
+                sections[name] = rows
+    main_order = new.get('mainOrder')
+    work_order = str(main_order.get('workOrderNumber') or '') if isinstance(main_order, dict) else ''
+    return OrderRevision(work_order, fields, sections)
+
+def _cell(text):
+    return escape_html(text).replace('\n', '<br>')
+
+def _revision_table(table, rows, context=CONTEXT_ROWS):
+    """Build the HTML table of one changed section; runs of unchanged rows are collapsed"""
+    head = ''.join(f"<th>{escape_html(header)}</th>" for header in table.headers)
+    shown = set()
+    for position, row in enumerate(rows):
+        if row[0] != 'same':
+            shown.update(range(position - context, position + context + 1))
+    skipped_row = '<tr class="skipped"><td colspan="{}">… 未变更 {} 行</td></tr>'
+    body = []
+    skipped = 0
+    for position, (status, cells, old_cells) in enumerate(rows):
+        if position not in shown:
+            skipped += 1
+            continue
+        if skipped:
+            body.append(skipped_row.format(len(table.headers), skipped))
+            skipped = 0
+        tds = []
+        for column, text in enumerate(cells):
+            if status == 'changed' and old_cells[column] != text:
+                tds.append(f'<td class="changed"><del>{_cell(old_cells[column])}</del> {_cell(text)}</td>')
+            else:
+                tds.append(f"<td>{_cell(text)}</td>")
+        body.append(f'<tr class="{status}">{"".join(tds)}</tr>')
+    if skipped:
+        body.append(skipped_row.format(len(table.headers), skipped))
+    if not body:
+        body.append(f'<tr><td colspan="{len(table.headers)}">无</td></tr>')
+    return f"<table>\n<tr>{head}</tr>\n" + '\n'.join(body) + "\n</table>"
+
+def revision_sheet(revision, layout=None):
+    """Return the revision sheet of an OrderRevision as a standalone HTML page"""
+    if layout is None:
+        layout = load_layout()
+    parts = []
+    if revision.fields:
+        rows = ''.join(f"<tr><td>{escape_html(slot)}</td><td>{_cell(str(old))}</td>"
+                       f'<td class="changed">{_cell(str(new))}</td></tr>\n'
+                       for slot, old, new in revision.fields)
+        parts.append(f"<h2>表头 Header</h2>\n<table>\n<tr><th>字段</th><th>原值</th><th>新值</th></tr>\n"
+                     f"{rows}</table>")
+    for name, rows in revision.sections.items():
+        table = layout.tables[name]
+        counts = {status: sum(1 for row in rows if row[0] == status) for status in ('added', 'removed', 'changed')}
+        summary = f"新增 {counts['added']} · 删除 {counts['removed']} · 修改 {counts['changed']}"
+        title = f"{table.label or PRODUCT_LABEL} {table.section or table.items_key}"
+        parts.append(f"<h2>{escape_html(title)}</h2>\n<div class=\"meta\">{summary}</div>\n"
+                     f"{_revision_table(table, rows)}")
+    if not parts:
+        parts.append('<div class="meta">无变更 No changes</div>')
+
+    unchanged = [layout.tables[name].label or PRODUCT_LABEL for name in layout.tables if name not in revision.sections]
+    meta = f"工单号 Work order: {escape_html(revision.work_order or '-')}"
+    if unchanged:
+        meta += f" · 未变更 Unchanged: {escape_html('、'.join(unchanged))}"
+    body = '\n'.join(parts)
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <title>工单修订单 {escape_html(revision.work_order)}</title>
+    <style>{REVISION_STYLESHEET}    </style>
+</head>
+<body>
+<h1>工单修订单 Revision Sheet</h1>
+<div class="meta">{meta}</div>
+{body}
+</body>
+</html>
+"""
+
+class RevisionRenderer:
+    """Diffs order versions and renders full reports from cached section fragments
+
+    Keep one instance for the life of a process: every report it renders
+    leaves its sections in the cache, so the report of the next revision of
+    that order renders only the sections that changed.
+    """
+
+    def __init__(self, template=None, layout=None, cache=None):
+        self.layout = layout if layout is not None else load_layout()
+        if template is None:
+            template = load_template(self.layout.template_path, extra_slots=self.layout.field_names - REPORT_SLOTS)
+        self.template = template
+        self.cache = cache if cache is not None else FragmentCache()
+
+    def revise(self, old, new):
+        """Return the OrderRevision between two versions of an order"""
+        return diff_orders(old, new, self.layout)
+
+    def sheet(self, revision):
+        return revision_sheet(revision, self.layout)
+
+    def report(self, data):
+        """Render the full report of an order, reusing cached section fragments"""
+        values = report_values(data, self.template, self.layout)
+        for name, table in self.layout.tables.items():
+            values[name] = lambda table=table: self._rows(table, data)
+        return self.template.render(values)
+
+    def _rows(self, table, data):
+        return self.cache.rows(table, table_items(table, data))
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a revision sheet with the changes between two versions of an order")
+    parser.add_argument('old', help="previous version of the order (JSON)")
+    parser.add_argument('new', help="revised version of the order (JSON)")
+    parser.add_argument('-o', '--output', default='revision.html', help="revision sheet to write")
+    parser.add_argument('--report', help="also write the full report of the revised order")
+    parser.add_argument('--template', help="report template for --report")
+    parser.add_argument('--layout', help="report layout JSON file (see report_layout.py)")
+    parser.add_argument('--variant', help="variant inside the layout file")
+    parser.add_argument('--fragment-dir',
+                        help="section rows cached by batch_render.py --fragment-dir or earlier revisions; "
+                             "--report renders only the sections not found there")
+    args = parser.parse_args()
+
+    old = load_json_data(args.old)
+    new = load_json_data(args.new)
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        print("Error: both versions must be JSON objects")
+        return 1
+    try:
+        layout = load_layout(args.layout, args.variant)
+        template = None
+        if args.report:
+            template = load_template(args.template or layout.template_path,
+                                     extra_slots=layout.field_names - REPORT_SLOTS)
+        cache = FragmentCache(cache_dir=args.fragment_dir) if args.fragment_dir else None
+        renderer = RevisionRenderer(template, layout, cache)
+        revision = renderer.revise(old, new)
+        Path(args.output).write_text(renderer.sheet(revision), encoding='utf-8')
+        if args.report:
+            Path(args.report).write_text(renderer.report(new), encoding='utf-8')
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    except Exception as e:
+        # A malformed order (e.g. a null section) fails the run, as in batch_render.render_job
+        print(f"Error: {type(e).__name__}: {e}")
+        return 1
+
+    print(f"Revision sheet: {args.output}")
+    print(f"Changed fields: {len(revision.fields)}")
+    for name, rows in revision.sections.items():
+        changes = sum(1 for row in rows if row[0] != 'same')
+        print(f"Changed section {layout.tables[name].section or layout.tables[name].items_key}: {changes} rows")
+    if not revision.changed:
+        print("No changes")
+    if args.report:
+        counts = renderer.cache.counts
+        print(f"Report: {args.report} ({counts['hits'] + counts['disk_hits']} sections reused, "
+              f"{counts['misses']} rendered)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
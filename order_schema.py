@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Production Order Schema Validator
+生产订单结构校验
+
+Checks orders against the structure described in JSON_SCHEMA_DOCUMENTATION.md.
+The schema below is written as a small subset of JSON Schema (type,
+properties, required, items, additionalProperties, minimum, pattern) and is
+compiled once into specialised check functions, so validating an order costs
+one exact type test per field.  Values must have the exact types json.load
+produces (dict, list, str, int, float, bool).  Every problem is reported with the
+JSON pointer of the offending value, e.g. /orderDetails/0/orderQuantity.
+
+Usage / 使用方法:
+    from order_schema import validate_order, format_error
+    for error in validate_order(data):
+        print(format_error(error))
+"""
+
+import re
+from collections import namedtuple
+
+ValidationError = namedtuple('ValidationError', 'pointer message')
+
+DATE_PATTERN = r'\d{4}-\d{2}-\d{2}'
+TIME_PATTERN = r'\d{2}:\d{2}'
+
+STRING = {'type': 'string'}
+NUMBER = {'type': 'number'}
+QUANTITY = {'type': 'number', 'minimum': 0}
+BOOLEAN = {'type': 'boolean'}
+DATE = {'type': 'string', 'pattern': DATE_PATTERN}
+TIME = {'type': 'string', 'pattern': TIME_PATTERN}
+
+# Column header labels; the keys differ between sections
+SUMMARY = {'type': 'object', 'additionalProperties': STRING}
+
+def _section(list_key, item_properties, **properties):
+    """Schema of a section holding a table summary, a required row list and free text fields"""
+    return {
+        'type': 'object',
+        'required': [list_key],
+        'properties': {
+            'summary': SUMMARY,
+            list_key: {'type': 'array', 'items': {'type': 'object', 'properties': item_properties}},
+            **properties,
+        },
+    }
+
+ORDER_SCHEMA = {
+    'type': 'object',
+    'required': ['mainOrder', 'orderDetails', 'rawMaterials', 'publishing', 'printing',
+                 'postProcessing', 'auxiliaryMaterials'],
+    'properties': {
+        'mainOrder': {
+            'type': 'object',
+            'required': ['workOrderNumber'],
+            'properties': {
+                'companyName': STRING,
+                'companyLogo': STRING,
+                'orderNumber': STRING,
+                'workOrderNumber': STRING,
+                'customerOrderNumber': STRING,
+                'qrcode': STRING,
+                'importantNotes': STRING,
+                'specialRemarks': STRING,
+                'createdDate': DATE,
+                'createdTime': TIME,
+                'status': STRING,
+                'priority': STRING,
+            },
+        },
+        'orderDetails': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['productName', 'orderQuantity'],
+                'properties': {
+                    'sequence': {'type': 'integer', 'minimum': 1},
+                    'materialCode': STRING,
+                    'productName': STRING,
+                    'productDescription': STRING,
+                    'specification': STRING,
+                    'orderQuantity': QUANTITY,
+                    'productCode': STRING,
+                    'unitPrice': QUANTITY,
+                    'totalAmount': QUANTITY,
+                    'unit': STRING,
+                },
+            },
+        },
+        'rawMaterials': _section('specifications', {
+            'partName': STRING,
+            'materialDescription': STRING,
+            'orderSpec': STRING,
+            'quantity': QUANTITY,
+            'workingSize': STRING,
+            'thickness': STRING,
+            'materialType': STRING,
+            'grammage': STRING,
+            'totalSheets': QUANTITY,
+            'totalQuantity': QUANTITY,
+        }),
+        'publishing': _section('details', {
+            'partName': STRING,
+            'quantity': QUANTITY,
+            'requirement': STRING,
+            'version': QUANTITY,
+            'total': QUANTITY,
+            'size': STRING,
+        }, remarks=STRING, layoutRequirements=STRING),
+        'printing': _section('details', {
+            'partName': STRING,
+            'quantity': QUANTITY,
+            'frontColor': STRING,
+            'backColor': STRING,
+            'unitPrice': QUANTITY,
+            'total': QUANTITY,
+        }, specialRequirements=STRING, colorRequirements=STRING, qualityStandards=STRING),
+        'postProcessing': _section('processes', {
+            'partName': STRING,
+            'process': STRING,
+            'quantity': QUANTITY,
+            'requirements': STRING,
+            'isOutsourced': BOOLEAN,
+            'unitPrice': QUANTITY,
+            'actualProduction': QUANTITY,
+            'supervisor': STRING,
+            'total': QUANTITY,
+        }),
+        'auxiliaryMaterials': _section('materials', {
+            'partName': STRING,
+            'materialCode': STRING,
+            'materialName': STRING,
+            'specification': STRING,
+            'unit': STRING,
+            'quantity': QUANTITY,
+            'remarks': STRING,
+            'unitArea': QUANTITY,
+            'total': QUANTITY,
+        }),
+        'footer': {
+            'type': 'object',
+            'properties': {
+                'approver': STRING,
+                'reviewer': STRING,
+                'businessUnit': STRING,
+                'customer': STRING,
+                'supervisor': STRING,
+                'approvalDate': DATE,
+                'reviewDate': DATE,
+            },
+        },
+        'metadata': {'type': 'object', 'additionalProperties': STRING},
+    },
+}
+
+def json_type_name(value):
+    """Return the JSON name of a Python value's type"""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, (int, float)):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, list):
+        return 'array'
+    if isinstance(value, dict):
+        return 'object'
+    return type(value).__name__
+
+def escape_pointer(key):
+    """Escape one JSON pointer reference token (RFC 6901)"""
+    return key.replace('~', '~0').replace('/', '~1')
+
+SCALAR_TYPES = {
+    'string': frozenset({str}),
+    'number': frozenset({int, float}),
+    'integer': frozenset({int}),
+    'boolean': frozenset({bool}),
+}
+
+# Placeholder for absent properties, distinct from a JSON null
+_MISSING = object()
+
+def _compile_scalar(schema):
+    """Return check(value, pointer, errors) for a string, number, integer or boolean schema"""
+    kind = schema['type']
+    if kind not in SCALAR_TYPES:
+        raise ValueError(f"Unsupported schema type: {kind}")
+    types = SCALAR_TYPES[kind]
+    minimum = schema.get('minimum')
+    pattern = schema.get('pattern')
+    matcher = re.compile(pattern).fullmatch if pattern is not None else None
+
+    def check(value, pointer, errors):
+        if type(value) not in types:
+            errors.append(ValidationError(pointer, f"expected {kind}, got {json_type_name(value)}"))
+        elif minimum is not None and value < minimum:
+            errors.append(ValidationError(pointer, f"{value} is less than {minimum}"))
+        elif matcher is not None and matcher(value) is None:
+            errors.append(ValidationError(pointer, f"{value!r} does not match {pattern}"))
+    return check
+
+def _is_plain_scalar(schema):
+    """Return True for scalar schemas that need at most a type and minimum test"""
+    return schema.get('type') in SCALAR_TYPES and 'pattern' not in schema
+
+def _compile_array(schema):
+    """Return check(value, pointer, errors) for an array schema"""
+    check_item = compile_schema(schema['items']) if 'items' in schema else None
+
+    def check(value, pointer, errors):
+        if type(value) is not list:
+            errors.append(ValidationError(pointer, f"expected array, got {json_type_name(value)}"))
+        elif check_item is not None:
+            for index, item in enumerate(value):
+                check_item(item, f"{pointer}/{index}", errors)
+    return check
+
+def _compile_object(schema):
+    """Return check(value, pointer, errors) for an object schema
+
+    Plain scalar properties are tested inline with an exact type lookup and
+    only fall back to their full check, which builds the pointer and the
+    message, once a test fails.  Nested schemas are called directly.
+    """
+    declared = schema.get('properties', {})
+    scalars = []
+    nested = []
+    for key, sub in declared.items():
+        suffix = '/' + escape_pointer(key)
+        if _is_plain_scalar(sub):
+            scalars.append((key, SCALAR_TYPES[sub['type']], sub.get('minimum'), suffix, compile_schema(sub)))
+        else:
+            nested.append((key, suffix, compile_schema(sub)))
+    scalars = tuple(scalars)
+    nested = tuple(nested)
+    required = tuple((key, '/' + escape_pointer(key)) for key in schema.get('required', ()))
+    known = frozenset(declared)
+    extra = schema.get('additionalProperties')
+    check_extra = compile_schema(extra) if isinstance(extra, dict) else None
+    extra_types = SCALAR_TYPES[extra['type']] if check_extra is not None and _is_plain_scalar(extra) and 'minimum' not in extra else None
+
+    def check(value, pointer, errors):
+        if type(value) is not dict:
+            errors.append(ValidationError(pointer, f"expected object, got {json_type_name(value)}"))
+            return
+        get = value.get
+        for key, suffix in required:
+            if key not in value:
+                errors.append(ValidationError(pointer + suffix, "required property is missing"))
+        for key, types, minimum, suffix, check_property in scalars:
+            item = get(key, _MISSING)
+            if item is _MISSING:
+                continue
+            if type(item) not in types or (minimum is not None and item < minimum):
+                check_property(item, pointer + suffix, errors)
+        for key, suffix, check_property in nested:
+            item = get(key, _MISSING)
+            if item is not _MISSING:
+                check_property(item, pointer + suffix, errors)
+        if check_extra is not None:
+            for key, item in value.items():
+                if key in known or (extra_types is not None and type(item) in extra_types):
+                    continue
+                check_extra(item, f"{pointer}/{escape_pointer(key)}", errors)
+    return check
+
+def compile_schema(schema):
+    """Compile a schema dict into a check(value, pointer, errors) function"""
+    kind = schema.get('type')
+    if kind == 'object':
+        return _compile_object(schema)
+    if kind == 'array':
+        return _compile_array(schema)
+    return _compile_scalar(schema)
+
+_check_order = compile_schema(ORDER_SCHEMA)
+
+def validate_order(data):
+    """Return the list of ValidationErrors for one order; empty means valid"""
+    errors = []
+    _check_order(data, '', errors)
+    return errors
+
+def format_error(error):
+    """Describe one ValidationError as 'pointer: message'"""
+    return f"{error.pointer or '(root)'}: {error.message}"
+
+def describe_errors(errors, limit=3):
+    """Summarise a list of ValidationErrors on one line"""
+    text = '; '.join(format_error(error) for error in errors[:limit])
+    if len(errors) > limit:
+        text += f" (+{len(errors) - limit} more)"
+    return text
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Streaming Order Reader
+流式订单读取器
+
+Reads JSON-lines or concatenated-JSON dumps of production orders one record
+at a time.  Only the record being decoded is held in memory, so memory use
+stays flat no matter how large the dump is.  A malformed record is reported
+with its line number and byte offset, and reading resumes at the next record.
+"""
+
+import codecs
+import json
+import re
+import sys
+from collections import namedtuple
+
+CHUNK_SIZE = 1 << 16
+MAX_RECORD_SIZE = 64 << 20
+
+WHITESPACE = re.compile(r'[ \t\r\n\ufeff]*')
+
+# line/offset give the start of the record, or the error position for malformed records
+StreamRecord = namedtuple('StreamRecord', 'line offset data error')
+
+class _Cursor:
+    """Tracks line number and byte offset while consuming a text buffer"""
+
+    def __init__(self):
+        self.line = 1
+        self.offset = 0
+
+    def advance(self, text):
+        self.line += text.count('\n')
+        self.offset += len(text) if text.isascii() else len(text.encode('utf-8', 'surrogateescape'))
+
+    def at(self, text):
+        """Return (line, offset) of the position just after text"""
+        line = self.line + text.count('\n')
+        offset = self.offset + len(text.encode('utf-8', 'surrogateescape'))
+        return line, offset
+
+def iter_records(stream, chunk_size=CHUNK_SIZE, max_record_size=MAX_RECORD_SIZE):
+    """Yield a StreamRecord for every JSON object in a binary stream"""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')('surrogateescape')
+    cursor = _Cursor()
+    buf = ''
+    pos = 0
+    eof = False
+    resyncing = False
+
+    while True:
+        if resyncing:
+            # Skip to the next line that starts a new top-level object
+            start = buf.find('\n{', pos)
+            if start < 0:
+                keep = max(pos, len(buf) - 1)
+                cursor.advance(buf[pos:keep])
+                pos = keep
+            else:
+                cursor.advance(buf[pos:start + 1])
+                pos = start + 1
+                resyncing = False
+                continue
+        else:
+            end = WHITESPACE.match(buf, pos).end()
+            cursor.advance(buf[pos:end])
+            pos = end
+
+            if pos < len(buf):
+                try:
+                    data, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError as e:
+                    # A failure on a complete line cannot be fixed by reading more data
+                    complete = eof or buf.find('\n', e.pos) >= 0 or len(buf) - pos > max_record_size
+                    if complete:
+                        line, offset = cursor.at(buf[pos:e.pos])
+                        if len(buf) - pos > max_record_size:
+                            message = f"record exceeds {max_record_size} bytes"
+                        else:
+                            message = e.msg
+                        yield StreamRecord(line, offset, None, message)
+                        cursor.advance(buf[pos:e.pos])
+                        pos = e.pos
+                        resyncing = True
+                        continue
+                else:
+                    if isinstance(data, dict):
+                        yield StreamRecord(cursor.line, cursor.offset, data, None)
+                    else:
+                        yield StreamRecord(cursor.line, cursor.offset, None,
+                                           f"expected a JSON object, got {type(data).__name__}")
+                    cursor.advance(buf[pos:end])
+                    pos = end
+                    continue
+
+        if eof:
+            return
+
+        # Drop consumed text and read the next chunk
+        buf = buf[pos:]
+        pos = 0
+        chunk = stream.read(chunk_size)
+        if chunk:
+            buf += text_decoder.decode(chunk)
+        else:
+            buf += text_decoder.decode(b'', final=True)
+            eof = True
+
+def iter_file_records(path, chunk_size=CHUNK_SIZE):
+    """Yield a StreamRecord for every JSON object in a file, or stdin for '-'"""
+    if str(path) == '-':
+        yield from iter_records(sys.stdin.buffer, chunk_size)
+        return
+    with open(path, 'rb') as f:
+        yield from iter_records(f, chunk_size)
+
+def format_position(record):
+    """Describe where a record sits in its stream"""
+    return f"line {record.line}, byte offset {record.offset}"
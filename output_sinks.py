@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Report Output Sinks
+报表输出方式
+
+Writes rendered reports as plain files, gzip-compressed files, or both side
+by side (x.html plus x.html.gz, ready for web servers that serve
+precompressed variants).  Reports arrive as a stream of byte chunks that
+are fed straight into the compressor, so a report is never held in memory
+as a whole.  Files are written under a temporary name and renamed into
+place, so readers never see a half-written report.
+"""
+
+import gzip
+import os
+import threading
+from pathlib import Path
+
+GZIP_LEVEL = 6
+
+# Output mode -> suffixes appended to each report file name
+SINK_VARIANTS = {
+    'plain': ('',),
+    'gzip': ('.gz',),
+    'both': ('', '.gz'),
+}
+
+class ReportWriter:
+    """Writes one report into one or more files at once, compressing .gz targets"""
+
+    def __init__(self, paths, level=GZIP_LEVEL):
+        self.bytes_written = 0
+        self._targets = []
+        try:
+            for path in paths:
+                path = Path(path)
+                tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                raw = open(tmp_path, 'wb')
+                stream = raw
+                if path.suffix == '.gz':
+                    # Fixed mtime and inner name keep identical reports byte-identical
+                    stream = gzip.GzipFile(filename=path.stem, mode='wb', fileobj=raw,
+                                           compresslevel=level, mtime=0)
+                self._targets.append((path, tmp_path, raw, stream))
+        except BaseException:
+            self.abort()
+            raise
+
+    def write(self, data):
+        for _, _, _, stream in self._targets:
+            stream.write(data)
+
+    def commit(self):
+        """Finish every file and move it into place"""
+        for path, tmp_path, raw, stream in self._targets:
+            if stream is not raw:
+                stream.close()
+            self.bytes_written += raw.tell()
+            raw.close()
+            os.replace(tmp_path, path)
+        self._targets = []
+
+    def abort(self):
+        """Discard every partially written file"""
+        for _, tmp_path, raw, _ in self._targets:
+            raw.close()
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+        self._targets = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+def open_report(path, level=GZIP_LEVEL):
+    """Open a single report file for writing, gzip-compressed if path ends in .gz"""
+    return ReportWriter([path], level)
+
+class ReportSink:
+    """Stores every report in each of the configured variants"""
+
+    def __init__(self, mode='plain', level=GZIP_LEVEL):
+        if mode not in SINK_VARIANTS:
+            raise ValueError(f"Unknown output mode: {mode}")
+        self.mode = mode
+        self.variants = SINK_VARIANTS[mode]
+        self.level = level
+
+    def paths(self, path):
+        """Return the files written for a report whose plain path is path"""
+        return [Path(f"{path}{suffix}") for suffix in self.variants]
+
+    def write(self, path, chunks):
+        """Stream byte chunks into every variant of path and return the bytes stored"""
+        with ReportWriter(self.paths(path), self.level) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+        return writer.bytes_written
@@ -0,0 +1,719 @@
+#!/usr/bin/env python3
+"""
+PDF Report Writer
+PDF报表生成器
+
+Writes production order reports directly as PDF, laid out like Report1.pdf,
+without a headless browser.  The header, product table, the 原材/出版/印刷/
+后工序/辅材 sections and the footer are drawn with a small table layout
+engine; tables that overflow a page continue on the next page with their
+header row repeated.
+
+Chinese text uses a TrueType CJK font (e.g. simsun.ttc, msyh.ttc or
+wqy-zenhei.ttc) that is subsetted to the glyphs actually used and embedded.
+Without a usable font file the standard STSong-Light CID font is referenced
+instead, which the PDF viewer has to supply.
+
+Usage / 使用方法:
+    python3 pdf_writer.py order.json report.pdf --font /path/to/simsun.ttc
+"""
+
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import zlib
+from functools import lru_cache
+from pathlib import Path
+
+from generate_html_report import load_json_data
+from qr_code import encode_qr
+from report_layout import TABLE_SLOTS, load_layout
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 20
+FOOTER_HEIGHT = 24
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+CONTENT_BOTTOM = PAGE_HEIGHT - MARGIN - FOOTER_HEIGHT
+
+QR_SIZE = 80
+SECTION_LABEL_WIDTH = 20
+CELL_PADDING = 2.5
+LINE_SPACING = 1.2
+BORDER_WIDTH = 0.5
+HEADER_GRAY = 0.94
+
+PRODUCT_FONT_SIZE = 9
+SECTION_FONT_SIZE = 9
+INFO_FONT_SIZE = 10.5
+TITLE_FONT_SIZE = 24
+
+FONT_ENV_VAR = 'REPORT_PDF_FONT'
+FONT_CANDIDATES = (
+    '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+    '/usr/share/fonts/wqy-zenhei/wqy-zenhei.ttc',
+    '/usr/share/fonts/truetype/arphic/uming.ttc',
+    'C:/Windows/Fonts/simsun.ttc',
+    'C:/Windows/Fonts/msyh.ttc',
+    '/Library/Fonts/Arial Unicode.ttf',
+)
+
+# ---------------------------------------------------------------------------
+# TrueType parsing and subsetting
+# ---------------------------------------------------------------------------
+
+class FontError(Exception):
+    """Raised when a font file cannot be used for embedding"""
+
+def _checksum(data):
+    data += b'\0' * (-len(data) % 4)
+    return sum(struct.unpack(f'>{len(data) // 4}I', data)) & 0xFFFFFFFF
+
+class TrueTypeFont:
+    """Parsed glyf-based TrueType font (a .ttf file or the first font of a .ttc)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        data = self.path.read_bytes()
+        offset = 0
+        if data[:4] == b'ttcf':
+            offset = struct.unpack_from('>I', data, 12)[0]
+
+        num_tables = struct.unpack_from('>H', data, offset + 4)[0]
+        self.tables = {}
+        for i in range(num_tables):
+            tag, _, table_offset, length = struct.unpack_from('>4sIII', data, offset + 12 + i * 16)
+            self.tables[tag.decode('latin-1')] = data[table_offset:table_offset + length]
+
+        missing = {'head', 'hhea', 'maxp', 'hmtx', 'loca', 'glyf', 'cmap'} - set(self.tables)
+        if missing:
+            raise FontError(f"{path} is not a TrueType outline font (missing {', '.join(sorted(missing))})")
+
+        head = self.tables['head']
+        self.units_per_em = struct.unpack_from('>H', head, 18)[0]
+        self.bbox = struct.unpack_from('>4h', head, 36)
+        long_loca = struct.unpack_from('>h', head, 50)[0] == 1
+
+        hhea = self.tables['hhea']
+        self.ascent, self.descent = struct.unpack_from('>hh', hhea, 4)
+        num_hmetrics = struct.unpack_from('>H', hhea, 34)[0]
+        self.num_glyphs = struct.unpack_from('>H', self.tables['maxp'], 4)[0]
+
+        hmtx = self.tables['hmtx']
+        self.metrics = [struct.unpack_from('>Hh', hmtx, i * 4) for i in range(num_hmetrics)]
+        last_advance = self.metrics[-1][0]
+        for i in range(self.num_glyphs - num_hmetrics):
+            lsb = struct.unpack_from('>h', hmtx, num_hmetrics * 4 + i * 2)[0]
+            self.metrics.append((last_advance, lsb))
+
+        loca = self.tables['loca']
+        if long_loca:
+            self.loca = struct.unpack_from(f'>{self.num_glyphs + 1}I', loca)
+        else:
+            self.loca = [x * 2 for x in struct.unpack_from(f'>{self.num_glyphs + 1}H', loca)]
+
+        self.cmap = self._parse_cmap(self.tables['cmap'])
+        self.name = self._parse_name(self.tables.get('name', b'')) or self.path.stem
+
+    @staticmethod
+    def _parse_cmap(cmap):
+        """Return a dict mapping code points to glyph ids from a Unicode cmap subtable"""
+        num_subtables = struct.unpack_from('>H', cmap, 2)[0]
+        subtables = {}
+        for i in range(num_subtables):
+            platform_id, encoding_id, offset = struct.unpack_from('>HHI', cmap, 4 + i * 8)
+            subtables[(platform_id, encoding_id)] = offset
+
+        for key in ((3, 10), (0, 4), (3, 1), (0, 3), (0, 1), (0, 0)):
+            if key not in subtables:
+                continue
+            offset = subtables[key]
+            fmt = struct.unpack_from('>H', cmap, offset)[0]
+            mapping = {}
+            if fmt == 12:
+                num_groups = struct.unpack_from('>I', cmap, offset + 12)[0]
+                for g in range(num_groups):
+                    start, end, glyph = struct.unpack_from('>III', cmap, offset + 16 + g * 12)
+                    for code in range(start, end + 1):
+                        mapping[code] = glyph + code - start
+                return mapping
+            if fmt == 4:
+                seg_count = struct.unpack_from('>H', cmap, offset + 6)[0] // 2
+                ends = struct.unpack_from(f'>{seg_count}H', cmap, offset + 14)
+                starts_at = offset + 16 + seg_count * 2
+                starts = struct.unpack_from(f'>{seg_count}H', cmap, starts_at)
+                deltas = struct.unpack_from(f'>{seg_count}h', cmap, starts_at + seg_count * 2)
+                range_at = starts_at + seg_count * 4
+                ranges = struct.unpack_from(f'>{seg_count}H', cmap, range_at)
+                for s in range(seg_count):
+                    for code in range(starts[s], ends[s] + 1):
+                        if code == 0xFFFF:
+                            continue
+                        if ranges[s] == 0:
+                            glyph = (code + deltas[s]) & 0xFFFF
+                        else:
+                            at = range_at + s * 2 + ranges[s] + (code - starts[s]) * 2
+                            glyph = struct.unpack_from('>H', cmap, at)[0]
+                            if glyph:
+                                glyph = (glyph + deltas[s]) & 0xFFFF
+                        if glyph:
+                            mapping[code] = glyph
+                return mapping
+        raise FontError("font has no Unicode cmap")
+
+    @staticmethod
+    def _parse_name(name):
+        """Return the PostScript name (name id 6) if present"""
+        if len(name) < 6:
+            return None
+        count, string_offset = struct.unpack_from('>HH', name, 2)
+        for i in range(count):
+            platform_id, _, _, name_id, length, offset = struct.unpack_from('>6H', name, 6 + i * 12)
+            if name_id != 6:
+                continue
+            raw = name[string_offset + offset:string_offset + offset + length]
+            text = raw.decode('utf-16-be' if platform_id in (0, 3) else 'latin-1', errors='ignore')
+            cleaned = ''.join(c for c in text if c.isalnum() or c in '-_')
+            if cleaned:
+                return cleaned
+        return None
+
+    def glyph_data(self, gid):
+        return self.tables['glyf'][self.loca[gid]:self.loca[gid + 1]]
+
+class FontSubset:
+    """Glyphs of one TrueType font used by a document, renumbered from 1"""
+
+    def __init__(self, font):
+        self.font = font
+        self.glyphs = [0]
+        self.cids = {0: 0}
+        self.unicode = {}
+
+    def width(self, text, size):
+        """Width of text in points"""
+        cmap = self.font.cmap
+        metrics = self.font.metrics
+        units = sum(metrics[cmap.get(ord(c), 0)][0] for c in text)
+        return units * size / self.font.units_per_em
+
+    def encode(self, text):
+        """Encode text as a hex string of 2-byte CIDs, assigning CIDs on first use"""
+        codes = []
+        for char in text:
+            gid = self.font.cmap.get(ord(char), 0)
+            cid = self.cids.get(gid)
+            if cid is None:
+                cid = self._add_glyph(gid)
+                self.unicode[cid] = char
+            codes.append(cid)
+        return '<' + ''.join(f'{cid:04X}' for cid in codes) + '>'
+
+    def _add_glyph(self, gid):
+        cid = len(self.glyphs)
+        self.glyphs.append(gid)
+        self.cids[gid] = cid
+        return cid
+
+    def _component_offsets(self, data):
+        """Yield offsets of component glyph ids inside a composite glyph"""
+        offset = 10
+        while True:
+            flags = struct.unpack_from('>H', data, offset)[0]
+            yield offset + 2
+            offset += 4 + (4 if flags & 0x0001 else 2)
+            if flags & 0x0008:
+                offset += 2
+            elif flags & 0x0040:
+                offset += 4
+            elif flags & 0x0080:
+                offset += 8
+            if not flags & 0x0020:
+                return
+
+    def build(self):
+        """Return the subsetted font file as bytes"""
+        font = self.font
+        glyph_data = []
+        i = 0
+        # Composite glyphs pull in their components, which may add more glyphs
+        while i < len(self.glyphs):
+            data = bytearray(font.glyph_data(self.glyphs[i]))
+            if len(data) >= 10 and struct.unpack_from('>h', data, 0)[0] < 0:
+                for at in self._component_offsets(data):
+                    component = struct.unpack_from('>H', data, at)[0]
+                    cid = self.cids.get(component)
+                    if cid is None:
+                        cid = self._add_glyph(component)
+                    struct.pack_into('>H', data, at, cid)
+            data += b'\0' * (-len(data) % 4)
+            glyph_data.append(bytes(data))
+            i += 1
+
+        loca = [0]
+        for data in glyph_data:
+            loca.append(loca[-1] + len(data))
+        num_glyphs = len(self.glyphs)
+
+        head = bytearray(font.tables['head'])
+        struct.pack_into('>I', head, 8, 0)
+        struct.pack_into('>h', head, 50, 1)
+        hhea = bytearray(font.tables['hhea'])
+        struct.pack_into('>H', hhea, 34, num_glyphs)
+        maxp = bytearray(font.tables['maxp'])
+        struct.pack_into('>H', maxp, 4, num_glyphs)
+
+        tables = {
+            'head': bytes(head),
+            'hhea': bytes(hhea),
+            'maxp': bytes(maxp),
+            'hmtx': b''.join(struct.pack('>Hh', *font.metrics[gid]) for gid in self.glyphs),
+            'loca': struct.pack(f'>{len(loca)}I', *loca),
+            'glyf': b''.join(glyph_data),
+        }
+        for tag in ('cvt ', 'fpgm', 'prep'):
+            if tag in font.tables:
+                tables[tag] = font.tables[tag]
+
+        return self._assemble(tables)
+
+    @staticmethod
+    def _assemble(tables):
+        tags = sorted(tables)
+        num_tables = len(tags)
+        entry_selector = num_tables.bit_length() - 1
+        search_range = (1 << entry_selector) * 16
+        header = struct.pack('>IHHHH', 0x00010000, num_tables, search_range, entry_selector,
+                             num_tables * 16 - search_range)
+        directory = b''
+        body = b''
+        offset = 12 + num_tables * 16
+        for tag in tags:
+            data = tables[tag]
+            directory += struct.pack('>4sIII', tag.encode('latin-1'), _checksum(data), offset + len(body), len(data))
+            body += data + b'\0' * (-len(data) % 4)
+
+        font_file = bytearray(header + directory + body)
+        head_offset = 12 + num_tables * 16 + sum(len(tables[t]) + (-len(tables[t]) % 4) for t in tags[:tags.index('head')])
+        struct.pack_into('>I', font_file, head_offset + 8, (0xB1B0AFBA - _checksum(bytes(font_file))) & 0xFFFFFFFF)
+        return bytes(font_file)
+
+    def pdf_objects(self, doc):
+        """Add the Type0 font and its descendants to doc and return the font object id"""
+        font = self.font
+        scale = 1000 / font.units_per_em
+        font_file = self.build()
+        tag = ''.join(chr(ord('A') + b % 26) for b in hashlib.sha1(font_file).digest()[:6])
+        base_font = f"{tag}+{font.name}"
+
+        file_id = doc.add_stream(font_file, {'Length1': len(font_file)})
+        bbox = ' '.join(str(round(v * scale)) for v in font.bbox)
+        descriptor_id = doc.add_object(
+            f"<< /Type /FontDescriptor /FontName /{base_font} /Flags 4 /FontBBox [{bbox}] "
+            f"/ItalicAngle 0 /Ascent {round(font.ascent * scale)} /Descent {round(font.descent * scale)} "
+            f"/CapHeight {round(font.ascent * scale)} /StemV 80 /FontFile2 {file_id} 0 R >>")
+
+        widths = ' '.join(str(round(font.metrics[gid][0] * scale)) for gid in self.glyphs)
+        cid_font_id = doc.add_object(
+            f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{base_font} "
+            f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+            f"/FontDescriptor {descriptor_id} 0 R /W [0 [{widths}]] /CIDToGIDMap /Identity >>")
+
+        to_unicode_id = doc.add_stream(_to_unicode_cmap(self.unicode).encode('ascii'))
+        return doc.add_object(
+            f"<< /Type /Font /Subtype /Type0 /BaseFont /{base_font} /Encoding /Identity-H "
+            f"/DescendantFonts [{cid_font_id} 0 R] /ToUnicode {to_unicode_id} 0 R >>")
+
+class StandardCJKFont:
+    """Non-embedded STSong-Light, used when no TrueType font is available"""
+
+    def width(self, text, size):
+        return sum(0.5 if ord(c) < 0x80 else 1.0 for c in text) * size
+
+    def encode(self, text):
+        return '<' + ''.join(f'{ord(c) if ord(c) <= 0xFFFF else 0x3F:04X}' for c in text) + '>'
+
+    def pdf_objects(self, doc):
+        descriptor_id = doc.add_object(
+            "<< /Type /FontDescriptor /FontName /STSong-Light /Flags 6 /FontBBox [-25 -254 1000 880] "
+            "/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 880 /StemV 93 >>")
+        cid_font_id = doc.add_object(
+            f"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /STSong-Light "
+            f"/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 2 >> "
+            f"/FontDescriptor {descriptor_id} 0 R /DW 1000 /W [1 95 500] >>")
+        return doc.add_object(
+            f"<< /Type /Font /Subtype /Type0 /BaseFont /STSong-Light /Encoding /UniGB-UCS2-H "
+            f"/DescendantFonts [{cid_font_id} 0 R] >>")
+
+def _to_unicode_cmap(unicode_map):
+    """Build a ToUnicode CMap so text in the PDF can be searched and copied"""
+    entries = []
+    for cid, char in sorted(unicode_map.items()):
+        utf16 = char.encode('utf-16-be').hex().upper()
+        entries.append(f"<{cid:04X}> <{utf16}>")
+
+    lines = [
+        "/CIDInit /ProcSet findresource begin",
+        "12 dict begin",
+        "begincmap",
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+        "/CMapName /Adobe-Identity-UCS def",
+        "/CMapType 2 def",
+        "1 begincodespacerange",
+        "<0000> <FFFF>",
+        "endcodespacerange",
+    ]
+    for i in range(0, len(entries), 100):
+        block = entries[i:i + 100]
+        lines.append(f"{len(block)} beginbfchar")
+        lines.extend(block)
+        lines.append("endbfchar")
+    lines += [
+        "endcmap",
+        "CMapName currentdict /CMap defineresource pop",
+        "end",
+        "end",
+    ]
+    return '\n'.join(lines)
+
+@lru_cache(maxsize=None)
+def load_font(path=None):
+    """Load a TrueType font for embedding; returns None if none can be found"""
+    if path is None:
+        path = os.environ.get(FONT_ENV_VAR)
+    candidates = [path] if path else [p for p in FONT_CANDIDATES if os.path.exists(p)]
+    for candidate in candidates:
+        try:
+            return TrueTypeFont(candidate)
+        except (OSError, struct.error, FontError) as e:
+            if path:
+                raise FontError(f"Cannot use font {candidate}: {e}") from e
+    return None
+
+# ---------------------------------------------------------------------------
+# PDF document structure
+# ---------------------------------------------------------------------------
+
+class PdfDocument:
+    """Minimal PDF object writer"""
+
+    def __init__(self):
+        self.objects = []
+
+    def add_object(self, body):
+        if isinstance(body, str):
+            body = body.encode('latin-1')
+        self.objects.append(body)
+        return len(self.objects)
+
+    def add_stream(self, data, extra=None):
+        compressed = zlib.compress(data, 6)
+        entries = ''.join(f" /{key} {value}" for key, value in (extra or {}).items())
+        header = f"<< /Length {len(compressed)} /Filter /FlateDecode{entries} >>\nstream\n"
+        return self.add_object(header.encode('latin-1') + compressed + b"\nendstream")
+
+    def reserve(self):
+        """Reserve an object id whose body is set later with set_object()"""
+        self.objects.append(None)
+        return len(self.objects)
+
+    def set_object(self, object_id, body):
+        self.objects[object_id - 1] = body.encode('latin-1') if isinstance(body, str) else body
+
+    def to_bytes(self, root_id):
+        out = bytearray(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(self.objects, 1):
+            offsets.append(len(out))
+            out += f"{number} 0 obj\n".encode('latin-1') + body + b"\nendobj\n"
+        xref_offset = len(out)
+        out += f"xref\n0 {len(self.objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+        for offset in offsets:
+            out += f"{offset:010d} 00000 n \n".encode('latin-1')
+        out += (f"trailer\n<< /Size {len(self.objects) + 1} /Root {root_id} 0 R >>\n"
+                f"startxref\n{xref_offset}\n%%EOF\n").encode('latin-1')
+        return bytes(out)
+
+class PdfPage:
+    """Content stream of one page, using top-left based coordinates"""
+
+    def __init__(self, font):
+        self.font = font
+        self.ops = [f"{BORDER_WIDTH} w"]
+
+    def text(self, x, y, text, size, bold=False):
+        """Draw text with its top edge at y"""
+        if not text:
+            return
+        baseline = PAGE_HEIGHT - y - size * 0.88
+        render = f"2 Tr {size / 40:.2f} w " if bold else ""
+        reset = f" 0 Tr {BORDER_WIDTH} w" if bold else ""
+        self.ops.append(f"BT {render}/F1 {size} Tf {x:.2f} {baseline:.2f} Td "
+                        f"{self.font.encode(text)} Tj{reset} ET")
+
+    def rect(self, x, y, width, height, fill=None, stroke=True):
+        coords = f"{x:.2f} {PAGE_HEIGHT - y - height:.2f} {width:.2f} {height:.2f} re"
+        if fill is not None:
+            self.ops.append(f"{fill} g {coords} f 0 g")
+        if stroke:
+            self.ops.append(f"{coords} S")
+
+    def line(self, x1, y1, x2, y2, gray=0):
+        self.ops.append(f"{gray} G {x1:.2f} {PAGE_HEIGHT - y1:.2f} m {x2:.2f} {PAGE_HEIGHT - y2:.2f} l S 0 G")
+
+    def content(self):
+        return '\n'.join(self.ops).encode('latin-1')
+
+# ---------------------------------------------------------------------------
+# Report layout
+# ---------------------------------------------------------------------------
+
+class ReportLayout:
+    """Lays out one production order onto as many pages as needed"""
+
+    def __init__(self, font, layout=None):
+        self.font = font
+        self.layout = layout or load_layout()
+        self.pages = []
+        self.y = MARGIN
+        self.new_page()
+
+    def new_page(self):
+        self.page = PdfPage(self.font)
+        self.pages.append(self.page)
+        self.y = MARGIN
+
+    def wrap(self, text, width, size):
+        """Split text into lines that fit width"""
+        lines = []
+        for paragraph in text.split('\n'):
+            line = ''
+            line_width = 0
+            for char in paragraph:
+                char_width = self.font.width(char, size)
+                if line and line_width + char_width > width:
+                    lines.append(line)
+                    line, line_width = '', 0
+                line += char
+                line_width += char_width
+            lines.append(line)
+        return lines
+
+    def paragraph(self, text, size, x=MARGIN, width=CONTENT_WIDTH, bold=False):
+        for line in self.wrap(text, width, size):
+            if self.y + size * LINE_SPACING > CONTENT_BOTTOM:
+                self.new_page()
+            self.page.text(x, self.y, line, size, bold)
+            self.y += size * LINE_SPACING
+
+    def table(self, headers, weights, rows, size, label=None):
+        """Draw a table, splitting it across pages with the header repeated"""
+        x0 = MARGIN + (SECTION_LABEL_WIDTH if label else 0)
+        width = CONTENT_WIDTH - (SECTION_LABEL_WIDTH if label else 0)
+        total_weight = sum(weights)
+        widths = [width * w / total_weight for w in weights]
+        inner = [w - 2 * CELL_PADDING for w in widths]
+
+        def wrap_row(cells):
+            wrapped = [self.wrap(cell, inner[i], size) for i, cell in enumerate(cells)]
+            height = max(len(lines) for lines in wrapped) * size * LINE_SPACING + 2 * CELL_PADDING
+            return wrapped, height
+
+        def draw_row(wrapped, height, header=False):
+            x = x0
+            for i, lines in enumerate(wrapped):
+                self.page.rect(x, self.y, widths[i], height, fill=HEADER_GRAY if header else None)
+                for n, line in enumerate(lines):
+                    offset = CELL_PADDING
+                    if header:
+                        offset = (widths[i] - self.font.width(line, size)) / 2
+                    self.page.text(x + offset, self.y + CELL_PADDING + n * size * LINE_SPACING,
+                                   line, size, bold=header)
+                x += widths[i]
+            self.y += height
+
+        def close_segment(top):
+            if label:
+                self.section_label(label, top, self.y - top)
+
+        header = wrap_row(headers)
+        body = [wrap_row(row) for row in rows]
+
+        first_height = header[1] + (body[0][1] if body else 0)
+        if self.y + first_height > CONTENT_BOTTOM:
+            self.new_page()
+        top = self.y
+        draw_row(*header, header=True)
+
+        for wrapped, height in body:
+            if self.y + height > CONTENT_BOTTOM:
+                close_segment(top)
+                self.new_page()
+                top = self.y
+                draw_row(*header, header=True)
+            draw_row(wrapped, height)
+        close_segment(top)
+
+    def section_label(self, label, top, height):
+        """Draw the vertical section label (原/材 ...) beside a table segment"""
+        size = SECTION_FONT_SIZE
+        self.page.rect(MARGIN, top, SECTION_LABEL_WIDTH, height, fill=HEADER_GRAY)
+        text_height = len(label) * size * LINE_SPACING
+        y = top + max(CELL_PADDING, (height - text_height) / 2)
+        for char in label:
+            x = MARGIN + (SECTION_LABEL_WIDTH - self.font.width(char, size)) / 2
+            self.page.text(x, y, char, size, bold=True)
+            y += size * LINE_SPACING
+
+    def qr_code(self, work_order):
+        x = PAGE_WIDTH - MARGIN - QR_SIZE
+        y = MARGIN
+        if not work_order:
+            self.page.rect(x, y, QR_SIZE, QR_SIZE)
+            self.page.text(x + 20, y + 36, 'QR Code', 8)
+            return
+        modules = encode_qr(str(work_order))
+        module = QR_SIZE / (len(modules) + 8)
+        for row, cells in enumerate(modules):
+            for col, dark in enumerate(cells):
+                if dark:
+                    self.page.rect(x + (col + 4) * module, y + (row + 4) * module, module, module,
+                                   fill=0, stroke=False)
+        self.page.rect(x, y, QR_SIZE, QR_SIZE)
+
+    def footer(self, fields):
+        names = (
+            f"制单：{fields.get('footer_business_unit', '')}",
+            f"文件制作：{fields.get('footer_reviewer', '')}",
+            f"业务员：{fields.get('footer_salesperson', '')}",
+            f"跟单：{fields.get('footer_merchandiser', '')}",
+            f"审核：{fields.get('footer_approver', '')}",
+        )
+        top = PAGE_HEIGHT - MARGIN - FOOTER_HEIGHT + 8
+        total = len(self.pages)
+        for number, page in enumerate(self.pages, 1):
+            page.line(MARGIN, top, PAGE_WIDTH - MARGIN, top, gray=0.8)
+            x = MARGIN
+            step = CONTENT_WIDTH / (len(names) + 1)
+            for name in names + (f"第 {number}/{total} 页",):
+                page.text(x, top + 5, name, PRODUCT_FONT_SIZE)
+                x += step
+
+    def box_segments(self, first, top, size):
+        """Frame text drawn from y=top on page number first down to self.y, one box per page"""
+        pages = self.pages[first:]
+        if len(pages) > 1 and top + 5 + size * LINE_SPACING > CONTENT_BOTTOM:
+            # paragraph() started on the next page; the first page holds none of the text
+            pages = pages[1:]
+            top = MARGIN
+        for number, page in enumerate(pages):
+            start = top if number == 0 else MARGIN
+            stop = self.y if number == len(pages) - 1 else CONTENT_BOTTOM
+            page.rect(MARGIN, start, CONTENT_WIDTH, stop - start)
+
+    def render(self, data):
+        fields = self.layout.field_values(data)
+        work_order = fields.get('work_order_number', '')
+
+        self.qr_code(work_order)
+        title = f"{fields.get('company_name', '')}生产单"
+        title_width = self.font.width(title, TITLE_FONT_SIZE)
+        self.page.text((PAGE_WIDTH - title_width) / 2, self.y, title, TITLE_FONT_SIZE, bold=True)
+        self.y += TITLE_FONT_SIZE + 25
+
+        # The order information rows stop short of the QR code
+        size = INFO_FONT_SIZE
+        info_width = CONTENT_WIDTH - QR_SIZE - 10
+        info = ('订单类型：', f"下单日期：{fields.get('order_number', '')}", f"工单编号：{work_order}")
+        for x, text in zip((0, 0.22, 0.58), info):
+            self.page.text(MARGIN + x * info_width, self.y, text, size)
+        self.y += size * LINE_SPACING + 8
+        customer = ('广州至坚文化创意有限公司', '订单号：', '资料袋', '旧单编号：')
+        for x, text in zip((0, 0.4, 0.6, 0.78), customer):
+            self.page.text(MARGIN + x * info_width, self.y, text, size)
+        self.y += size * LINE_SPACING + 15
+
+        tables = self.layout.tables
+        products = tables['product_rows']
+        self.table(products.headers, products.widths, products.cells(products.items(data)), PRODUCT_FONT_SIZE)
+        self.y += 10
+
+        notes_first, notes_top = len(self.pages) - 1, self.y
+        self.y += 5
+        self.paragraph(f"重要说明：{fields.get('important_notes', '')}", PRODUCT_FONT_SIZE,
+                       x=MARGIN + 5, width=CONTENT_WIDTH - 10)
+        self.y += 5
+        self.box_segments(notes_first, notes_top, PRODUCT_FONT_SIZE)
+        self.y += 10
+
+        for name in TABLE_SLOTS[1:]:
+            table = tables[name]
+            self.table(table.headers, table.widths, table.cells(table.items(data)), SECTION_FONT_SIZE,
+                       label=table.label)
+            if name == 'printing_rows':
+                self.y += 3
+                self.paragraph(f"特别备注：{fields.get('printing_special', '')}", PRODUCT_FONT_SIZE, bold=True)
+            self.y += 10
+
+        self.footer(fields)
+        return self.pages
+
+def render_pdf_report(data, font_path=None, layout=None):
+    """Render complete PDF report from JSON data and return it as bytes"""
+    ttf = load_font(font_path)
+    font = FontSubset(ttf) if ttf is not None else StandardCJKFont()
+    pages = ReportLayout(font, layout).render(data)
+
+    doc = PdfDocument()
+    pages_id = doc.reserve()
+    content_ids = [doc.add_stream(page.content()) for page in pages]
+    font_id = font.pdf_objects(doc)
+    page_ids = [
+        doc.add_object(
+            f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>")
+        for content_id in content_ids
+    ]
+    kids = ' '.join(f"{page_id} 0 R" for page_id in page_ids)
+    doc.set_object(pages_id, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>")
+    root_id = doc.add_object(f"<< /Type /Catalog /Pages {pages_id} 0 R >>")
+    return doc.to_bytes(root_id)
+
+def generate_pdf_report(data, output_path, font_path=None, layout=None):
+    """Generate complete PDF report from JSON data"""
+    with open(output_path, 'wb') as f:
+        f.write(render_pdf_report(data, font_path, layout))
+    return output_path
+
+def main():
+    base_dir = Path(__file__).parent
+
+    parser = argparse.ArgumentParser(description="Generate a PDF report from a production order JSON file")
+    parser.add_argument('json_path', nargs='?', default=str(base_dir / "production_order_detailed_sample.json"),
+                        help="production order JSON file")
+    parser.add_argument('output_path', nargs='?', default=str(base_dir / "production_order_report.pdf"),
+                        help="PDF file to write")
+    parser.add_argument('--font', help=f"TrueType CJK font to embed (default: ${FONT_ENV_VAR} or a system font)")
+    args = parser.parse_args()
+
+    data = load_json_data(args.json_path)
+    if not data:
+        print("Failed to load JSON data")
+        return 1
+
+    try:
+        if load_font(args.font) is None:
+            print("⚠️  No TrueType CJK font found; referencing the non-embedded STSong-Light font")
+        generated_path = generate_pdf_report(data, args.output_path, args.font)
+    except FontError as e:
+        print(f"Error loading font: {e}")
+        return 1
+
+    print(f"PDF report generated successfully: {generated_path}")
+    print(f"File size: {os.path.getsize(generated_path)} bytes")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
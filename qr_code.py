@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Offline QR Code Encoder
+离线二维码生成器
+
+Dependency-free QR code encoder (ISO/IEC 18004, numeric and byte modes,
+versions 1-40) that renders the work order number as an inline SVG data URI.
+Printed reports therefore need no network access to show their QR code.
+
+Encoded codes are memoised in an in-process LRU cache and, optionally, in an
+on-disk cache directory shared by reprints and batch runs.
+"""
+
+import base64
+import hashlib
+import os
+import re
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+# Error correction level M (about 15% recovery), as used on the printed sheet
+ECC_FORMAT_BITS = {'L': 1, 'M': 0, 'Q': 3, 'H': 2}
+
+ECC_CODEWORDS_PER_BLOCK = {
+    'L': (-1, 7, 10, 15, 20, 26, 18, 20, 24, 30, 18, 20, 24, 26, 30, 22, 24, 28, 30, 28, 28,
+          28, 28, 30, 30, 26, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    'M': (-1, 10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24, 28, 28, 26, 26, 26,
+          26, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28),
+    'Q': (-1, 13, 22, 18, 26, 18, 24, 18, 22, 20, 24, 28, 26, 24, 20, 30, 24, 28, 28, 26, 30,
+          28, 30, 30, 30, 30, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    'H': (-1, 17, 28, 22, 16, 22, 28, 26, 26, 24, 28, 24, 28, 22, 24, 24, 30, 28, 28, 26, 28,
+          30, 24, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+}
+
+NUM_ERROR_CORRECTION_BLOCKS = {
+    'L': (-1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 4, 4, 4, 4, 4, 6, 6, 6, 6, 7, 8,
+          8, 9, 9, 10, 12, 12, 12, 13, 14, 15, 16, 17, 18, 19, 19, 20, 21, 22, 24, 25),
+    'M': (-1, 1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14, 16,
+          17, 17, 18, 20, 21, 23, 25, 26, 28, 29, 31, 33, 35, 37, 38, 40, 43, 45, 47, 49),
+    'Q': (-1, 1, 1, 2, 2, 4, 4, 6, 6, 8, 8, 8, 10, 12, 16, 12, 17, 16, 18, 21, 20,
+          23, 23, 25, 27, 29, 34, 34, 35, 38, 40, 43, 45, 48, 51, 53, 56, 59, 62, 65, 68),
+    'H': (-1, 1, 1, 2, 4, 4, 4, 5, 6, 8, 8, 11, 11, 16, 16, 18, 16, 19, 21, 25, 25,
+          25, 34, 30, 32, 35, 37, 40, 42, 45, 48, 51, 54, 57, 60, 63, 66, 70, 74, 77, 81),
+}
+
+PENALTY_N1 = 3
+PENALTY_N2 = 3
+PENALTY_N3 = 40
+PENALTY_N4 = 10
+
+MASK_PATTERNS = (
+    lambda x, y: (x + y) % 2 == 0,
+    lambda x, y: y % 2 == 0,
+    lambda x, y: x % 3 == 0,
+    lambda x, y: (x + y) % 3 == 0,
+    lambda x, y: (x // 3 + y // 2) % 2 == 0,
+    lambda x, y: x * y % 2 + x * y % 3 == 0,
+    lambda x, y: (x * y % 2 + x * y % 3) % 2 == 0,
+    lambda x, y: ((x + y) % 2 + x * y % 3) % 2 == 0,
+)
+
+QUIET_ZONE = 4
+MEMORY_CACHE_SIZE = 4096
+
+_cache_dir = None
+
+# ---------------------------------------------------------------------------
+# Reed-Solomon error correction over GF(2^8)
+# ---------------------------------------------------------------------------
+
+def _gf_multiply(x, y):
+    """Multiply two field elements modulo the QR polynomial 0x11D"""
+    z = 0
+    for i in reversed(range(8)):
+        z = (z << 1) ^ ((z >> 7) * 0x11D)
+        z ^= ((y >> i) & 1) * x
+    return z
+
+@lru_cache(maxsize=None)
+def _reed_solomon_divisor(degree):
+    """Return the generator polynomial coefficients for the given degree"""
+    result = [0] * (degree - 1) + [1]
+    root = 1
+    for _ in range(degree):
+        for j in range(degree):
+            result[j] = _gf_multiply(result[j], root)
+            if j + 1 < degree:
+                result[j] ^= result[j + 1]
+        root = _gf_multiply(root, 0x02)
+    return tuple(result)
+
+def _build_log_tables():
+    exp = [0] * 510
+    log = [0] * 256
+    value = 1
+    for i in range(255):
+        exp[i] = exp[i + 255] = value
+        log[value] = i
+        value = _gf_multiply(value, 0x02)
+    return exp, log
+
+GF_EXP, GF_LOG = _build_log_tables()
+
+def _reed_solomon_remainder(data, divisor):
+    """Compute the error correction codewords for a data block"""
+    exp = GF_EXP
+    divisor_logs = [GF_LOG[coef] for coef in divisor]
+    result = [0] * len(divisor)
+    for b in data:
+        factor = b ^ result.pop(0)
+        result.append(0)
+        if factor:
+            factor_log = GF_LOG[factor]
+            for i, coef_log in enumerate(divisor_logs):
+                result[i] ^= exp[coef_log + factor_log]
+    return result
+
+# ---------------------------------------------------------------------------
+# Data encoding
+# ---------------------------------------------------------------------------
+
+def _num_raw_data_modules(version):
+    """Number of modules available for data and error correction"""
+    result = (16 * version + 128) * version + 64
+    if version >= 2:
+        num_align = version // 7 + 2
+        result -= (25 * num_align - 10) * num_align - 55
+        if version >= 7:
+            result -= 36
+    return result
+
+def _num_data_codewords(version, ecl):
+    return (_num_raw_data_modules(version) // 8
+            - ECC_CODEWORDS_PER_BLOCK[ecl][version] * NUM_ERROR_CORRECTION_BLOCKS[ecl][version])
+
+def _segment_bits(text):
+    """Return (mode, char_count, data_bits, count_bits_by_version_group) for text"""
+    if text.isascii() and text.isdigit():
+        bits = []
+        for i in range(0, len(text), 3):
+            group = text[i:i + 3]
+            bits.append((int(group), len(group) * 3 + 1))
+        return 0x1, len(text), bits, (10, 12, 14)
+
+    data = text.encode('utf-8')
+    return 0x4, len(data), [(b, 8) for b in data], (8, 16, 16)
+
+def _encode_codewords(text, ecl):
+    """Choose the smallest version that fits text and return (version, data codewords)"""
+    mode, count, data_bits, count_bits = _segment_bits(text)
+    payload = sum(length for _, length in data_bits)
+
+    for version in range(1, 41):
+        count_width = count_bits[0 if version < 10 else 1 if version < 27 else 2]
+        capacity = _num_data_codewords(version, ecl) * 8
+        if count < (1 << count_width) and 4 + count_width + payload <= capacity:
+            break
+    else:
+        raise ValueError(f"Data too long for a QR code: {len(text)} characters")
+
+    bits = [(mode, 4), (count, count_width)] + data_bits
+    buffer = []
+    for value, length in bits:
+        buffer.extend((value >> i) & 1 for i in reversed(range(length)))
+
+    # Terminator, byte alignment and pad bytes
+    buffer.extend([0] * min(4, capacity - len(buffer)))
+    buffer.extend([0] * (-len(buffer) % 8))
+    codewords = [int(''.join(map(str, buffer[i:i + 8])), 2) for i in range(0, len(buffer), 8)]
+    pad = 0xEC
+    while len(codewords) < capacity // 8:
+        codewords.append(pad)
+        pad ^= 0xEC ^ 0x11
+    return version, codewords
+
+def _add_ecc_and_interleave(codewords, version, ecl):
+    """Split data into blocks, append error correction and interleave the result"""
+    num_blocks = NUM_ERROR_CORRECTION_BLOCKS[ecl][version]
+    block_ecc_len = ECC_CODEWORDS_PER_BLOCK[ecl][version]
+    raw_codewords = _num_raw_data_modules(version) // 8
+    num_short_blocks = num_blocks - raw_codewords % num_blocks
+    short_block_len = raw_codewords // num_blocks
+    divisor = _reed_solomon_divisor(block_ecc_len)
+
+    blocks = []
+    k = 0
+    for i in range(num_blocks):
+        length = short_block_len - block_ecc_len + (0 if i < num_short_blocks else 1)
+        data = codewords[k:k + length]
+        k += length
+        ecc = _reed_solomon_remainder(data, divisor)
+        if i < num_short_blocks:
+            data.append(0)
+        blocks.append(data + ecc)
+
+    result = []
+    for i in range(len(blocks[0])):
+        for j, block in enumerate(blocks):
+            # Skip the padding byte in short blocks
+            if i != short_block_len - block_ecc_len or j >= num_short_blocks:
+                result.append(block[i])
+    return result
+
+# ---------------------------------------------------------------------------
+# Module placement
+# ---------------------------------------------------------------------------
+
+class _Symbol:
+    """Function pattern layout of one QR symbol version"""
+
+    def __init__(self, version):
+        self.version = version
+        self.size = version * 4 + 17
+        self.modules = [[False] * self.size for _ in range(self.size)]
+        self.is_function = [[False] * self.size for _ in range(self.size)]
+
+    def set_function(self, x, y, dark):
+        self.modules[y][x] = dark
+        self.is_function[y][x] = True
+
+    def alignment_positions(self):
+        if self.version == 1:
+            return []
+        num_align = self.version // 7 + 2
+        step = (self.version * 8 + num_align * 3 + 5) // (num_align * 4 - 4) * 2
+        result = [self.size - 7 - i * step for i in range(num_align - 1)] + [6]
+        return list(reversed(result))
+
+    def draw_function_patterns(self, ecl, mask):
+        size = self.size
+        for i in range(size):
+            self.set_function(6, i, i % 2 == 0)
+            self.set_function(i, 6, i % 2 == 0)
+
+        for cx, cy in ((3, 3), (size - 4, 3), (3, size - 4)):
+            for dy in range(-4, 5):
+                for dx in range(-4, 5):
+                    x, y = cx + dx, cy + dy
+                    if 0 <= x < size and 0 <= y < size:
+                        self.set_function(x, y, max(abs(dx), abs(dy)) not in (2, 4))
+
+        positions = self.alignment_positions()
+        last = len(positions) - 1
+        for i, ax in enumerate(positions):
+            for j, ay in enumerate(positions):
+                if (i, j) in ((0, 0), (0, last), (last, 0)):
+                    continue
+                for dy in range(-2, 3):
+                    for dx in range(-2, 3):
+                        self.set_function(ax + dx, ay + dy, max(abs(dx), abs(dy)) != 1)
+
+        self.draw_format_bits(ecl, mask)
+        self.draw_version_bits()
+
+    def draw_format_bits(self, ecl, mask):
+        data = ECC_FORMAT_BITS[ecl] << 3 | mask
+        rem = data
+        for _ in range(10):
+            rem = (rem << 1) ^ ((rem >> 9) * 0x537)
+        bits = (data << 10 | rem) ^ 0x5412
+
+        def bit(i):
+            return (bits >> i) & 1 != 0
+
+        size = self.size
+        for i in range(6):
+            self.set_function(8, i, bit(i))
+        self.set_function(8, 7, bit(6))
+        self.set_function(8, 8, bit(7))
+        self.set_function(7, 8, bit(8))
+        for i in range(9, 15):
+            self.set_function(14 - i, 8, bit(i))
+        for i in range(8):
+            self.set_function(size - 1 - i, 8, bit(i))
+        for i in range(8, 15):
+            self.set_function(8, size - 15 + i, bit(i))
+        self.set_function(8, size - 8, True)
+
+    def draw_version_bits(self):
+        if self.version < 7:
+            return
+        rem = self.version
+        for _ in range(12):
+            rem = (rem << 1) ^ ((rem >> 11) * 0x1F25)
+        bits = self.version << 12 | rem
+        for i in range(18):
+            dark = (bits >> i) & 1 != 0
+            a = self.size - 11 + i % 3
+            b = i // 3
+            self.set_function(a, b, dark)
+            self.set_function(b, a, dark)
+
+def _grid_to_rows(grid):
+    """Pack a grid of bools into one int per row, with x = 0 as the most significant bit"""
+    return tuple(int(''.join('1' if cell else '0' for cell in row), 2) for row in grid)
+
+@lru_cache(maxsize=None)
+def _data_positions(version):
+    """Module coordinates that hold data bits, in zigzag placement order"""
+    symbol = _Symbol(version)
+    symbol.draw_function_patterns('M', 0)
+    size = symbol.size
+    positions = []
+    right = size - 1
+    while right >= 1:
+        if right == 6:
+            right = 5
+        upward = (right + 1) & 2 == 0
+        for vert in range(size):
+            y = size - 1 - vert if upward else vert
+            for x in (right, right - 1):
+                if not symbol.is_function[y][x]:
+                    positions.append((x, y))
+        right -= 2
+    return tuple(positions)
+
+@lru_cache(maxsize=None)
+def _mask_rows(version, mask):
+    """Rows of the mask pattern restricted to data modules"""
+    size = version * 4 + 17
+    pattern = MASK_PATTERNS[mask]
+    grid = [[False] * size for _ in range(size)]
+    for x, y in _data_positions(version):
+        grid[y][x] = pattern(x, y)
+    return _grid_to_rows(grid)
+
+@lru_cache(maxsize=None)
+def _function_rows(version, ecl, mask):
+    """Rows of all function patterns, including the format bits for ecl and mask"""
+    symbol = _Symbol(version)
+    symbol.draw_function_patterns(ecl, mask)
+    return _grid_to_rows(symbol.modules)
+
+def _place_codewords(version, codewords):
+    """Place the codeword bits along the zigzag data path and return packed rows"""
+    size = version * 4 + 17
+    rows = [0] * size
+    for i, (x, y) in enumerate(_data_positions(version)):
+        if i >= len(codewords) * 8:
+            break
+        if (codewords[i >> 3] >> (7 - (i & 7))) & 1:
+            rows[y] |= 1 << (size - 1 - x)
+    return rows
+
+_LONG_RUN = re.compile(r'0{5,}|1{5,}')
+
+def _penalty_score(rows, size):
+    """Score a masked symbol with the four penalty rules of the QR specification"""
+    lines = [format(row, f'0{size}b') for row in rows]
+    result = 0
+
+    # Rows and columns are scanned in one pass over a separator-joined string
+    lines += [''.join(column) for column in zip(*lines)]
+    runs = _LONG_RUN.findall('|'.join(lines))
+    result += sum(map(len, runs)) + (PENALTY_N1 - 5) * len(runs)
+    bordered = '0000' + '0000|0000'.join(lines) + '0000'
+    result += PENALTY_N3 * (bordered.count('00001011101') + bordered.count('10111010000'))
+
+    # 2x2 blocks of one colour
+    inner = (1 << (size - 1)) - 1
+    for upper, lower in zip(rows, rows[1:]):
+        same = ~(upper ^ (upper >> 1)) & ~(lower ^ (lower >> 1)) & ~(upper ^ lower) & inner
+        result += PENALTY_N2 * bin(same).count('1')
+
+    dark = sum(bin(row).count('1') for row in rows)
+    total = size * size
+    k = (abs(dark * 20 - total * 10) + total - 1) // total - 1
+    return result + k * PENALTY_N4
+
+def encode_qr(text, ecl='M', mask=None):
+    """Encode text into a QR symbol and return its module grid (list of rows of bools)"""
+    version, codewords = _encode_codewords(text, ecl)
+    size = version * 4 + 17
+    data_rows = _place_codewords(version, _add_ecc_and_interleave(codewords, version, ecl))
+
+    best_rows = None
+    best_penalty = None
+    for candidate in (range(8) if mask is None else (mask,)):
+        rows = [function | (data ^ masked) for function, data, masked
+                in zip(_function_rows(version, ecl, candidate), data_rows, _mask_rows(version, candidate))]
+        penalty = _penalty_score(rows, size) if mask is None else 0
+        if best_penalty is None or penalty < best_penalty:
+            best_rows, best_penalty = rows, penalty
+
+    return [[(row >> (size - 1 - x)) & 1 == 1 for x in range(size)] for row in best_rows]
+
+# ---------------------------------------------------------------------------
+# SVG output and caching
+# ---------------------------------------------------------------------------
+
+def qr_svg(text, ecl='M'):
+    """Render text as a standalone SVG QR code"""
+    modules = encode_qr(text, ecl)
+    size = len(modules) + QUIET_ZONE * 2
+    path = ''.join(f"M{x + QUIET_ZONE},{y + QUIET_ZONE}h1v1h-1z"
+                   for y, row in enumerate(modules)
+                   for x, dark in enumerate(row) if dark)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+            f'shape-rendering="crispEdges"><rect width="{size}" height="{size}" fill="white"/>'
+            f'<path d="{path}" fill="black"/></svg>')
+
+# Shown instead of a QR code when an order has no work order number
+PLACEHOLDER_SVG = """<svg width="80" height="80" viewBox="0 0 80 80" fill="none" xmlns="http://www.w3.org/2000/svg">
+<rect width="80" height="80" fill="white" stroke="black"/>
+<text x="40" y="40" text-anchor="middle" font-family="Arial" font-size="8">QR Code</text>
+</svg>
+"""
+
+def svg_data_uri(svg):
+    """Wrap SVG markup into a base64 data URI usable as an <img> source"""
+    return "data:image/svg+xml;base64," + base64.b64encode(svg.encode('utf-8')).decode('ascii')
+
+def configure_cache(cache_dir):
+    """Enable the on-disk QR cache in cache_dir, or disable it with None"""
+    global _cache_dir
+    _cache_dir = Path(cache_dir) if cache_dir else None
+    if _cache_dir is not None:
+        _cache_dir.mkdir(parents=True, exist_ok=True)
+    qr_data_uri.cache_clear()
+
+def _cache_path(text):
+    return _cache_dir / (hashlib.sha1(text.encode('utf-8')).hexdigest() + '.svg')
+
+@lru_cache(maxsize=MEMORY_CACHE_SIZE)
+def qr_data_uri(text):
+    """Return the QR code for text as an SVG data URI, using the LRU and disk caches"""
+    if _cache_dir is None:
+        return svg_data_uri(qr_svg(text))
+
+    path = _cache_path(text)
+    try:
+        svg = path.read_text(encoding='utf-8')
+    except FileNotFoundError:
+        svg = qr_svg(text)
+        # Write atomically so concurrent batch workers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=_cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(svg)
+        os.replace(tmp_path, path)
+    return svg_data_uri(svg)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Incremental Render Manifest
+增量渲染清单
+
+Keeps a manifest of content hashes next to the generated reports: one hash
+of the template/CSS and one hash per order input.  An incremental batch run
+re-renders only the orders whose hash changed and deletes the reports of
+orders that no longer appear in the input.
+
+Each order may be stored as several files, e.g. x.html and x.html.gz; the
+manifest tracks the plain name and checks or deletes every variant.
+
+Delete the manifest file to force a full rebuild.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_NAME = '.render_manifest.json'
+MANIFEST_VERSION = 1
+
+def order_digest(data):
+    """Return a stable content hash of one order's input JSON"""
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class RenderManifest:
+    """Tracks which reports in an output directory are up to date"""
+
+    def __init__(self, output_dir, template_fingerprint, variants=('',)):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_NAME
+        self.template_fingerprint = template_fingerprint
+        self.variants = tuple(variants)
+        self.previous = self._load()
+        self.current = {}
+        self.pending = {}
+        self.seen = set()
+        self.complete = True
+
+    def _load(self):
+        """Read the previous manifest; a changed template or output mode invalidates every entry"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('template') != self.template_fingerprint:
+            return {}
+        if tuple(manifest.get('variants', ('',))) != self.variants:
+            return {}
+        return manifest.get('orders', {})
+
+    def is_current(self, name, digest):
+        """Return True if the report for name was rendered from an identical input"""
+        return self.previous.get(name) == digest and all(path.exists() for path in self._files(name))
+
+    def _files(self, name):
+        """Return every stored variant of a report"""
+        return [self.output_dir / f"{name}{suffix}" for suffix in self.variants]
+
+    def keep(self, name, digest):
+        """Carry an unchanged report over into the new manifest"""
+        self.seen.add(name)
+        self.current[name] = digest
+
+    def expect(self, label, name, digest):
+        """Note that the order at label is about to be rendered into name"""
+        self.seen.add(name)
+        self.pending[label] = (name, digest)
+
+    def confirm(self, label):
+        """Record a successful render; failed orders stay out of the manifest and are retried"""
+        entry = self.pending.pop(label, None)
+        if entry is not None:
+            name, digest = entry
+            self.current[name] = digest
+
+    def mark_incomplete(self):
+        """Note that some input could not be read, so removed orders cannot be detected"""
+        self.complete = False
+
+    def prune(self):
+        """Delete reports of orders that are no longer in the input and return their names"""
+        removed = sorted(set(self.previous) - self.seen)
+        if not self.complete:
+            # Keep tracking the reports so a later complete run can remove them
+            for name in removed:
+                self.current[name] = self.previous[name]
+            return []
+        for name in removed:
+            for path in self._files(name):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def save(self):
+        """Write the manifest atomically"""
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'template': self.template_fingerprint,
+            'variants': list(self.variants),
+            'orders': dict(sorted(self.current.items())),
+        }
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Render Pipeline Profiling
+渲染流水线计时与性能分析
+
+Per-stage timers and counters for batch rendering, to tell where the time
+of a slow batch goes:
+
+    load       reading and parsing the order (plus the manifest check with --incremental)
+    validate   schema validation (--validate)
+    rows.X     one table of the report, e.g. rows.product_rows
+    template   assembling the page around the tables
+    pdf        rendering a PDF report
+    write      writing and compressing the output files
+
+Counters cover orders, failed orders, table rows and bytes emitted,
+fragment cache lookups (fragment_cache.py), and a histogram of the time
+per order.  The N slowest orders can be re-rendered
+at the end under cProfile and tracemalloc to see which functions and how
+much memory they need.  Results are exported as JSON or in the Prometheus
+text format (e.g. for the node_exporter textfile collector).
+
+Instrumentation is off unless a batch asks for it.  The pipeline then only
+tests one module global per order and otherwise runs unchanged code.
+记录各阶段耗时、行数与输出字节，可导出JSON或Prometheus文本格式。
+
+Usage / 使用方法:
+    python3 batch_render.py orders/ -o reports/ --timings
+    python3 batch_render.py orders/ -o reports/ --metrics-json run.json --metrics-prom run.prom
+    python3 batch_render.py orders/ -o reports/ --profile-slowest 5
+"""
+
+import bisect
+import cProfile
+import heapq
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from collections import deque
+
+from fragment_cache import COUNTERS, counting, fragment_stats, fragments_disabled
+
+# Upper bounds of the per-order time histogram, in seconds
+ORDER_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+PROFILE_FUNCTIONS = 15
+METRIC_PREFIX = 'report_render'
+
+# Stage timings of the order being rendered in this process, if instrumented
+_sample = None
+
+def current_sample():
+    """Return the OrderSample being recorded, or None when instrumentation is off"""
+    return _sample
+
+class OrderSample:
+    """Stage timings and counters of one rendered order"""
+
+    def __init__(self, label):
+        self.label = label
+        self.seconds = 0.0
+        self.stages = {}
+        self.rows = {}
+        self.bytes = 0
+        self.rendering = 0.0
+        self.tables = 0.0
+        self.fragments = {}
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def table_rows(self, table, data, cache=None):
+        """Render the rows of one layout table, recording their time and number"""
+        items = table.items(data)
+        start = time.perf_counter()
+        html = table.html(items) if cache is None else cache.rows(table, items)
+        seconds = time.perf_counter() - start
+        self.add(f"rows.{table.name}", seconds)
+        self.tables += seconds
+        self.rows[table.name] = self.rows.get(table.name, 0) + len(items)
+        return html
+
+    def timed(self, chunks):
+        """Yield from chunks, adding the time spent producing them to the rendering time"""
+        clock = time.perf_counter
+        chunks = iter(chunks)
+        while True:
+            start = clock()
+            chunk = next(chunks, None)
+            self.rendering += clock() - start
+            if chunk is None:
+                return
+            yield chunk
+
+    def finish(self, output_format):
+        """Split the rendering time into the page assembly and the tables"""
+        if self.rendering:
+            if output_format == 'pdf':
+                self.add('pdf', self.rendering)
+            else:
+                self.add('template', max(0.0, self.rendering - self.tables))
+
+def record_order(label, output_format, func, *args):
+    """Call func(*args) with an OrderSample active and return (result, sample)"""
+    global _sample
+    sample = _sample = OrderSample(label)
+    start = time.perf_counter()
+    try:
+        result, sample.fragments = counting(func, *args)
+    finally:
+        _sample = None
+    sample.seconds = time.perf_counter() - start
+    sample.finish(output_format)
+    return result, sample
+
+class PipelineStats:
+    """Stage timings and counters of a whole run, plus the slowest orders"""
+
+    def __init__(self, slowest=0):
+        self.stages = {}
+        self.rows = {}
+        self.orders = 0
+        self.failed = 0
+        self.bytes = 0
+        self.order_seconds = 0.0
+        self.order_max = 0.0
+        self.buckets = [0] * (len(ORDER_BUCKETS) + 1)
+        self.fragments = dict.fromkeys(COUNTERS, 0)
+        self.keep = slowest
+        # (seconds, sequence, label, data) of the slowest orders, smallest first
+        self.slowest = []
+        self.profiles = []
+        self._sequence = 0
+        self._pending = deque()
+
+    def add_stage(self, stage, seconds):
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+        if seconds > entry[2]:
+            entry[2] = seconds
+
+    def track(self, jobs, label_of, data_of):
+        """Yield jobs, timing how long each takes to produce as the load stage
+
+        The order data is kept until its result arrives (see add()) so the
+        slowest orders can be profiled afterwards; results must come back in
+        job order.
+        """
+        clock = time.perf_counter
+        jobs = iter(jobs)
+        while True:
+            start = clock()
+            job = next(jobs, None)
+            if job is None:
+                return
+            self.add_stage('load', clock() - start)
+            if self.keep:
+                self._pending.append((label_of(job), data_of(job)))
+            yield job
+
+    def add(self, sample, error=None, written=0):
+        """Fold one order's sample into the totals"""
+        data = None
+        if self._pending:
+            _, data = self._pending.popleft()
+        for name, count in sample.fragments.items():
+            self.fragments[name] += count
+        if error is not None:
+            self.failed += 1
+            return
+        self.orders += 1
+        self.bytes += written
+        for stage, seconds in sample.stages.items():
+            self.add_stage(stage, seconds)
+        for table, rows in sample.rows.items():
+            self.rows[table] = self.rows.get(table, 0) + rows
+        seconds = sample.seconds
+        self.order_seconds += seconds
+        self.order_max = max(self.order_max, seconds)
+        self.buckets[bisect.bisect_left(ORDER_BUCKETS, seconds)] += 1
+
+        if self.keep and data is not None:
+            self._sequence += 1
+            entry = (seconds, self._sequence, sample.label, data)
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, entry)
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def capture_slowest(self, render):
+        """Re-render the slowest orders under cProfile and tracemalloc
+
+        render(data) renders one order in memory.  Fills self.profiles with
+        the top functions by cumulative time and the peak memory of each
+        order, slowest first, and releases the kept order data.  The fragment
+        cache is off meanwhile: it is warm by now, and the profile would show
+        cache lookups instead of what made the order slow.
+        """
+        self.profiles = []
+        for seconds, _, label, data in sorted(self.slowest, reverse=True):
+            profiler = cProfile.Profile()
+            tracemalloc.start()
+            try:
+                with fragments_disabled():
+                    profiler.runcall(render, data)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.profiles.append({
+                'label': label,
+                'seconds': round(seconds, 6),
+                'peak_bytes': peak,
+                'functions': top_functions(profiler),
+            })
+        self.slowest = []
+        return self.profiles
+
+    def snapshot(self):
+        """Return the run statistics as a JSON-serialisable dict"""
+        return {
+            'orders': self.orders,
+            'failed': self.failed,
+            'bytes': self.bytes,
+            'rows': dict(sorted(self.rows.items())),
+            'stages': {
+                stage: {'calls': calls, 'seconds': round(seconds, 6), 'max_seconds': round(longest, 6)}
+                for stage, (calls, seconds, longest) in self.stages.items()
+            },
+            'order_seconds': {
+                'count': self.orders,
+                'sum': round(self.order_seconds, 6),
+                'max': round(self.order_max, 6),
+                'buckets': {str(bound): count for bound, count in zip(ORDER_BUCKETS + ('+Inf',), self.buckets)},
+            },
+            'fragments': fragment_stats(self.fragments),
+            'slowest': self.profiles,
+        }
+
+    def prometheus(self, prefix=METRIC_PREFIX):
+        """Return the run statistics in the Prometheus text exposition format"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{prefix}_{name}{labels} {value}")
+
+        metric('orders_total', 'counter', "Orders rendered, by result",
+               [('{result="ok"}', self.orders), ('{result="failed"}', self.failed)])
+        metric('bytes_total', 'counter', "Bytes of report output emitted", [('', self.bytes)])
+        metric('rows_total', 'counter', "Table rows rendered, by table",
+               [(f'{{table="{table}"}}', rows) for table, rows in sorted(self.rows.items())])
+        metric('stage_seconds_total', 'counter', "Time spent per pipeline stage",
+               [(f'{{stage="{stage}"}}', f"{seconds:.6f}") for stage, (_, seconds, _) in self.stages.items()])
+        metric('stage_calls_total', 'counter', "Timed calls per pipeline stage",
+               [(f'{{stage="{stage}"}}', calls) for stage, (calls, _, _) in self.stages.items()])
+        metric('fragment_lookups_total', 'counter', "Fragment cache lookups, by result",
+               [(f'{{result="{result}"}}', self.fragments[name])
+                for result, name in (('hit', 'hits'), ('disk_hit', 'disk_hits'), ('miss', 'misses'))])
+        metric('fragment_evictions_total', 'counter', "Fragments evicted from the in-memory LRU",
+               [('', self.fragments['evictions'])])
+
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(ORDER_BUCKETS + ('+Inf',), self.buckets):
+            cumulative += count
+            buckets.append((f'_bucket{{le="{bound}"}}', cumulative))
+        lines.append(f"# HELP {prefix}_order_seconds Time to render one order")
+        lines.append(f"# TYPE {prefix}_order_seconds histogram")
+        for suffix, value in buckets + [('_sum', f"{self.order_seconds:.6f}"), ('_count', self.orders)]:
+            lines.append(f"{prefix}_order_seconds{suffix} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def write_prometheus(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+
+def top_functions(profiler, limit=PROFILE_FUNCTIONS):
+    """Return the functions with the highest cumulative time of a finished profile"""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (_, calls, _, cumulative, _) in stats.stats.items():
+        rows.append((cumulative, calls, f"{filename}:{line}({name})"))
+    rows.sort(reverse=True)
+    return [{'function': function, 'calls': calls, 'cumulative_seconds': round(cumulative, 6)}
+            for cumulative, calls, function in rows[:limit]]
+
+def print_fragment_stats(counts):
+    """Print the fragment cache counters and hit rate"""
+    stats = fragment_stats(counts)
+    print(f"Fragment cache: {stats['hits']:,} hits, {stats['disk_hits']:,} disk hits, "
+          f"{stats['misses']:,} misses, {stats['evictions']:,} evictions, hit rate {stats['hit_rate']:.1%}")
+
+def print_stage_table(stats):
+    """Print where the time of a run went, largest stage first"""
+    total = sum(seconds for _, seconds, _ in stats.stages.values())
+    print("Stage                            calls    total s   mean ms    max ms   share")
+    for stage, (calls, seconds, longest) in sorted(stats.stages.items(), key=lambda item: -item[1][1]):
+        share = seconds / total if total else 0.0
+        print(f"{stage:<30} {calls:>7} {seconds:>10.3f} {seconds / calls * 1e3:>9.3f} "
+              f"{longest * 1e3:>9.3f} {share:>7.1%}")
+    for table, rows in sorted(stats.rows.items()):
+        print(f"Rows {table}: {rows:,}")
+    for profile in stats.profiles:
+        print(f"Slow order {profile['label']}: {profile['seconds'] * 1e3:.1f} ms, "
+              f"peak {profile['peak_bytes'] / 1024:.0f} KiB")
+        for function in profile['functions'][:5]:
+            print(f"    {function['cumulative_seconds'] * 1e3:9.3f} ms  {function['calls']:>7}  {function['function']}")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Report Bundles
+报表归档包
+
+Stores a whole batch of reports in one zip or tar archive instead of tens of
+thousands of small files, which keeps metadata traffic on network shares
+low.  Next to the archive an index file (<bundle>.index.json) maps each
+work order number to its member, including the byte offset of the data in
+tar archives, so a single report can be served straight out of the bundle
+without extracting or scanning it.
+
+Usage / 使用方法:
+    python3 batch_render.py orders.jsonl --bundle reports.zip
+    python3 report_bundle.py reports.zip                      # list work orders
+    python3 report_bundle.py reports.zip 250220000017505 -o report.html
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+
+INDEX_SUFFIX = '.index.json'
+INDEX_VERSION = 1
+BUNDLE_FORMATS = {'.zip': 'zip', '.tar': 'tar'}
+ZIP_LEVEL = 6
+
+def bundle_format(path):
+    """Return 'zip' or 'tar' for a bundle path, based on its suffix"""
+    kind = BUNDLE_FORMATS.get(Path(path).suffix.lower())
+    if kind is None:
+        raise ValueError(f"Bundle must end in {' or '.join(BUNDLE_FORMATS)}: {path}")
+    return kind
+
+def index_path(path):
+    """Return the path of the index file that belongs to a bundle"""
+    return Path(f"{path}{INDEX_SUFFIX}")
+
+class BundleWriter:
+    """Appends reports to a new zip or tar archive and writes its index on close"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.format = bundle_format(path)
+        self.entries = {}
+        self._members = set()
+        if self.format == 'zip':
+            self._archive = zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_LEVEL)
+        else:
+            self._archive = tarfile.open(self.path, 'w', format=tarfile.PAX_FORMAT)
+
+    def add(self, key, name, content):
+        """Store one report under member name and index it by key (the work order number)
+
+        Shared files such as linked stylesheets are added with key None and
+        stay out of the index.  Raises ValueError for a member name or key
+        that is already in the bundle.
+        """
+        if name in self._members:
+            raise ValueError(f"duplicate report {name} in bundle")
+        if key is not None and key in self.entries:
+            raise ValueError(f"duplicate work order {key} in bundle")
+        entry = {'member': name, 'size': len(content)}
+        if self.format == 'zip':
+            self._archive.writestr(name, content)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mtime = int(time.time())
+            info.mode = 0o644
+            self._archive.addfile(info, io.BytesIO(content))
+            # The data ends at the padded archive offset
+            padded = -(-len(content) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+            entry['offset'] = self._archive.offset - padded
+        self._members.add(name)
+        if key is not None:
+            self.entries[key] = entry
+
+    def close(self):
+        """Finish the archive and write the index next to it atomically"""
+        self._archive.close()
+        index = {
+            'version': INDEX_VERSION,
+            'format': self.format,
+            'bundle': self.path.name,
+            'reports': dict(sorted(self.entries.items())),
+        }
+        target = index_path(self.path)
+        tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, target)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class BundleReader:
+    """Reads single reports out of a bundle through its index"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.format = bundle_format(path)
+        with open(index_path(path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported bundle index version in {index_path(path)}")
+        self.entries = index['reports']
+        self._zip = None
+
+    def keys(self):
+        """Return the work order numbers stored in the bundle"""
+        return list(self.entries)
+
+    def member(self, key):
+        """Return the member name of a work order, or None if it is not bundled"""
+        entry = self.entries.get(key)
+        return entry['member'] if entry else None
+
+    def read(self, key):
+        """Return the report bytes for a work order; raises KeyError if missing"""
+        entry = self.entries[key]
+        if self.format == 'zip':
+            # Parse the central directory once, then read members directly
+            if self._zip is None:
+                self._zip = zipfile.ZipFile(self.path)
+            return self._zip.read(entry['member'])
+        with open(self.path, 'rb') as f:
+            f.seek(entry['offset'])
+            content = f.read(entry['size'])
+        if len(content) != entry['size']:
+            raise ValueError(f"Bundle {self.path} is truncated at {entry['member']}")
+        return content
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="List or extract reports stored in a report bundle")
+    parser.add_argument('bundle', help="zip or tar bundle written by batch_render.py --bundle")
+    parser.add_argument('work_order', nargs='?', help="work order number to extract (default: list all)")
+    parser.add_argument('-o', '--output', help="file to write the report to (default: stdout)")
+    args = parser.parse_args()
+
+    try:
+        with BundleReader(args.bundle) as reader:
+            if args.work_order is None:
+                for key in reader.keys():
+                    print(f"{key}\t{reader.member(key)}")
+                return 0
+            content = reader.read(args.work_order)
+    except KeyError:
+        print(f"Work order {args.work_order} is not in {args.bundle}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Error reading bundle: {e}", file=sys.stderr)
+        return 1
+
+    if args.output:
+        Path(args.output).write_bytes(content)
+        print(f"Extracted {reader.member(args.work_order)} to {args.output}")
+    else:
+        sys.stdout.buffer.write(content)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+"""
+Report Layout Configuration
+报表布局配置
+
+Describes which order fields fill the report: the single-value slots (company
+name, footer names, ...) and, for every table, the column order with the
+source field of each column, its default, or a fixed text.  The layout is
+compiled once into row renderers: each table's row markup and column lookups
+become one generated f-string expression, so a configured row renders as
+fast as a hand-written one.  The same compiled columns feed the HTML report
+and the PDF writer.
+
+Every value is HTML-escaped.  Since almost no ERP text contains '&' or '<',
+a table is rendered without escaping first and the result checked in one
+pass; only tables with such a value are rendered again with escaping.
+
+A layout file is JSON and only lists what differs from DEFAULT_LAYOUT.
+Fields are replaced one slot at a time, tables one key at a time (e.g. only
+"columns").  Named variants inside the file, such as one per plant or
+customer form, are applied on top of the file's own settings, and a variant
+or file may name its own report template:
+
+    {
+      "fields": {"company_name": {"path": "mainOrder.companyName", "default": "二厂"}},
+      "variants": {
+        "plant-b": {
+          "template": "plant_b_template.html",
+          "fields": {"footer_salesperson": {"value": "小王"}},
+          "tables": {"printing_rows": {"columns": [
+            {"field": "partName"}, {"field": "total"}, {"field": "frontColor"},
+            {"field": "backColor"}, {}, {}, {"value": "HP-INDIGO7K"}]}}
+        }
+      }
+    }
+
+Column entries: {"field": "path", "default": ...}, {"join": [paths]} (first
+value always, the others only when set, separated by line breaks),
+{"value": "fixed text"}, {"index": true} (1-based row number) or {} for an
+empty cell; "header" and "width" are used by the PDF writer.  Compiled
+layouts are cached per (file, variant).
+
+Each table can also be rendered from column arrays, one sequence per field,
+instead of row dicts (CompiledTable.columnar(), used by order_tables.py).
+The same markup is generated, with the values unpacked from zip() over the
+arrays.
+报表列、字段来源与默认值的声明式配置。
+
+Usage / 使用方法:
+    python3 batch_render.py orders/ -o reports/ --layout plants.json --variant plant-b
+    python3 report_layout.py plants.json --variant plant-b     # check and show a layout
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+from template_engine import escape_text
+
+# Every printing job currently runs on this press
+PRINTING_PRESS = 'HP-INDIGO120K'
+
+# Table slots filled from order sections, in report order
+TABLE_SLOTS = (
+    'product_rows', 'raw_materials_rows', 'publishing_rows', 'printing_rows',
+    'post_processing_rows', 'auxiliary_materials_rows',
+)
+
+DEFAULT_LAYOUT = {
+    'fields': {
+        'work_order_number': {'path': 'mainOrder.workOrderNumber', 'default': ''},
+        'company_name': {'path': 'mainOrder.companyName', 'default': '佛山智冠彩印包装有限公司'},
+        'order_number': {'path': 'mainOrder.orderNumber', 'default': ''},
+        'important_notes': {'path': 'mainOrder.importantNotes', 'default': ''},
+        'printing_special': {'path': 'printing.specialRequirements', 'default': '注意版面清洁'},
+        'footer_business_unit': {'path': 'footer.businessUnit', 'default': '小陈'},
+        'footer_reviewer': {'path': 'footer.reviewer', 'default': '小莫'},
+        'footer_salesperson': {'value': '小李'},
+        'footer_merchandiser': {'value': '小林'},
+        'footer_approver': {'path': 'footer.approver', 'default': '老杜'},
+    },
+    'tables': {
+        'product_rows': {
+            'items': 'orderDetails',
+            'columns': [
+                {'header': '序号', 'width': 3, 'index': True},
+                {'header': '物料编码', 'width': 8, 'field': 'materialCode'},
+                {'header': '产品名称', 'width': 16, 'join': ['productName', 'productDescription', 'specification']},
+                {'header': '成品尺寸', 'width': 6, 'value': '自定义成品'},
+                {'header': '订单数', 'width': 5, 'field': 'orderQuantity', 'default': 0},
+                {'header': '备品', 'width': 4},
+                {'header': '应产数', 'width': 5},
+                {'header': '交期', 'width': 5},
+            ],
+        },
+        'raw_materials_rows': {
+            'label': '原材',
+            'section': 'rawMaterials',
+            'items': 'specifications',
+            'columns': [
+                {'header': '部件名称', 'width': 5, 'field': 'partName'},
+                {'header': '物料编码及名称', 'width': 9, 'field': 'materialDescription'},
+                {'header': '订单规格', 'width': 5, 'field': 'orderSpec'},
+                {'header': '数量', 'width': 3, 'field': 'quantity'},
+                {'header': '上机尺寸', 'width': 5, 'field': 'workingSize'},
+                {'header': '开度', 'width': 3},
+                {'header': '发料数', 'width': 4, 'field': 'totalQuantity'},
+                {'header': '模数', 'width': 3},
+                {'header': '合计张数', 'width': 4, 'field': 'totalSheets'},
+                {'header': '损耗数', 'width': 4},
+            ],
+        },
+        'publishing_rows': {
+            'label': '出版',
+            'section': 'publishing',
+            'items': 'details',
+            'columns': [
+                {'header': '部件名称', 'width': 5, 'field': 'partName'},
+                {'header': '模数', 'width': 3, 'field': 'total'},
+                {'header': '拼版说明及工艺要求', 'width': 14, 'field': 'requirement'},
+                {'header': '版数', 'width': 3, 'field': 'version'},
+                {'header': '套数', 'width': 3, 'field': 'total'},
+                {'header': '拼版尺寸', 'width': 6, 'field': 'size'},
+            ],
+        },
+        'printing_rows': {
+            'label': '印刷',
+            'section': 'printing',
+            'items': 'details',
+            'columns': [
+                {'header': '部件名称', 'width': 5, 'field': 'partName'},
+                {'header': '模数', 'width': 3, 'field': 'total'},
+                {'header': '正面颜色', 'width': 6, 'field': 'frontColor'},
+                {'header': '反面颜色', 'width': 6, 'field': 'backColor'},
+                {'header': '应产数', 'width': 4},
+                {'header': '放数', 'width': 4},
+                {'header': '机台', 'width': 8, 'value': PRINTING_PRESS},
+            ],
+        },
+        'post_processing_rows': {
+            'label': '后工序',
+            'section': 'postProcessing',
+            'items': 'processes',
+            'columns': [
+                {'header': '部件名称', 'width': 5, 'field': 'partName'},
+                {'header': '工序', 'width': 4, 'field': 'process'},
+                {'header': '模数', 'width': 3},
+                {'header': '工艺要求', 'width': 11, 'field': 'requirements'},
+                {'header': '外发', 'width': 3},
+                {'header': '应产', 'width': 3},
+                {'header': '实产', 'width': 3},
+                {'header': '机长', 'width': 4, 'field': 'supervisor'},
+                {'header': '放数', 'width': 3},
+            ],
+        },
+        'auxiliary_materials_rows': {
+            'label': '辅材',
+            'section': 'auxiliaryMaterials',
+            'items': 'materials',
+            'columns': [
+                {'header': '部件名称', 'width': 5, 'field': 'partName'},
+                {'header': '物料编码', 'width': 5, 'field': 'materialCode'},
+                {'header': '物料名称', 'width': 7, 'field': 'materialName'},
+                {'header': '规格', 'width': 6, 'field': 'specification'},
+                {'header': '单位', 'width': 3, 'field': 'unit'},
+                {'header': '数量', 'width': 3, 'field': 'quantity'},
+                {'header': '备注', 'width': 5, 'field': 'remarks'},
+                {'header': '面积（㎡）', 'width': 5, 'field': 'unitArea'},
+                {'header': '配数', 'width': 3},
+            ],
+        },
+    },
+}
+
+# Row markup of the HTML tables
+ROW_START = '\n        <tr>'
+CELL_START = '\n            <td>'
+CELL_END = '</td>'
+ROW_END = '\n        </tr>'
+HTML_LINE_BREAK = '<br>'
+
+def _is_plain_text(text):
+    """Return True if fixed text can be pasted into the row f-string source as is"""
+    return text.isprintable() and not any(char in text for char in "'\\{}")
+
+def _pdf_text(value):
+    return '' if value is None else str(value)
+
+def _path_getter(path, default):
+    """Return get(mapping) for a dotted path, falling back to default"""
+    keys = path.split('.')
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda item: item.get(key, default)
+
+    def get(item):
+        for key in keys:
+            if not isinstance(item, dict) or key not in item:
+                return default
+            item = item[key]
+        return item
+    return get
+
+def _compile_column(column, position, where, names):
+    """Compile one column spec into (HTML source, escaped HTML source, break tests, PDF getter)
+
+    The sources are the cell content inside the row f-string, with item and
+    index in scope: the first formats values as they are, the second escapes
+    them.  The objects they refer to are added to names.  Fixed and empty
+    cells return None for both and their escaped text in names.  Break tests
+    are expressions that are true for every line break a joined cell adds.
+    PDF getters take (item, index).
+    """
+    if not isinstance(column, dict):
+        raise ValueError(f"{where}: a column must be an object")
+    kinds = [kind for kind in ('index', 'field', 'join', 'value') if kind in column]
+    if len(kinds) > 1:
+        raise ValueError(f"{where}: use only one of {', '.join(kinds)}")
+    kind = kinds[0] if kinds else None
+
+    if kind is None or kind == 'value':
+        text = str(column['value']) if kind else ''
+        names[f"text{position}"] = escape_text(text)
+        return None, None, (), lambda item, index: text
+    if kind == 'index':
+        return '{index}', '{index}', (), lambda item, index: str(index)
+    if kind == 'field':
+        path = column['field']
+        if not isinstance(path, str) or not path:
+            raise ValueError(f"{where}: field must be a non-empty path")
+        default = column.get('default', '')
+        if '.' not in path:
+            names[f"key{position}"] = path
+            names[f"default{position}"] = default
+            value = f"item.get(key{position}, default{position})"
+            pdf_cell = lambda item, index: _pdf_text(item.get(path, default))
+        else:
+            get = _path_getter(path, default)
+            names[f"get{position}"] = get
+            value = f"get{position}(item)"
+            pdf_cell = lambda item, index: _pdf_text(get(item))
+        return f"{{{value}}}", f"{{escape({value})}}", (), pdf_cell
+
+    paths = column['join']
+    if not isinstance(paths, list) or not paths or not all(isinstance(p, str) and p for p in paths):
+        raise ValueError(f"{where}: join must be a non-empty list of paths")
+    first = _path_getter(paths[0], '')
+    rest = tuple(_path_getter(path, '') for path in paths[1:])
+
+    def join(item, separator, text):
+        value = text(first(item))
+        for get in rest:
+            extra = get(item)
+            if extra:
+                value += separator + text(extra)
+        return value
+
+    pdf_cell = lambda item, index: join(item, '\n', _pdf_text)
+    if all('.' not in path for path in paths):
+        # Inline: the first value always, each further value after a line break when set
+        names['line_break'] = HTML_LINE_BREAK
+        names['nothing'] = ''
+        source = []
+        escaped = []
+        breaks = []
+        for number, path in enumerate(paths):
+            names[f"key{position}_{number}"] = path
+            lookup = f"item.get(key{position}_{number}, nothing)"
+            if number == 0:
+                source.append(f"{{{lookup}}}")
+                escaped.append(f"{{escape({lookup})}}")
+            else:
+                value = f"value{position}_{number}"
+                test = f"({value} := {lookup})"
+                source.append(f"{{line_break + str({value}) if {test} else nothing}}")
+                escaped.append(f"{{line_break + escape({value}) if {test} else nothing}}")
+                breaks.append(lookup)
+        return ''.join(source), ''.join(escaped), tuple(breaks), pdf_cell
+
+    names[f"join{position}"] = lambda item: join(item, HTML_LINE_BREAK, str)
+    names[f"escaped_join{position}"] = lambda item: join(item, HTML_LINE_BREAK, escape_text)
+    breaks = []
+    for number, get in enumerate(rest, 1):
+        names[f"get{position}_{number}"] = get
+        breaks.append(f"get{position}_{number}(item)")
+    return f"{{join{position}(item)}}", f"{{escaped_join{position}(item)}}", tuple(breaks), pdf_cell
+
+def _compile_rows(cells, names):
+    """Compile the cell sources of a table into one rows(items) function"""
+    row = (ROW_START + ''.join(cells) + ROW_END).replace('\n', '\\n')
+    loop = 'index, item in enumerate(items, 1)' if '{index}' in row else 'item in items'
+    return eval(f"lambda items: '\\n'.join([f'{row}' for {loop}])", names)
+
+def _compile_array_column(column, position, names, fields):
+    """Compile one (validated) column spec into (HTML source, escaped source, break slots) over arrays
+
+    Like _compile_column(), but values are the loop variables v0, v1, ... of
+    the arrays listed in fields as (field, default); a field used twice
+    shares its array.  Break slots are the arrays whose set values add a
+    line break.
+    """
+    def slot(path, default=''):
+        if (path, default) not in fields:
+            fields.append((path, default))
+        return f"v{fields.index((path, default))}"
+
+    if 'index' in column:
+        return '{index}', '{index}', ()
+    if 'field' in column:
+        value = slot(column['field'], column.get('default', ''))
+        return f"{{{value}}}", f"{{escape({value})}}", ()
+    if 'join' in column:
+        values = [slot(path) for path in column['join']]
+        names['line_break'] = HTML_LINE_BREAK
+        names['nothing'] = ''
+        source = [f"{{{values[0]}}}"]
+        escaped = [f"{{escape({values[0]})}}"]
+        for value in values[1:]:
+            source.append(f"{{line_break + str({value}) if {value} else nothing}}")
+            escaped.append(f"{{line_break + escape({value}) if {value} else nothing}}")
+        return ''.join(source), ''.join(escaped), tuple(values[1:])
+    text = escape_text(str(column['value']) if 'value' in column else '')
+    names[f"text{position}"] = text
+    source = text if _is_plain_text(text) else f"{{text{position}}}"
+    return source, source, ()
+
+def _compile_array_rows(cells, names, arrays):
+    """Compile the cell sources of a table into one rows(arrays, count) function"""
+    row = (ROW_START + ''.join(cells) + ROW_END).replace('\n', '\\n')
+    values = '(' + ''.join(f"v{slot}, " for slot in range(arrays)) + ')'
+    if not arrays:
+        loop = 'index in range(1, count + 1)'
+    elif '{index}' in row:
+        loop = f"index, {values} in enumerate(zip(*arrays), 1)"
+    else:
+        loop = f"{values} in zip(*arrays)"
+    return eval(f"lambda arrays, count: '\\n'.join([f'{row}' for {loop}])", names)
+
+class ColumnRows:
+    """Row renderers of one report table that read column arrays instead of row dicts
+
+    fields lists the (field, default) of every array html() takes, in order.
+    """
+
+    def __init__(self, table, columns):
+        names = {'escape': escape_text}
+        fields = []
+        cells = []
+        escaped_cells = []
+        breaks = []
+        for position, column in enumerate(columns):
+            source, escaped, slots = _compile_array_column(column, position, names, fields)
+            cells.append(CELL_START + source + CELL_END)
+            escaped_cells.append(CELL_START + escaped + CELL_END)
+            breaks.extend(slots)
+        self.fields = tuple(fields)
+        self._table = table
+        self._rows = _compile_array_rows(cells, names, len(fields))
+        self._escaped_rows = _compile_array_rows(escaped_cells, names, len(fields))
+        self._count_breaks = None
+        if breaks:
+            counts = ' + '.join(f"sum(map(bool, arrays[{value[1:]}]))" for value in breaks)
+            self._count_breaks = eval(f"lambda arrays: {counts}", names)
+
+    def html(self, arrays, count):
+        """Render count rows from one sequence per field, escaping every value"""
+        text = self._rows(arrays, count)
+        if self._table._is_plain(text, count, self._count_breaks, arrays):
+            return text
+        return self._escaped_rows(arrays, count)
+
+class CompiledTable:
+    """Row renderers for one report table"""
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.label = spec.get('label')
+        self.section = spec.get('section')
+        self.items_key = spec.get('items')
+        columns = spec.get('columns')
+        if not isinstance(self.items_key, str) or not isinstance(columns, list) or not columns:
+            raise ValueError(f"Table {name} needs 'items' and a non-empty 'columns' list")
+        self.headers = tuple(str(column.get('header', '')) if isinstance(column, dict) else ''
+                             for column in columns)
+        self.widths = tuple(column.get('width', 1) if isinstance(column, dict) else 1 for column in columns)
+        self.index_columns = tuple(position for position, column in enumerate(columns)
+                                   if isinstance(column, dict) and column.get('index'))
+        self.fingerprint = hashlib.sha256(
+            json.dumps([name, spec], sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+        if not all(isinstance(width, (int, float)) and width > 0 for width in self.widths):
+            raise ValueError(f"Table {name}: column widths must be positive numbers")
+
+        # The whole row becomes one f-string, once as is and once escaping
+        # every value.  Fixed texts are escaped now and pasted into it when
+        # they are plain enough, otherwise they are referenced
+        names = {'escape': escape_text}
+        cells = []
+        escaped_cells = []
+        markup = [ROW_START, ROW_END]
+        breaks = []
+        pdf_cells = []
+        for position, column in enumerate(columns):
+            source, escaped, tests, pdf_cell = _compile_column(
+                column, position, f"{name} column {position + 1}", names)
+            if source is None:
+                text = names[f"text{position}"]
+                markup.append(text)
+                source = escaped = text if _is_plain_text(text) else f"{{text{position}}}"
+            cells.append(CELL_START + source + CELL_END)
+            escaped_cells.append(CELL_START + escaped + CELL_END)
+            markup += [CELL_START, CELL_END]
+            breaks.extend(tests)
+            pdf_cells.append(pdf_cell)
+        self._rows = _compile_rows(cells, names)
+        self._escaped_rows = _compile_rows(escaped_cells, names)
+        self._pdf_cells = tuple(pdf_cells)
+        self._columns = columns
+        self._columnar = None
+
+        # '&' and '<' in one row of markup, and a counter for the line breaks
+        # joined cells add; see _is_plain()
+        markup = ''.join(markup)
+        self._markup = (markup.count('&'), markup.count('<'))
+        self._count_breaks = None
+        if breaks:
+            counts = ' + '.join(f"len([1 for item in items if {test}])" for test in breaks)
+            self._count_breaks = eval(f"lambda items: {counts}", names)
+
+    def html(self, items):
+        """Render the table body rows as HTML with every value escaped"""
+        if not isinstance(items, (list, tuple)):
+            items = list(items)
+        text = self._rows(items)
+        if self._is_plain(text, len(items), self._count_breaks, items):
+            return text
+        return self._escaped_rows(items)
+
+    def columnar(self):
+        """Return the ColumnRows renderer of this table, compiled on first use"""
+        if self._columnar is None:
+            self._columnar = ColumnRows(self, self._columns)
+        return self._columnar
+
+    def _is_plain(self, text, rows, count_breaks, items):
+        """Return True if no value in the unescaped rows contains '&' or '<'
+
+        Values can only add to the special characters of the markup, so it is
+        enough to count them in the finished text: two passes over one string
+        instead of a test per cell.  Almost every order passes, and only the
+        others are rendered a second time with escaping.
+        """
+        ampersands, opening = self._markup
+        if ampersands:
+            if text.count('&') != rows * ampersands:
+                return False
+        elif '&' in text:
+            return False
+        markup = rows * opening
+        found = text.count('<')
+        if found == markup:
+            return True
+        return found > markup and count_breaks is not None and found == markup + count_breaks(items)
+
+    def items(self, data):
+        """Return the row items of this table from a whole order"""
+        section = data.get(self.section, {}) if self.section else data
+        return section.get(self.items_key, [])
+
+    def cells(self, items):
+        """Return the rows as lists of cell texts (used by the PDF writer)"""
+        cells = self._pdf_cells
+        return [[cell(item, index) for cell in cells] for index, item in enumerate(items, 1)]
+
+class CompiledLayout:
+    """Field getters and table renderers compiled from a layout configuration"""
+
+    def __init__(self, config, template_path=None):
+        fields = config.get('fields', {})
+        tables = config.get('tables', {})
+        unknown = set(tables) - set(TABLE_SLOTS)
+        if unknown:
+            raise ValueError(f"Unknown layout tables: {', '.join(sorted(unknown))}")
+        clashes = set(fields) & (set(TABLE_SLOTS) | {'qr_code_url', 'head_styles'})
+        if clashes:
+            raise ValueError(f"Layout fields may not fill {', '.join(sorted(clashes))}")
+
+        self._fields = []
+        for slot, spec in fields.items():
+            if not isinstance(spec, dict) or ('path' in spec) == ('value' in spec):
+                raise ValueError(f"Field {slot} needs either 'path' or 'value'")
+            if 'value' in spec:
+                value = spec['value']
+                self._fields.append((slot, lambda data, value=value: value))
+            else:
+                self._fields.append((slot, _path_getter(spec['path'], spec.get('default', ''))))
+        self.field_names = frozenset(fields)
+        self.tables = {name: CompiledTable(name, tables[name]) for name in TABLE_SLOTS if name in tables}
+        self.template_path = template_path
+        self.config = config
+
+        digest = hashlib.sha256(json.dumps(config, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        digest.update(str(template_path).encode('utf-8'))
+        self.fingerprint = digest.hexdigest()
+
+    def field_values(self, data):
+        """Return {slot: value} of the single-value fields for one order"""
+        return {slot: get(data) for slot, get in self._fields}
+
+    def table_rows(self, name, data):
+        """Render the rows of one table for a whole order as HTML"""
+        table = self.tables[name]
+        return table.html(table.items(data))
+
+def merge_layout(base, overrides, where='layout'):
+    """Return base with fields, tables and template from overrides applied"""
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{where} must be a JSON object")
+    unknown = set(overrides) - {'fields', 'tables', 'template', 'variants'}
+    if unknown:
+        raise ValueError(f"Unknown keys in {where}: {', '.join(sorted(unknown))}")
+    merged = copy.deepcopy(base)
+    merged['fields'].update(copy.deepcopy(overrides.get('fields', {})))
+    for name, table in overrides.get('tables', {}).items():
+        if not isinstance(table, dict):
+            raise ValueError(f"{where}: table {name} must be a JSON object")
+        merged['tables'].setdefault(name, {}).update(copy.deepcopy(table))
+    if 'template' in overrides:
+        merged['template'] = overrides['template']
+    return merged
+
+@lru_cache(maxsize=None)
+def load_layout(path=None, variant=None):
+    """Load, merge and compile a layout, defaulting to DEFAULT_LAYOUT
+
+    Compiled layouts are cached per (path, variant), so a long-running
+    process serving several variants compiles each one once.  Raises
+    ValueError for unknown variants or malformed column specs.
+    """
+    config = copy.deepcopy(DEFAULT_LAYOUT)
+    base_dir = None
+    variants = {}
+    if path is not None:
+        with open(path, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+        config = merge_layout(config, overrides, str(path))
+        variants = overrides.get('variants', {})
+        base_dir = Path(path).parent
+    if variant is not None:
+        if variant not in variants:
+            raise ValueError(f"Unknown layout variant: {variant}")
+        config = merge_layout(config, variants[variant], f"variant {variant}")
+
+    template = config.pop('template', None)
+    template_path = str(base_dir / template) if template and base_dir is not None else template
+    return CompiledLayout(config, template_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a report layout file and show its compiled columns")
+    parser.add_argument('layout', nargs='?', help="layout JSON file (default: built-in layout)")
+    parser.add_argument('--variant', help="variant inside the layout file")
+    args = parser.parse_args()
+
+    try:
+        layout = load_layout(args.layout, args.variant)
+    except (OSError, ValueError) as e:
+        print(f"Error loading layout: {e}")
+        return 1
+
+    print(f"Template: {layout.template_path or '(default)'}")
+    print(f"Fields: {', '.join(sorted(layout.field_names))}")
+    for name, table in layout.tables.items():
+        print(f"{name}: {' | '.join(header or '-' for header in table.headers)}")
+    print(f"Fingerprint: {layout.fingerprint[:16]}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
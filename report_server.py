@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Report Render Service
+报表渲染服务
+
+Long-running local HTTP service that renders production orders on request,
+so the MES no longer starts a new interpreter for every scanned work order.
+Templates, fonts and the QR cache stay warm in a pool of worker processes,
+and connections are kept alive between requests (HTTP/1.1).  With
+--fragment-cache the workers also reuse the rendered rows of sections they
+have seen before (see fragment_cache.py).  If a worker dies (OOM kill,
+crash), the pool is replaced and the affected requests are retried once.
+常驻HTTP服务，扫码时直接返回工单报表。
+
+Endpoints:
+    POST /render              order JSON in, HTML out (422 with error paths under --validate)
+    POST /render?format=pdf   order JSON in, PDF out
+    POST /render?variant=X    render with layout variant X of --layout (see report_layout.py)
+    GET  /metrics             request counts, latency percentiles, fragment cache hits and pool restarts (JSON)
+    GET  /health              liveness check
+
+Usage / 使用方法:
+    python3 report_server.py --port 8080 --workers 4
+    python3 report_server.py --port 8080 --fragment-cache 4096
+    curl --data-binary @production_order_detailed_sample.json http://127.0.0.1:8080/render
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from batch_render import configure_worker, render_options, render_report, report_template
+from fragment_cache import COUNTERS, counting, fragment_stats
+from order_schema import format_error, validate_order
+from pdf_writer import FontError, load_font
+
+MAX_BODY_SIZE = 16 << 20
+LATENCY_WINDOW = 10000
+PERCENTILES = (50, 90, 99)
+CONTENT_TYPES = {
+    'html': 'text/html; charset=utf-8',
+    'pdf': 'application/pdf',
+}
+
+def warm_worker(template_path, font_path, qr_cache_dir, layout_path=None, fragments=0, fragment_dir=None):
+    """Load the template, layout, font and caches once per worker process"""
+    configure_worker(qr_cache_dir, fragments, fragment_dir)
+    report_template(render_options(template_path, layout_path=layout_path))
+    load_font(font_path)
+
+def percentile(sorted_values, pct):
+    """Return the nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+class RenderMetrics:
+    """Thread-safe request counters and a sliding window of render latencies"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        self.statuses = Counter()
+        self.bytes_sent = 0
+        self.in_flight = 0
+        self.fragments = dict.fromkeys(COUNTERS, 0)
+        self.pool_restarts = 0
+        self.started = time.time()
+
+    def begin(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def finish(self, status, seconds, size):
+        with self.lock:
+            self.in_flight -= 1
+            self.statuses[status] += 1
+            self.bytes_sent += size
+            if status == HTTPStatus.OK:
+                self.latencies.append(seconds)
+
+    def count_fragments(self, counts):
+        with self.lock:
+            for name, count in counts.items():
+                self.fragments[name] += count
+
+    def count_restart(self):
+        with self.lock:
+            self.pool_restarts += 1
+
+    def snapshot(self):
+        """Return the current metrics as a JSON-serialisable dict"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            statuses = dict(self.statuses)
+            in_flight = self.in_flight
+            bytes_sent = self.bytes_sent
+            fragments = fragment_stats(self.fragments)
+            pool_restarts = self.pool_restarts
+        latency_ms = {f"p{pct}": round(percentile(latencies, pct) * 1e3, 3) for pct in PERCENTILES}
+        if latencies:
+            latency_ms['mean'] = round(sum(latencies) / len(latencies) * 1e3, 3)
+            latency_ms['max'] = round(latencies[-1] * 1e3, 3)
+        return {
+            'uptime_seconds': round(time.time() - self.started, 3),
+            'requests': sum(statuses.values()),
+            'responses': {str(int(code)): count for code, count in sorted(statuses.items())},
+            'in_flight': in_flight,
+            'bytes_sent': bytes_sent,
+            'latency_window': len(latencies),
+            'latency_ms': latency_ms,
+            'fragments': fragments,
+            'pool_restarts': pool_restarts,
+        }
+
+class RenderServer(ThreadingHTTPServer):
+    """HTTP server that hands render jobs to a bounded process pool"""
+
+    daemon_threads = True
+
+    def __init__(self, address, workers=1, max_pending=None, template_path=None,
+                 font_path=None, qr_cache_dir=None, verbose=False, validate=False, layout_path=None,
+                 fragments=0, fragment_dir=None):
+        self.verbose = verbose
+        self.validate = validate
+        self.template_path = template_path
+        self.font_path = font_path
+        self.layout_path = layout_path
+        self.metrics = RenderMetrics()
+        self.pending = threading.BoundedSemaphore(max_pending or workers * 4)
+        self.workers = workers
+        self.worker_args = (template_path, font_path, qr_cache_dir, layout_path, fragments, fragment_dir)
+        self.pool_lock = threading.Lock()
+        self.executor = self.start_pool()
+        # server_close() shuts the pool down, including when binding fails
+        super().__init__(address, RenderRequestHandler)
+
+    def render(self, data, output_format, variant=None):
+        """Render one order in a worker process, or return None if the queue is full"""
+        if not self.pending.acquire(blocking=False):
+            return None
+        try:
+            options = render_options(self.template_path, output_format, self.font_path,
+                                     layout_path=self.layout_path, layout_variant=variant)
+            for attempt in range(2):
+                executor = self.executor
+                try:
+                    document, counts = executor.submit(counting, render_report, data, options).result()
+                    break
+                except BrokenProcessPool:
+                    # A worker died (OOM kill, crash) and took this pool down with it; an
+                    # order that kills its worker again is answered 503 by the handler
+                    self.replace_pool(executor)
+                    if attempt:
+                        raise
+            self.metrics.count_fragments(counts)
+            return document
+        finally:
+            self.pending.release()
+
+    def start_pool(self):
+        return ProcessPoolExecutor(self.workers, initializer=warm_worker, initargs=self.worker_args)
+
+    def replace_pool(self, broken):
+        """Swap a broken worker pool for a new one, once, however many requests saw it break"""
+        with self.pool_lock:
+            if self.executor is broken:
+                self.executor = self.start_pool()
+                self.metrics.count_restart()
+        broken.shutdown(wait=False)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(cancel_futures=True)
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """Routes /render, /metrics and /health"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ReportServer/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_body(self, status, body, content_type='application/json; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body)
+
+    def send_json(self, status, document):
+        body = json.dumps(document, ensure_ascii=False, indent=2).encode('utf-8')
+        return self.send_body(status, body)
+
+    def send_error_json(self, status, message):
+        return self.send_json(status, {'error': message})
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/metrics':
+            self.send_json(HTTPStatus.OK, self.server.metrics.snapshot())
+        elif path == '/health':
+            self.send_json(HTTPStatus.OK, {'status': 'ok'})
+        else:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"no route for {path}")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/render':
+            self.close_connection = True
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"no route for {url.path}")
+            return
+
+        metrics = self.server.metrics
+        metrics.begin()
+        started = time.perf_counter()
+        status, size = HTTPStatus.INTERNAL_SERVER_ERROR, 0
+        try:
+            status, size = self.handle_render(url)
+        finally:
+            metrics.finish(status, time.perf_counter() - started, size)
+
+    def handle_render(self, url):
+        """Render the posted order and return (status, bytes_sent)"""
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_BODY_SIZE:
+            # The unread body would corrupt the next request on this connection
+            self.close_connection = True
+            if length < 0:
+                return self.reject(HTTPStatus.LENGTH_REQUIRED, "Content-Length header is required")
+            return self.reject(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"body exceeds {MAX_BODY_SIZE} bytes")
+        body = self.rfile.read(length)
+
+        query = parse_qs(url.query)
+        output_format = query.get('format', ['html'])[-1]
+        if output_format not in CONTENT_TYPES:
+            return self.reject(HTTPStatus.BAD_REQUEST, f"unsupported format: {output_format}")
+        variant = query.get('variant', [None])[-1]
+        if variant is not None:
+            try:
+                # Compiled once per variant; workers compile their own copy on first use
+                report_template(render_options(self.server.template_path, layout_path=self.server.layout_path,
+                                               layout_variant=variant))
+            except (OSError, ValueError) as e:
+                return self.reject(HTTPStatus.BAD_REQUEST, str(e))
+        try:
+            data = json.loads(body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            return self.reject(HTTPStatus.BAD_REQUEST, f"invalid JSON: {e}")
+        if not isinstance(data, dict):
+            return self.reject(HTTPStatus.BAD_REQUEST, f"expected a JSON object, got {type(data).__name__}")
+        if self.server.validate:
+            errors = validate_order(data)
+            if errors:
+                document = {'error': "invalid order", 'details': [format_error(error) for error in errors]}
+                return HTTPStatus.UNPROCESSABLE_ENTITY, self.send_json(HTTPStatus.UNPROCESSABLE_ENTITY, document)
+
+        try:
+            document = self.server.render(data, output_format, variant)
+        except BrokenProcessPool:
+            return self.reject(HTTPStatus.SERVICE_UNAVAILABLE, "render worker died")
+        except Exception as e:
+            return self.reject(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(e).__name__}: {e}")
+        if document is None:
+            return self.reject(HTTPStatus.SERVICE_UNAVAILABLE, "render queue is full")
+        return HTTPStatus.OK, self.send_body(HTTPStatus.OK, document, CONTENT_TYPES[output_format])
+
+    def reject(self, status, message):
+        return status, self.send_error_json(status, message)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve production order reports over HTTP")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=8080, help="port to listen on")
+    parser.add_argument('-j', '--workers', type=int, default=0,
+                        help="render worker processes (0 = one per CPU)")
+    parser.add_argument('--max-pending', type=int,
+                        help="renders allowed in flight before answering 503 (default: 4 per worker)")
+    parser.add_argument('--template', help="report template with {{ slot }} markers (default: embedded layout)")
+    parser.add_argument('--layout', help="JSON layout file; its variants are chosen per request with ?variant=")
+    parser.add_argument('--font', help="TrueType CJK font to embed in PDF output")
+    parser.add_argument('--qr-cache', help="directory for cached QR code SVGs")
+    parser.add_argument('--fragment-cache', type=int, default=0, metavar='N',
+                        help="reuse the rendered rows of identical sections, keeping N per worker in memory")
+    parser.add_argument('--fragment-dir', help="directory that keeps rendered section rows across restarts")
+    parser.add_argument('--validate', action='store_true',
+                        help="reject orders that do not match the order schema with 422")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    try:
+        # Fail fast on a bad template or font instead of on the first request
+        report_template(render_options(args.template, layout_path=args.layout))
+        load_font(args.font)
+        server = RenderServer((args.host, args.port), workers, args.max_pending,
+                              args.template, args.font, args.qr_cache, args.verbose,
+                              args.validate, args.layout, args.fragment_cache, args.fragment_dir)
+    except (OSError, ValueError, FontError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    print(f"Serving reports on http://{args.host}:{server.server_port}/render ({workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
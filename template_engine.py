@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+"""
+Report Template Engine
+报表模板引擎
+
+Compiles the report layout once into a list of static segments and slots.
+Rendering an order then only joins the precompiled static chunks with the
+dynamic fields instead of rebuilding the whole page for every call.
+
+Templates use ``{{ slot_name }}`` markers.  The embedded default layout is
+used unless a template file is given, e.g. a customised copy of the layout.
+
+By default every report is self-contained with an inline stylesheet.  With
+linked assets the stylesheet and the QR placeholder image are written once
+per output directory under content-hashed names in assets/, and every report
+links to them, so browsers and the report share keep a single cached copy.
+"""
+
+import hashlib
+import os
+import re
+import textwrap
+from functools import lru_cache
+from pathlib import Path
+
+from qr_code import PLACEHOLDER_SVG
+
+ASSET_DIR = 'assets'
+
+SLOT_PATTERN = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+# Slots filled for every order by generate_html_report.render_html_report()
+REPORT_SLOTS = frozenset({
+    'work_order_number', 'qr_code_url', 'company_name', 'order_number',
+    'important_notes', 'printing_special', 'product_rows',
+    'raw_materials_rows', 'publishing_rows', 'printing_rows',
+    'post_processing_rows', 'auxiliary_materials_rows',
+    'footer_business_unit', 'footer_reviewer', 'footer_salesperson',
+    'footer_merchandiser', 'footer_approver',
+})
+
+# Replacements for the characters that are special in HTML, built once.  In
+# element content only '&' and '<' start markup; '>' and quotes are plain text
+HTML_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'})
+TEXT_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;'})
+
+DEFAULT_STYLESHEET = """        /* 基础样式 - 复制PDF的视觉效果 */
+        body {
+            font-family: "SimSun", "MS Song", serif;
+            margin: 0;
+            padding: 20px;
+            background: white;
+            font-size: 10.5px;
+            line-height: 1.2;
+        }
+        
+        .report-container {
+            width: 595px; /* PDF width in points */
+            margin: 0 auto;
+            background: white;
+            min-height: 842px; /* PDF height in points */
+            position: relative;
+        }
+        
+        /* 页眉 - 公司标题 */
+        .header {
+            text-align: center;
+            margin-bottom: 15px;
+        }
+        
+        .company-title {
+            font-size: 24px;
+            font-weight: bold;
+            margin-bottom: 10px;
+            letter-spacing: 2px;
+        }
+        
+        /* 订单信息行 */
+        .order-info-row {
+            display: flex;
+            justify-content: space-between;
+            margin-bottom: 8px;
+            font-size: 10.5px;
+        }
+        
+        .order-info-item {
+            display: inline-block;
+        }
+        
+        /* 客户信息行 */
+        .customer-info {
+            margin-bottom: 15px;
+            font-size: 10.5px;
+        }
+        
+        /* 表格样式 */
+        .section-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin-bottom: 15px;
+            font-size: 10.5px;
+        }
+        
+        .section-table th,
+        .section-table td {
+            border: 1px solid #000;
+            padding: 3px 5px;
+            text-align: left;
+            vertical-align: top;
+        }
+        
+        .section-table th {
+            background-color: #f5f5f5;
+            font-weight: bold;
+            text-align: center;
+        }
+        
+        /* 产品详情表格 */
+        .product-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin-bottom: 15px;
+            font-size: 9px;
+        }
+        
+        .product-table th,
+        .product-table td {
+            border: 1px solid #000;
+            padding: 2px 3px;
+            text-align: center;
+            vertical-align: middle;
+        }
+        
+        .product-table th {
+            background-color: #f0f0f0;
+            font-weight: bold;
+        }
+        
+        /* 重要说明 */
+        .important-notes {
+            margin: 10px 0;
+            padding: 5px;
+            background-color: #fff8dc;
+            border: 1px solid #ddd;
+            font-size: 9px;
+        }
+        
+        /* 各个业务部分 */
+        .business-section {
+            margin-bottom: 15px;
+        }
+        
+        .section-header {
+            background-color: #f0f0f0;
+            padding: 3px 5px;
+            border: 1px solid #000;
+            font-weight: bold;
+            text-align: center;
+            margin-bottom: 5px;
+        }
+        
+        .section-label {
+            writing-mode: vertical-lr;
+            text-orientation: mixed;
+            background-color: #f0f0f0;
+            border: 1px solid #000;
+            padding: 5px 3px;
+            text-align: center;
+            font-weight: bold;
+            width: 20px;
+        }
+        
+        /* 脚注 */
+        .footer {
+            position: absolute;
+            bottom: 20px;
+            left: 0;
+            right: 0;
+            display: flex;
+            justify-content: space-between;
+            font-size: 9px;
+            border-top: 1px solid #ccc;
+            padding-top: 5px;
+        }
+        
+        /* 布局容器 */
+        .section-container {
+            display: flex;
+            margin-bottom: 10px;
+        }
+        
+        .section-content {
+            flex: 1;
+        }
+        
+        /* 特别备注 */
+        .special-remarks {
+            margin: 8px 0;
+            font-size: 9px;
+            font-weight: bold;
+        }
+        
+        /* QR 码位置 */
+        .qr-code {
+            position: absolute;
+            top: 20px;
+            right: 20px;
+            width: 80px;
+            height: 80px;
+            border: 1px solid #ccc;
+        }
+        
+        /* 响应式调整 */
+        @media screen and (max-width: 700px) {
+            .report-container {
+                width: 100%;
+                padding: 10px;
+            }
+            
+            .footer {
+                position: relative;
+                bottom: auto;
+            }
+        }
+        
+        @media print {
+            body {
+                margin: 0;
+                padding: 0;
+            }
+            
+            .report-container {
+                width: 100%;
+                margin: 0;
+            }
+            
+            .footer {
+                position: fixed;
+                bottom: 0;
+            }
+        }
+"""
+
+DEFAULT_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>生产订单报表 - {{ work_order_number }}</title>
+    {{ head_styles }}
+</head>
+<body>
+    <div class="report-container">
+        <!-- QR码 -->
+        <div class="qr-code">
+            <img src="{{ qr_code_url }}" alt="QR Code" style="width: 100%; height: 100%;">
+        </div>
+        
+        <!-- 页眉 -->
+        <div class="header">
+            <div class="company-title">{{ company_name }}生产单</div>
+        </div>
+        
+        <!-- 订单信息行 -->
+        <div class="order-info-row">
+            <span class="order-info-item">订单类型：</span>
+            <span class="order-info-item">下单日期：{{ order_number }}</span>
+            <span class="order-info-item">工单编号：{{ work_order_number }}</span>
+        </div>
+        
+        <!-- 客户信息 -->
+        <div class="customer-info">
+            <span>广州至坚文化创意有限公司</span>
+            <span style="margin-left: 50px;">订单号：</span>
+            <span style="margin-left: 50px;">资料袋</span>
+            <span style="margin-left: 50px;">旧单编号：</span>
+        </div>
+        
+        <!-- 产品详情表格 -->
+        <table class="product-table">
+            <thead>
+                <tr>
+                    <th>序号</th>
+                    <th>物料编码</th>
+                    <th>产品名称</th>
+                    <th>成品尺寸</th>
+                    <th>订单数</th>
+                    <th>备品</th>
+                    <th>应产数</th>
+                    <th>交期</th>
+                </tr>
+            </thead>
+            <tbody>
+                {{ product_rows }}
+            </tbody>
+        </table>
+        
+        <!-- 重要说明 -->
+        <div class="important-notes">
+            <strong>重要说明：</strong>{{ important_notes }}
+        </div>
+        
+        <!-- 原材部分 -->
+        <div class="business-section">
+            <div class="section-container">
+                <div class="section-label">原<br>材</div>
+                <div class="section-content">
+                    <table class="section-table">
+                        <thead>
+                            <tr>
+                                <th>部件名称</th>
+                                <th>物料编码及名称</th>
+                                <th>订单规格</th>
+                                <th>数量</th>
+                                <th>上机尺寸</th>
+                                <th>开度</th>
+                                <th>发料数</th>
+                                <th>模数</th>
+                                <th>合计张数</th>
+                                <th>损耗数</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            {{ raw_materials_rows }}
+                        </tbody>
+                    </table>
+                </div>
+            </div>
+        </div>
+        
+        <!-- 出版部分 -->
+        <div class="business-section">
+            <div class="section-container">
+                <div class="section-label">出<br>版</div>
+                <div class="section-content">
+                    <table class="section-table">
+                        <thead>
+                            <tr>
+                                <th>部件名称</th>
+                                <th>模数</th>
+                                <th>拼版说明及工艺要求</th>
+                                <th>版数</th>
+                                <th>套数</th>
+                                <th>拼版尺寸</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            {{ publishing_rows }}
+                        </tbody>
+                    </table>
+                </div>
+            </div>
+        </div>
+        
+        <!-- 印刷部分 -->
+        <div class="business-section">
+            <div class="section-container">
+                <div class="section-label">印<br>刷</div>
+                <div class="section-content">
+                    <table class="section-table">
+                        <thead>
+                            <tr>
+                                <th>部件名称</th>
+                                <th>模数</th>
+                                <th>正面颜色</th>
+                                <th>反面颜色</th>
+                                <th>应产数</th>
+                                <th>放数</th>
+                                <th>机台</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            {{ printing_rows }}
+                        </tbody>
+                    </table>
+                    <div class="special-remarks">特别备注：{{ printing_special }}</div>
+                </div>
+            </div>
+        </div>
+        
+        <!-- 后工序部分 -->
+        <div class="business-section">
+            <div class="section-container">
+                <div class="section-label">后<br>工<br>序</div>
+                <div class="section-content">
+                    <table class="section-table">
+                        <thead>
+                            <tr>
+                                <th>部件名称</th>
+                                <th>工序</th>
+                                <th>模数</th>
+                                <th>工艺要求</th>
+                                <th>外发</th>
+                                <th>应产</th>
+                                <th>实产</th>
+                                <th>机长</th>
+                                <th>放数</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            {{ post_processing_rows }}
+                        </tbody>
+                    </table>
+                </div>
+            </div>
+        </div>
+        
+        <!-- 辅材部分 -->
+        <div class="business-section">
+            <div class="section-container">
+                <div class="section-label">辅<br>材</div>
+                <div class="section-content">
+                    <table class="section-table">
+                        <thead>
+                            <tr>
+                                <th>部件名称</th>
+                                <th>物料编码</th>
+                                <th>物料名称</th>
+                                <th>规格</th>
+                                <th>单位</th>
+                                <th>数量</th>
+                                <th>备注</th>
+                                <th>面积（㎡）</th>
+                                <th>配数</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            {{ auxiliary_materials_rows }}
+                        </tbody>
+                    </table>
+                </div>
+            </div>
+        </div>
+        
+        <!-- 页脚 -->
+        <div class="footer">
+            <span>制单：{{ footer_business_unit }}</span>
+            <span>文件制作：{{ footer_reviewer }}</span>
+            <span>业务员：{{ footer_salesperson }}</span>
+            <span>跟单：{{ footer_merchandiser }}</span>
+            <span>审核：{{ footer_approver }}</span>
+        </div>
+    </div>
+</body>
+</html>"""
+
+def inline_stylesheet(css):
+    """Wrap CSS text in an inline <style> block for the document head"""
+    return f"<style>\n{css}    </style>"
+
+def linked_stylesheet(href):
+    """Reference an external stylesheet from the document head"""
+    return f'<link rel="stylesheet" href="{href}">'
+
+def hashed_name(stem, suffix, content):
+    """Name an asset after its content, so a changed asset never reuses a cached URL"""
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{suffix}"
+
+@lru_cache(maxsize=None)
+def report_assets():
+    """Return {key: (filename, content)} for the assets shared by linked reports"""
+    stylesheet = textwrap.dedent(DEFAULT_STYLESHEET).encode('utf-8')
+    placeholder = PLACEHOLDER_SVG.encode('utf-8')
+    return {
+        'stylesheet': (hashed_name('report', '.css', stylesheet), stylesheet),
+        'qr_placeholder': (hashed_name('qr-placeholder', '.svg', placeholder), placeholder),
+    }
+
+def asset_urls():
+    """Return {key: relative URL} of the shared assets as seen from a report"""
+    return {key: f"{ASSET_DIR}/{filename}" for key, (filename, _) in report_assets().items()}
+
+def write_assets(output_dir):
+    """Write the shared assets into output_dir/assets and return their paths
+
+    Existing files are left alone: their names are content hashes, so an
+    existing file already holds the right content.
+    """
+    asset_dir = Path(output_dir) / ASSET_DIR
+    asset_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for filename, content in report_assets().values():
+        path = asset_dir / filename
+        if not path.exists():
+            tmp_path = path.with_name(f".{filename}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, path)
+        paths.append(path)
+    return paths
+
+def escape_html(value):
+    """Return value as text that is safe in element content and quoted attributes
+
+    Gives the same result as html.escape().  Text without special characters,
+    by far the common case, is returned as is after a few fast membership
+    tests; only the rest goes through the translation table.
+    """
+    text = value if value.__class__ is str else str(value)
+    if '&' in text or '<' in text or '>' in text or '"' in text or "'" in text:
+        return text.translate(HTML_ESCAPES)
+    return text
+
+def escape_text(value):
+    """Return value as text that is safe in element content, e.g. a table cell"""
+    text = value if value.__class__ is str else str(value)
+    if '&' in text or '<' in text:
+        return text.translate(TEXT_ESCAPES)
+    return text
+
+class LazySlots(dict):
+    """Slot values where callables are evaluated when the template reaches them
+
+    Used with CompiledTemplate.iter_chunks() this renders one section at a
+    time, so a streaming writer never holds the whole document in memory.
+    """
+
+    def __getitem__(self, slot):
+        value = super().__getitem__(slot)
+        return value() if callable(value) else value
+
+class CompiledTemplate:
+    """A template split into static segments and named slots"""
+
+    def __init__(self, parts, slot_positions, assets=None):
+        self._parts = parts
+        self._slot_positions = slot_positions
+        self.slots = frozenset(slot for _, slot in slot_positions)
+        # URLs of linked assets, e.g. 'qr_placeholder'; empty for self-contained reports
+        self.assets = dict(assets or {})
+
+        # Content hash of the layout and stylesheet, used to detect template changes
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(b'\0' if part is None else part.encode('utf-8') + b'\1')
+        for index, slot in slot_positions:
+            digest.update(f"{index}:{slot};".encode('utf-8'))
+        for key, url in sorted(self.assets.items()):
+            digest.update(f"{key}={url};".encode('utf-8'))
+        self.fingerprint = digest.hexdigest()
+
+    def iter_chunks(self, values):
+        """Yield the rendered document piece by piece"""
+        parts = self._parts
+        start = 0
+        for index, slot in self._slot_positions:
+            yield from parts[start:index]
+            yield str(values[slot])
+            start = index + 1
+        yield from parts[start:]
+
+    def render(self, values):
+        """Render the template by joining static segments with slot values"""
+        parts = self._parts.copy()
+        for index, slot in self._slot_positions:
+            parts[index] = str(values[slot])
+        return ''.join(parts)
+
+def compile_template(text, constants=None, assets=None):
+    """Compile template text, folding the slots in constants into static text"""
+    constants = constants or {}
+    parts = []
+    slot_positions = []
+    static = []
+    position = 0
+
+    for match in SLOT_PATTERN.finditer(text):
+        static.append(text[position:match.start()])
+        slot = match.group(1)
+        if slot in constants:
+            static.append(str(constants[slot]))
+        else:
+            parts.append(''.join(static))
+            static = []
+            slot_positions.append((len(parts), slot))
+            parts.append(None)
+        position = match.end()
+
+    static.append(text[position:])
+    parts.append(''.join(static))
+    return CompiledTemplate(parts, slot_positions, assets)
+
+@lru_cache(maxsize=None)
+def load_template(path=None, linked_assets=False, extra_slots=frozenset()):
+    """Load and compile a report template, defaulting to the embedded layout
+
+    With linked_assets the head links the shared stylesheet instead of
+    inlining it; call write_assets() on the output directory to provide it.
+    The compiled template is cached, so repeated calls are free.  Raises
+    ValueError if the template uses slots the report generator does not fill;
+    extra_slots names additional fields a report layout provides.
+    """
+    text = DEFAULT_TEMPLATE
+    if path is not None:
+        text = Path(path).read_text(encoding='utf-8')
+
+    if linked_assets:
+        assets = asset_urls()
+        head_styles = linked_stylesheet(assets['stylesheet'])
+    else:
+        assets = {}
+        head_styles = inline_stylesheet(DEFAULT_STYLESHEET)
+    template = compile_template(text, {'head_styles': head_styles}, assets)
+    unknown = template.slots - REPORT_SLOTS - extra_slots
+    if unknown:
+        raise ValueError(f"Unknown template slots in {path}: {', '.join(sorted(unknown))}")
+    return template
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Report Layout Escaping Tests
+报表布局转义测试
+
+Regression tests for the escaping shortcut of report_layout.py: tables are
+rendered unescaped and accepted when counting '&' and '<' in the result
+shows that no value added one (CompiledTable._is_plain()).  The shortcut
+must give exactly the rows that escaping every value gives, for the row
+renderers over dicts and over column arrays alike.
+
+Usage / 使用方法:
+    python3 -m pytest test_report_layout.py
+    python3 -m unittest test_report_layout
+"""
+
+import random
+import unittest
+
+from report_layout import CompiledTable, load_layout
+
+# Values that stress the count: markup characters, line breaks that joined
+# cells add themselves, and text that looks like escaped or joined output
+VALUES = ('', '纸', 'R&D', '<', '&', '>', '<br>', '&amp;', '<td>', 'a<b', '"q"', "it's", '{x}', '\n', 'x\ny')
+CASES = 300
+SEED = 20251018
+
+# Every column kind, with fixed texts that put '&' and '<' into the markup
+SPECIAL_TABLE = {
+    'items': 'rows',
+    'columns': [
+        {'index': True},
+        {'field': 'a'},
+        {'join': ['a', 'b', 'c']},
+        {'value': 'R&D <固定>'},
+        {'field': 'b', 'default': 'x&y'},
+        {'join': ['c', 'd']},
+        {},
+    ],
+}
+
+def random_items(rng, fields, rows, strings_only=False):
+    """Return rows of random values for fields; some fields are missing or not strings"""
+    items = []
+    for _ in range(rows):
+        item = {}
+        for field in fields:
+            roll = rng.random()
+            if roll < 0.15:
+                continue
+            if roll < 0.25 and not strings_only:
+                item[field] = rng.choice((0, 7, 2.5, None, True))
+            else:
+                item[field] = ''.join(rng.choice(VALUES) for _ in range(rng.randint(0, 3)))
+        items.append(item)
+    return items
+
+def table_fields(columns):
+    fields = set()
+    for column in columns:
+        if 'field' in column:
+            fields.add(column['field'])
+        fields.update(column.get('join', ()))
+    return sorted(fields)
+
+def layout_tables():
+    """Return (name, CompiledTable, columns) of the default layout plus SPECIAL_TABLE"""
+    tables = [(name, table, table._columns) for name, table in load_layout().tables.items()]
+    tables.append(('special', CompiledTable('special', SPECIAL_TABLE), SPECIAL_TABLE['columns']))
+    return tables
+
+class EscapingShortcutTest(unittest.TestCase):
+
+    def test_html_matches_escaping_every_value(self):
+        rng = random.Random(SEED)
+        for name, table, columns in layout_tables():
+            fields = table_fields(columns)
+            for _ in range(CASES):
+                items = random_items(rng, fields, rng.randint(0, 6))
+                self.assertEqual(table.html(items), table._escaped_rows(items), (name, items))
+
+    def test_plain_rows_skip_the_escaped_render(self):
+        for name, table, columns in layout_tables():
+            items = [{field: '纸张' for field in table_fields(columns)}] * 3
+            text = table._rows(items)
+            self.assertTrue(table._is_plain(text, len(items), table._count_breaks, items), name)
+            self.assertEqual(table.html(items), text)
+
+    def test_columnar_matches_escaping_every_value(self):
+        rng = random.Random(SEED + 1)
+        for name, table, columns in layout_tables():
+            renderer = table.columnar()
+            fields = table_fields(columns)
+            for _ in range(CASES):
+                items = random_items(rng, fields, rng.randint(0, 6), strings_only=True)
+                # Missing CSV cells are empty and take the column default
+                arrays = [[item.get(field, '') or default for item in items] for field, default in renderer.fields]
+                self.assertEqual(renderer.html(arrays, len(items)), renderer._escaped_rows(arrays, len(items)),
+                                 (name, items))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,10 +7,14 @@ Production Order JSON Validator and Pretty Printer
 This script validates and displays the production order JSON structure.
 """
 
+import argparse
 import json
 import sys
 from pathlib import Path
 
+from order_schema import format_error, validate_order
+from order_stream import format_position, iter_file_records
+
 def validate_json_file(file_path):
     """Validate and pretty print a JSON file."""
     try:
@@ -18,6 +22,11 @@ def validate_json_file(file_path):
             data = json.load(f)
         
         print(f"✅ {file_path} is valid JSON")
+        errors = validate_order(data)
+        for error in errors:
+            print(f"❌ {file_path}: {format_error(error)}")
+        if errors:
+            return None
         return data
     except json.JSONDecodeError as e:
         print(f"❌ {file_path} contains invalid JSON: {e}")
@@ -26,6 +35,38 @@ def validate_json_file(file_path):
         print(f"❌ File not found: {file_path}")
         return None
 
+def validate_stream(path, show_summary=False):
+    """Validate every order in a JSON-lines or concatenated-JSON dump.
+
+    Orders are read one at a time, so memory use does not depend on the
+    size of the dump. Malformed records and orders that do not match the
+    order schema are reported and skipped.
+    """
+    valid = 0
+    invalid = 0
+    try:
+        for record in iter_file_records(path):
+            if record.error is not None:
+                invalid += 1
+                print(f"❌ {path}: {format_position(record)}: {record.error}")
+                continue
+            errors = validate_order(record.data)
+            if errors:
+                invalid += 1
+                for error in errors:
+                    print(f"❌ {path}: {format_position(record)}: {format_error(error)}")
+                continue
+            valid += 1
+            if show_summary:
+                display_order_summary(record.data)
+    except OSError as e:
+        print(f"❌ Cannot read {path}: {e}")
+        return False
+
+    status = "✅" if invalid == 0 else "❌"
+    print(f"{status} {path}: {valid} valid orders, {invalid} invalid records")
+    return invalid == 0
+
 def display_order_summary(data):
     """Display a summary of the order data."""
     if not data:
@@ -60,7 +101,17 @@ def display_order_summary(data):
     print("="*60)
 
 def main():
-    """Main function to validate both JSON files."""
+    """Main function to validate both JSON files, or the dumps given on the command line."""
+    parser = argparse.ArgumentParser(description="Validate production order JSON files")
+    parser.add_argument('files', nargs='*',
+                        help="JSON, JSON-lines or concatenated-JSON files to stream ('-' for stdin)")
+    parser.add_argument('--summary', action='store_true', help="print a summary for every valid order")
+    args = parser.parse_args()
+    
+    if args.files:
+        results = [validate_stream(path, args.summary) for path in args.files]
+        return 0 if all(results) else 1
+    
     current_dir = Path(__file__).parent
     
     # Validate basic sample
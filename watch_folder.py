@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Watch Folder Renderer
+监控目录自动出单
+
+Watches the folder the ERP drops order JSON into and renders every new or
+modified file as soon as it is complete, instead of waiting for the next
+cron run.  Changes are picked up with inotify on Linux and by polling the
+folder elsewhere (or with --poll, e.g. on network shares that do not deliver
+inotify events).
+
+With inotify a file is rendered as soon as the writer closes it or it is
+renamed into the folder; a file still open for writing waits, however long
+the writer pauses.  Files seen without such events (the polling fallback,
+files found by a rescan) are rendered once their size and modification time
+have stayed the same for --settle seconds.  Either way a file that is still
+being written is not read half-way.  Hidden files (".name") are ignored,
+which covers the usual write-then-rename pattern.  Ready files go through a bounded queue to a
+render thread that keeps the template, font and QR cache warm; while the
+queue is full, ready files simply wait in the folder until there is room.
+新订单文件到达后一秒内自动生成报表。
+
+Usage / 使用方法:
+    python3 watch_folder.py /mnt/erp/orders -o /mnt/erp/reports
+    python3 watch_folder.py inbox/ -o reports/ --existing --validate
+    python3 watch_folder.py inbox/ -o reports/ --poll --interval 2
+    python3 watch_folder.py inbox/ -o reports/ --layout plants.json --variant plant-b
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+from batch_render import ORDER_FILE_SUFFIXES, render_job, render_options, report_layout, report_template
+from order_stream import iter_file_records
+from output_sinks import SINK_VARIANTS
+from pdf_writer import FontError, load_font
+from qr_code import configure_cache
+from template_engine import write_assets
+
+DEFAULT_SETTLE = 0.25
+DEFAULT_INTERVAL = 1.0
+DEFAULT_QUEUE_SIZE = 64
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+EVENT_HEADER = struct.Struct('iIII')
+
+class InotifyWatcher:
+    """Reports changed files in one directory through Linux inotify"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def poll(self, timeout):
+        """Wait up to timeout seconds; return {name: mask of its latest event}, or None if a full rescan is needed"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        events = {}
+        if not readable:
+            return events
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return events
+        pos = 0
+        while pos + EVENT_HEADER.size <= len(buf):
+            _, mask, _, length = EVENT_HEADER.unpack_from(buf, pos)
+            pos += EVENT_HEADER.size
+            name = buf[pos:pos + length].rstrip(b'\0')
+            pos += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if name:
+                # A write after a close opens the file again, so the latest event counts
+                events[os.fsdecode(name)] = mask
+        return events
+
+    def close(self):
+        os.close(self._fd)
+
+class PollingWatcher:
+    """Fallback that asks for a rescan of the directory every interval"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        return None
+
+    def close(self):
+        pass
+
+def open_watcher(directory, polling=False, interval=DEFAULT_INTERVAL):
+    """Return an inotify watcher for directory, or a polling watcher if inotify is unavailable"""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}); polling every {interval:g} s")
+    return PollingWatcher(interval)
+
+def is_order_file(name):
+    return not name.startswith('.') and Path(name).suffix in ORDER_FILE_SUFFIXES
+
+def file_signature(path):
+    """Return (size, mtime_ns) of a regular file, or None if it is gone or not a file"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isfile(path):
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+class FolderWatch:
+    """Tracks order files in a folder and decides when each one is complete
+
+    A file is pending from the first time a change is seen until it is
+    complete: closed after writing or moved in, going by its latest inotify
+    event, or with no such event its signature has stayed the same for
+    settle seconds.  It is then handed out by ready() once and only comes
+    back after it changes again.
+    """
+
+    def __init__(self, directory, settle=DEFAULT_SETTLE):
+        self.directory = Path(directory)
+        self.settle = settle
+        self.done = {}
+        # name -> (signature, time of the last observed change, time first seen, closed), where
+        # closed is True after a close or move event, False after a write and None without events
+        self.pending = {}
+
+    def note(self, name, now, mask=0):
+        """Record a possible change to one file, with the mask of its latest inotify event if any"""
+        if not is_order_file(name):
+            return
+        signature = file_signature(self.directory / name)
+        if signature is None:
+            self.pending.pop(name, None)
+            return
+        if self.done.get(name) == signature:
+            self.pending.pop(name, None)
+            return
+        entry = self.pending.get(name)
+        closed = entry[3] if entry is not None else None
+        if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            closed = True
+        elif mask & (IN_MODIFY | IN_CREATE):
+            closed = False
+        if entry is None:
+            self.pending[name] = (signature, now, now, closed)
+        elif entry[0] != signature:
+            self.pending[name] = (signature, now, entry[2], closed)
+        elif entry[3] != closed:
+            self.pending[name] = (signature, entry[1], entry[2], closed)
+
+    def rescan(self, now):
+        """Check every order file in the folder"""
+        try:
+            names = [entry.name for entry in os.scandir(self.directory)]
+        except OSError as e:
+            print(f"❌ Cannot list {self.directory}: {e}")
+            return
+        for name in names:
+            self.note(name, now)
+
+    def mark_existing(self):
+        """Treat the files already in the folder as rendered"""
+        for entry in os.scandir(self.directory):
+            if is_order_file(entry.name):
+                signature = file_signature(entry.path)
+                if signature is not None:
+                    self.done[entry.name] = signature
+
+    def ready(self, now):
+        """Return [(name, signature, first_seen)] for files that are complete, oldest first"""
+        settled = []
+        for name, (signature, changed, first_seen, closed) in list(self.pending.items()):
+            if closed is False or (closed is None and now - changed < self.settle):
+                continue
+            current = file_signature(self.directory / name)
+            if current != signature:
+                self.note(name, now)
+                continue
+            settled.append((first_seen, name, signature))
+        return [(name, signature, first_seen) for first_seen, name, signature in sorted(settled)]
+
+    def accept(self, name, signature):
+        """Mark a file as handed to the renderer"""
+        self.pending.pop(name, None)
+        self.done[name] = signature
+
+class RenderWorker(threading.Thread):
+    """Renders queued order files in-process with a warm template and font"""
+
+    def __init__(self, jobs, output_dir, options):
+        super().__init__(name='render', daemon=True)
+        self.jobs = jobs
+        self.output_dir = output_dir
+        self.options = options
+        self.stats = {'files': 0, 'orders': 0, 'failed': 0}
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            path, first_seen = job
+            self.render_file(path, first_seen)
+
+    def render_file(self, path, first_seen):
+        orders = failed = 0
+        try:
+            for record in iter_file_records(path):
+                label = f"{path.name}:{record.line}"
+                error = record.error
+                if error is not None:
+                    error = f"{error} (byte offset {record.offset})"
+                label, _, error, _ = render_job((label, record.data, error, self.output_dir, self.options))
+                if error is None:
+                    orders += 1
+                else:
+                    failed += 1
+                    print(f"❌ {label}: {error}")
+        except OSError as e:
+            failed += 1
+            print(f"❌ {path.name}: {e}")
+        self.stats['files'] += 1
+        self.stats['orders'] += orders
+        self.stats['failed'] += failed
+        latency = time.monotonic() - first_seen
+        print(f"✅ {path.name}: {orders} reports ({failed} failed) {latency * 1e3:.0f} ms after arrival")
+
+def watch(directory, output_dir, options, settle=DEFAULT_SETTLE, interval=DEFAULT_INTERVAL,
+          polling=False, queue_size=DEFAULT_QUEUE_SIZE, existing=False, stop=None):
+    """Render order files arriving in directory until stop is set or Ctrl-C; return statistics"""
+    folder = FolderWatch(directory, settle)
+    if not existing:
+        folder.mark_existing()
+    jobs = queue.Queue(queue_size)
+    worker = RenderWorker(jobs, output_dir, options)
+    worker.start()
+    watcher = open_watcher(directory, polling, interval)
+    stop = stop or threading.Event()
+    full = False
+
+    try:
+        folder.rescan(time.monotonic())
+        while not stop.is_set():
+            for name, signature, first_seen in folder.ready(time.monotonic()):
+                try:
+                    jobs.put_nowait((folder.directory / name, first_seen))
+                except queue.Full:
+                    # Backpressure: leave the rest pending and retry on the next pass
+                    if not full:
+                        print(f"Render queue full ({queue_size}); waiting")
+                    full = True
+                    break
+                full = False
+                folder.accept(name, signature)
+
+            timeout = settle / 2 if folder.pending else interval
+            changed = watcher.poll(timeout)
+            now = time.monotonic()
+            if changed is None:
+                folder.rescan(now)
+            else:
+                for name, mask in changed.items():
+                    folder.note(name, now, mask)
+    except KeyboardInterrupt:
+        print("\nStopping; finishing queued files")
+    finally:
+        watcher.close()
+        jobs.put(None)
+        worker.join()
+    return worker.stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Render production orders as they arrive in a folder")
+    parser.add_argument('directory', help="folder the order JSON files are dropped into")
+    parser.add_argument('-o', '--output-dir', default='reports', help="directory for the generated reports")
+    parser.add_argument('--format', choices=('html', 'pdf'), default='html', help="output format")
+    parser.add_argument('--template', help="report template with {{ slot }} markers (default: embedded layout)")
+    parser.add_argument('--layout', help="JSON layout file with field sources and table columns")
+    parser.add_argument('--variant', help="named variant inside the layout file, e.g. one per plant")
+    parser.add_argument('--font', help="TrueType CJK font to embed in PDF output")
+    parser.add_argument('--qr-cache', help="directory for cached QR code SVGs")
+    parser.add_argument('--compress', choices=sorted(SINK_VARIANTS), default='plain',
+                        help="store plain reports, gzip-compressed reports, or both")
+    parser.add_argument('--link-assets', action='store_true',
+                        help="link a shared stylesheet in output-dir/assets instead of inlining it")
+    parser.add_argument('--validate', action='store_true',
+                        help="skip orders that do not match the order schema")
+    parser.add_argument('--existing', action='store_true',
+                        help="also render the files already in the folder at startup")
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE,
+                        help=f"seconds a file must stay unchanged before it is rendered when polling "
+                             f"(default: {DEFAULT_SETTLE})")
+    parser.add_argument('--poll', action='store_true', help="poll the folder instead of using inotify")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f"polling interval in seconds (default: {DEFAULT_INTERVAL})")
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"files waiting for the renderer before intake pauses (default: {DEFAULT_QUEUE_SIZE})")
+    args = parser.parse_args()
+
+    if not Path(args.directory).is_dir():
+        print(f"Error: {args.directory} is not a directory")
+        return 1
+    options = render_options(args.template, args.format, args.font, args.validate, args.link_assets,
+                             args.compress, layout_path=args.layout, layout_variant=args.variant)
+    try:
+        # Warm up before the first order arrives
+        report_layout(options)
+        if args.format == 'pdf':
+            load_font(args.font)
+        else:
+            report_template(options)
+        configure_cache(args.qr_cache)
+        Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+        if args.link_assets and args.format == 'html':
+            write_assets(args.output_dir)
+    except (OSError, ValueError, FontError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    print(f"Watching {args.directory} -> {args.output_dir} (Ctrl-C to stop)")
+    stats = watch(args.directory, args.output_dir, options, args.settle, args.interval,
+                  args.poll, args.max_queue, args.existing)
+    print(f"Files rendered: {stats['files']}")
+    print(f"Reports: {stats['orders']} ({stats['failed']} failed)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())